@@ -1,33 +1,74 @@
 import os
-from flask import Flask, jsonify, make_response
+import logging
+import click
+from flask import Flask, jsonify, make_response, request
+from flask.cli import FlaskGroup
 from flask_sqlalchemy import SQLAlchemy
 from flask_restful import Api
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
-from flask_migrate import Migrate
 from dotenv import load_dotenv
 from flask_cors import CORS
 from datetime import timedelta
-import traceback
-from flask_mail import Mail # NEW: Import Flask-Mail
+from .utils.slow_query import SlowQueryLog
+from .utils.log import configure_logging
+from .utils.engine import EngineProfile
+from .utils.replicas import RoutingSession, ReplicaRouter
+from .utils.fast_json import FastJSONProvider, output_json
+from .utils.compression import Compression
+from .utils.serializers import SerializerRegistry
+from .utils.loading import init_loader_profiles
+from .utils.changes import init_change_log
+from .utils.cache import Cache
+from .utils.archive import PostArchive
+from .utils.export import DataExport
+from .utils.thumbnails import PosterThumbnails
+from .utils.movie_links import MovieMatcher
+from .utils.summaries import init_user_summaries
+from .utils.trending import init_trending
+from .utils.popularity import init_movie_popularity
+from .utils.mail import LazyMail
+from .utils.metrics import Metrics
+from .utils.events import EventBus
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize extensions (only those that don't take 'app' directly)
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 api = Api()
+api.representations['application/json'] = output_json
 bcrypt = Bcrypt()
 jwt = JWTManager()
-migrate = Migrate()
-mail = Mail() # NEW: Initialize Flask-Mail
+mail = LazyMail() # Imports Flask-Mail on first send
+slow_query_log = SlowQueryLog()
+engine_profile = EngineProfile()
+replica_router = ReplicaRouter()
+metrics = Metrics()
+event_bus = EventBus()
+cache = Cache()
+archive = PostArchive()
+data_export = DataExport()
+thumbnails = PosterThumbnails()
+movie_matcher = MovieMatcher()
+compression = Compression()
+serializer_registry = SerializerRegistry()
+
+
+def _running_cli():
+    """True when the app is being loaded by the `flask` command rather than a server."""
+    # `uvicorn asgi:app` also runs inside a click command; only `flask`'s is a FlaskGroup
+    ctx = click.get_current_context(silent=True)
+    return ctx is not None and isinstance(ctx.find_root().command, FlaskGroup)
 
 def create_app():
     # Create and configure the Flask application
     from .config import Config
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(Config)
-
-    
+    configure_logging(app)
 
     # NEW: Flask-Mail Configuration
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER')
@@ -39,15 +80,30 @@ def create_app():
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('MAIL_DEFAULT_SENDER') # The email address emails will be sent from
 
     # Initialize CORS directly with the app instance here
-    CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}}, supports_credentials=True)
+    CORS(app, resources={r"/*": {"origins": "http://localhost:3000"}}, supports_credentials=True,
+         expose_headers=['X-Next-Cursor'])
 
     # Initialize other extensions with the app
     db.init_app(app)
     api.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
-    migrate.init_app(app, db)
-    mail.init_app(app) # NEW: Initialize Flask-Mail with the app
+    mail.init_app(app)
+    if _running_cli():
+        # Flask-Migrate pulls in alembic (and Mako); only `flask db ...` needs it
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    slow_query_log.init_app(app)
+    engine_profile.init_app(app)
+    replica_router.init_app(app)
+    metrics.init_app(app)
+    compression.init_app(app)
+    event_bus.init_app(app)
+    cache.init_app(app)
+    archive.init_app(app)
+    data_export.init_app(app)
+    thumbnails.init_app(app)
+    movie_matcher.init_app(app)
 
     # Import models to ensure they are registered with SQLAlchemy
     from .models.user import User
@@ -60,27 +116,45 @@ def create_app():
     from .models.club_member import ClubMember
     from .models.like import Like
     from .models.comment import Comment
+    from .models.change_log import ChangeLog
+    from .models.movie_popularity import MoviePopularity
+
+    # Compile the SerializerMixin models' to_dict() now that every model is mapped
+    serializer_registry.init_app(app)
+    init_loader_profiles(app)
+    init_change_log(app)
+    init_user_summaries(app)
+    init_trending(app)
+    init_movie_popularity(app)
 
     # Register error handlers
     @app.errorhandler(404)
     def not_found(error):
-        print(f"DEBUG: 404 Error caught: {error}")
-        traceback.print_exc()
+        logger.info("404 %s %s", request.method, request.path)
         return make_response(jsonify({'errors': ['Not Found']}), 404)
 
     @app.errorhandler(400)
     def bad_request(error):
-        print(f"DEBUG: 400 Error caught: {error}")
-        traceback.print_exc()
+        logger.info("400 %s %s: %s", request.method, request.path, error)
         return make_response(jsonify({'errors': ['Bad Request']}), 400)
 
     @app.errorhandler(Exception)
     def handle_exception(e):
         db.session.rollback()
-        print(f"DEBUG: Caught unexpected exception: {type(e).__name__}: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Unhandled %s on %s %s", type(e).__name__, request.method, request.path)
         return make_response(jsonify({'message': f'Unexpected error: {str(e)}'}), 500)
 
+    # CLI commands
+    if _running_cli():
+        from .seed import seed_command
+        from .utils.changes import prune_change_log_command
+        from .utils.trending import decay_trending_command
+        from .utils.popularity import rebuild_movie_popularity_command
+        app.cli.add_command(seed_command)
+        app.cli.add_command(prune_change_log_command)
+        app.cli.add_command(decay_trending_command)
+        app.cli.add_command(rebuild_movie_popularity_command)
+
     @app.route('/')
     def index():
         return jsonify(message="Welcome to the TV Series & Movies Club API!")
@@ -116,4 +190,16 @@ def create_app():
     from .routes.watchlist_routes import watchlist_bp
     app.register_blueprint(watchlist_bp, url_prefix='') # Register with empty prefix to match /users/<id>/watchlist
 
+    # Server-sent event streams for clubs and user timelines
+    from .routes.event_routes import event_bp
+    app.register_blueprint(event_bp, url_prefix='')
+
+    # Delta sync: changes since a sync token, tombstones included
+    from .routes.sync_routes import sync_bp
+    app.register_blueprint(sync_bp, url_prefix='')
+
+    # Several API calls in one round trip
+    from .routes.batch_routes import batch_bp
+    app.register_blueprint(batch_bp, url_prefix='')
+
     return app
@@ -0,0 +1,330 @@
+"""
+ASGI read tier.
+
+Serves the heaviest public GETs (feed, club posts, clubs, movies, comments)
+from an asyncio event loop so slow clients and database waits park a
+coroutine instead of a whole gunicorn worker. It reuses the Flask app's
+config, models and JSON provider, so responses are byte-for-byte the ones the
+Flask routes return; the Flask app keeps serving everything else.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8001
+
+Queries run through SQLAlchemy's asyncio engine (aiosqlite for SQLite,
+asyncpg for Postgres). Each handler loads its rows with the same ORM code
+the Flask route runs, inside AsyncSession.run_sync, which runs it on the
+event loop itself; so only the loading happens there. Serializing the rows,
+reading and decompressing the post archive and encoding the response run in
+Starlette's threadpool.
+"""
+import inspect
+import logging
+import random
+from contextlib import asynccontextmanager
+
+from sqlalchemy import exc, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from . import create_app, db
+from .utils.loading import load_profile
+from .utils.replicas import is_pinned_to_primary
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_url(url):
+    """Maps a sync database URL onto the matching asyncio driver."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver configured for {backend} databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def _async_engine_options(url, config):
+    if url.get_backend_name() == 'sqlite':
+        # aiosqlite defaults to NullPool, i.e. a new connection and thread per request
+        if url.database in (None, '', ':memory:'):
+            return {}
+        return {'poolclass': AsyncAdaptedQueuePool, 'pool_size': config['ASYNC_DB_POOL_SIZE'],
+                'max_overflow': config['ASYNC_DB_MAX_OVERFLOW'], 'pool_timeout': config['ASYNC_DB_POOL_TIMEOUT']}
+    return {
+        'pool_size': config['ASYNC_DB_POOL_SIZE'],
+        'max_overflow': config['ASYNC_DB_MAX_OVERFLOW'],
+        'pool_timeout': config['ASYNC_DB_POOL_TIMEOUT'],
+        'pool_recycle': int(config['SQLALCHEMY_ENGINE_OPTIONS'].get('pool_recycle', 1800)),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+        'connect_args': {
+            # asyncpg has no libpq "options"; the read timeouts go in server_settings
+            'server_settings': {
+                'statement_timeout': str(config['STATEMENT_TIMEOUT_READ_MS']),
+                'lock_timeout': str(config['LOCK_TIMEOUT_MS']),
+                'application_name': 'movieclub-read-tier',
+            },
+        },
+    }
+
+
+class ReadTier:
+    """Holds the Flask app (for config, JWT and JSON) and the async engines."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        with flask_app.app_context():
+            primary_url = db.engines[None].url
+            replica_urls = [db.engines[key].url for key in config.get('SQLALCHEMY_REPLICA_BINDS') or ()]
+
+        self.primary = self._engine(primary_url)
+        self.replicas = [self._engine(url) for url in replica_urls]
+        self.sessions = {
+            engine: async_sessionmaker(engine, expire_on_commit=False)
+            for engine in [self.primary, *self.replicas]
+        }
+
+    def _engine(self, url):
+        url = async_url(url)
+        return create_async_engine(url, **_async_engine_options(url, self.flask_app.config))
+
+    async def session(self, identity):
+        """A session on a random replica, or the primary if `identity` just wrote (see utils/replicas.py)."""
+        engine = self.primary
+        if self.replicas:
+            # The pin lives in the app cache, which may be a Redis round trip
+            if identity is None or not await run_in_threadpool(is_pinned_to_primary, identity):
+                engine = random.choice(self.replicas)
+        return self.sessions[engine]()
+
+    async def dispose(self):
+        for engine in self.sessions:
+            await engine.dispose()
+
+    def render(self, data, status=200):
+        """Encodes `data` exactly as the Flask app's jsonify would."""
+        flask_response = self.flask_app.json.response(data)
+        return Response(flask_response.get_data(), status_code=status, media_type=flask_response.mimetype)
+
+    def render_compressed(self, data, status, accept_encoding):
+        """
+        render(), then compressed with the same negotiation and settings as
+        the Flask app. `data` may be a function returning the data to render.
+        """
+        response = self.render(data() if callable(data) else data, status)
+        compression = self.flask_app.extensions.get('compression')
+        if compression is None or not compression.enabled:
+            return response
+        response.headers['Vary'] = 'Accept-Encoding'
+        encoding = compression.negotiate(accept_encoding)
+        compressed = compression.compress_body(response.body, encoding) if encoding else None
+        if compressed is not None:
+            response.body = compressed
+            response.headers['Content-Encoding'] = encoding
+            response.headers['Content-Length'] = str(len(compressed))
+        return response
+
+    async def respond(self, request, data, status=200):
+        # Large lists are CPU-bound to serialize, encode and compress; keep that off the event loop
+        return await run_in_threadpool(self.render_compressed, data, status, request.headers.get('Accept-Encoding'))
+
+    def identity(self, request):
+        """
+        Verifies the request's access token with Flask-JWT-Extended's own
+        decoder. Returns (identity, None) or (None, error response).
+        """
+        from flask_jwt_extended import decode_token
+        from flask_jwt_extended.exceptions import JWTExtendedException
+        from jwt import ExpiredSignatureError, InvalidTokenError
+
+        header = request.headers.get('Authorization')
+        if not header:
+            return None, self.render({'msg': 'Missing Authorization Header'}, 401)
+        scheme, _, token = header.partition(' ')
+        if scheme != 'Bearer' or not token:
+            return None, self.render({'msg': "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'"}, 422)
+        try:
+            with self.flask_app.app_context():
+                decoded = decode_token(token)
+        except ExpiredSignatureError:
+            return None, self.render({'msg': 'Token has expired'}, 401)
+        except (InvalidTokenError, JWTExtendedException) as e:
+            return None, self.render({'msg': str(e)}, 422)
+        if decoded.get('type') != 'access':
+            return None, self.render({'msg': 'Only non-refresh tokens are allowed'}, 422)
+        return decoded[self.flask_app.config.get('JWT_IDENTITY_CLAIM', 'sub')], None
+
+
+# Query functions: plain sync ORM code, run inside AsyncSession.run_sync.
+# Loader profiles are the Flask routes' own, without strict raiseloads, and
+# load everything to_dict() reads, so they return the rows with a function
+# that serializes them later, off the event loop. Plain data is for errors.
+
+def _feed(session):
+    from .models.post import Post
+
+    posts = session.scalars(
+        select(Post).options(*load_profile('post_list', strict=False)).order_by(Post.created_at.desc())
+    ).all()
+    return lambda: [post.to_dict() for post in posts], 200
+
+
+async def _club_posts(session, club_id, query_params, page_size):
+    from .models.club import Club
+    from .models.post import Post
+    from .utils.archive import InvalidCursor, page_args, post_reader
+
+    if await session.get(Club, club_id) is None:
+        return {'message': 'Club not found'}, 404
+    try:
+        limit, before = page_args(query_params, page_size)
+    except InvalidCursor:
+        return {'message': 'Invalid cursor'}, 400
+    statement = select(Post).options(*load_profile('post_list', strict=False)).filter_by(club_id=club_id)
+    if limit is None:
+        statement = statement.order_by(Post.created_at.desc())
+
+    # read_posts, with its database steps on the session and the rest in the threadpool
+    steps = post_reader(statement, 'clubs', club_id, limit, before)
+    result = None
+    while True:
+        try:
+            needs_session, step = steps.send(result)
+        except StopIteration as done:
+            posts, next_cursor = done.value
+            break
+        result = await (session.run_sync(step) if needs_session else run_in_threadpool(step))
+    return posts, 200, {'X-Next-Cursor': next_cursor} if next_cursor else {}
+
+
+def _clubs(session):
+    from .models.club import Club
+
+    clubs = session.scalars(select(Club).options(*load_profile('club_list', strict=False))).all()
+    return lambda: [club.to_dict() for club in clubs], 200
+
+
+def _club(session, club_id):
+    from .models.club import Club
+
+    club = session.get(Club, club_id, options=load_profile('club_detail', strict=False))
+    if club is None:
+        return {'message': 'Club not found'}, 404
+    return club.to_dict, 200
+
+
+def _movies(session):
+    from .models.movie import Movie
+
+    movies = session.scalars(select(Movie).options(*load_profile('movie_list', strict=False))).all()
+    return lambda: [movie.to_dict() for movie in movies], 200
+
+
+def _movie(session, movie_id):
+    from .models.movie import Movie
+
+    movie = session.get(Movie, movie_id, options=load_profile('movie_detail', strict=False))
+    if movie is None:
+        return {'message': 'Movie not found'}, 404
+    return movie.to_dict, 200
+
+
+def _post_comments(session, post_id):
+    from .models.post import Post
+
+    post = session.get(Post, post_id, options=load_profile('post_comments', strict=False))
+    if post is None:
+        return {'message': 'Post not found'}, 404
+    return lambda: [comment.to_dict() for comment in post.comments], 200
+
+
+def _endpoint(query, *path_params, auth=False, paged=False):
+    async def endpoint(request):
+        tier = request.app.state.tier
+        identity = None
+        if auth or tier.replicas:
+            # Public routes only need the caller to keep a user who just wrote on the primary
+            identity, error = tier.identity(request)
+            if auth and error is not None:
+                return error
+        args = [request.path_params[name] for name in path_params]
+        if paged:
+            # ?limit= and ?cursor=, read like the Flask route reads them
+            args += [request.query_params, tier.flask_app.config.get('POSTS_PAGE_SIZE', 100)]
+        async with await tier.session(identity) as session:
+            if inspect.iscoroutinefunction(query):
+                data, status, *headers = await query(session, *args)
+            else:
+                data, status, *headers = await session.run_sync(query, *args)
+        response = await tier.respond(request, data, status)
+        if headers:
+            response.headers.update(headers[0])
+        return response
+    endpoint.__name__ = query.__name__.lstrip('_')
+    return endpoint
+
+
+ROUTES = [
+    Route('/posts/feed', _endpoint(_feed, auth=True), methods=['GET']),
+    Route('/posts/clubs/{club_id:int}/posts', _endpoint(_club_posts, 'club_id', paged=True), methods=['GET']),
+    Route('/posts/{post_id:int}/comments', _endpoint(_post_comments, 'post_id'), methods=['GET']),
+    Route('/clubs/', _endpoint(_clubs), methods=['GET']),
+    Route('/clubs/{club_id:int}', _endpoint(_club, 'club_id'), methods=['GET']),
+    Route('/movies/', _endpoint(_movies), methods=['GET']),
+    Route('/movies/{movie_id:int}', _endpoint(_movie, 'movie_id'), methods=['GET']),
+]
+
+
+def create_asgi_app(flask_app=None):
+    """Builds the Starlette read tier around `flask_app` (a fresh create_app() by default)."""
+    tier = ReadTier(flask_app or create_app())
+
+    async def not_found(request, error):
+        if error.status_code == 404:
+            return tier.render({'errors': ['Not Found']}, 404)
+        return tier.render({'message': error.detail}, error.status_code)
+
+    async def pool_exhausted(request, error):
+        logger.warning("Connection pool exhausted on %s %s: %s", request.method, request.url.path, error)
+        response = tier.render({'message': 'Service busy, please retry'}, 503)
+        response.headers['Retry-After'] = '1'
+        return response
+
+    async def unexpected_error(request, error):
+        logger.exception("Unhandled %s on %s %s", type(error).__name__, request.method, request.url.path,
+                         exc_info=error)
+        return tier.render({'message': f'Unexpected error: {str(error)}'}, 500)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await tier.dispose()
+
+    app = Starlette(
+        routes=ROUTES,
+        middleware=[
+            # Same policy as the Flask app's CORS(...) setup
+            Middleware(CORSMiddleware, allow_origins=['http://localhost:3000'], allow_credentials=True,
+                       allow_methods=['*'], allow_headers=['*'], expose_headers=['X-Next-Cursor']),
+        ],
+        exception_handlers={
+            HTTPException: not_found,
+            exc.TimeoutError: pool_exhausted,
+            Exception: unexpected_error,
+        },
+        lifespan=lifespan,
+    )
+    app.state.tier = tier
+    return app
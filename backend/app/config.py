@@ -2,9 +2,115 @@ from datetime import timedelta
 
 import os
 
+
+def _database_url():
+    url = os.getenv("DATABASE_URL", "sqlite:///movies.db")
+    # Render/Heroku hand out postgres:// URLs, which SQLAlchemy 1.4+ no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _engine_options(url):
+    """
+    Pool profile sized to the gunicorn worker count so that
+    workers * (pool_size + max_overflow) never exceeds DB_MAX_CONNECTIONS.
+    A short pool_timeout makes an exhausted pool fail fast with a 503 instead
+    of every worker queueing behind one slow query.
+    """
+    if url.startswith('sqlite'):
+        return {}
+
+    workers = int(os.getenv('WEB_CONCURRENCY', 4))
+    threads = int(os.getenv('GUNICORN_THREADS', 1))
+    budget = int(os.getenv('DB_MAX_CONNECTIONS', 40))
+    per_worker = max(1, budget // max(1, workers))
+    pool_size = int(os.getenv('DB_POOL_SIZE', min(per_worker, threads + 1)))
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', max(0, per_worker - pool_size))),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 2)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,  # Lets idle surplus connections age out and be recycled
+        'query_cache_size': int(os.getenv('DB_QUERY_CACHE_SIZE', 1200)),
+    }
+
+    if url.startswith('postgresql'):
+        # Server-side defaults for every connection; requests narrow them per
+        # transaction with SET LOCAL (see app/utils/engine.py)
+        server_options = ' '.join((
+            f"-c statement_timeout={int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 30000))}",
+            f"-c lock_timeout={int(os.getenv('DB_LOCK_TIMEOUT_MS', 5000))}",
+            f"-c idle_in_transaction_session_timeout={int(os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT_MS', 60000))}",
+        ))
+        connect_args = {
+            'options': server_options,
+            'application_name': os.getenv('DB_APPLICATION_NAME', 'movieclub-backend'),
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+        }
+        if url.startswith('postgresql+psycopg:'):
+            # psycopg 3 prepares a statement server-side after it ran this many times
+            connect_args['prepare_threshold'] = int(os.getenv('DB_PREPARE_THRESHOLD', 5))
+        options['connect_args'] = connect_args
+    return options
+
+
+def _events_max_streams():
+    """
+    Default EVENTS_MAX_STREAMS. An open stream holds a thread (or greenlet)
+    for up to EVENTS_STREAM_MAX_SECONDS, well past gunicorn's timeout, so
+    streams need gthread or gevent workers: a sync worker's only thread
+    would be killed mid-stream, so there it is 0 and streams get a 503.
+    """
+    threads = int(os.getenv('GUNICORN_THREADS', 1))
+    if not os.getenv('SERVER_SOFTWARE', '').startswith('gunicorn'):
+        # The threaded development server, tests
+        return max(1, threads // 2)
+    # Chosen as gunicorn.conf.py chooses it
+    worker_class = os.getenv('GUNICORN_WORKER_CLASS') or ('gthread' if threads > 1 else 'sync')
+    if worker_class == 'gevent':
+        return int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100)) // 2
+    if threads <= 1:
+        return 0
+    return threads // 2
+
+
+def _replica_binds():
+    """Maps replica bind keys to URLs from DATABASE_REPLICA_URLS (comma-separated)."""
+    urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    return {
+        f'replica_{index}': 'postgresql://' + url[len('postgres://'):] if url.startswith('postgres://') else url
+        for index, url in enumerate(urls, start=1)
+    }
+
+
 class Config:
-    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///movies.db")
+    SQLALCHEMY_DATABASE_URI = _database_url()
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    # Read replicas: GET requests are routed to these binds (see app/utils/replicas.py)
+    SQLALCHEMY_BINDS = _replica_binds()
+    SQLALCHEMY_REPLICA_BINDS = tuple(SQLALCHEMY_BINDS)
+    # After a write, that user's reads stay on the primary for this long
+    REPLICA_STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Async read tier (app/async_tier.py): one event loop multiplexes many
+    # requests over this pool, so it is sized independently of the gunicorn
+    # pools. Waiting for a connection only parks a coroutine there, so the
+    # checkout timeout can be far longer than DB_POOL_TIMEOUT.
+    ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', 10))
+    ASYNC_DB_MAX_OVERFLOW = int(os.getenv('ASYNC_DB_MAX_OVERFLOW', 10))
+    ASYNC_DB_POOL_TIMEOUT = float(os.getenv('ASYNC_DB_POOL_TIMEOUT', 30))
+
+    # Per-transaction timeouts (Postgres). Reads are kept short so one slow
+    # query can't hold a pooled connection for long; writes get more room and
+    # requestless batch jobs (CLI commands) the most. 0 disables the limit.
+    STATEMENT_TIMEOUT_READ_MS = int(os.getenv('STATEMENT_TIMEOUT_READ_MS', 3000))
+    STATEMENT_TIMEOUT_WRITE_MS = int(os.getenv('STATEMENT_TIMEOUT_WRITE_MS', 10000))
+    STATEMENT_TIMEOUT_BATCH_MS = int(os.getenv('STATEMENT_TIMEOUT_BATCH_MS', 300000))
+    LOCK_TIMEOUT_MS = int(os.getenv('LOCK_TIMEOUT_MS', 2000))
+    LOCK_TIMEOUT_BATCH_MS = int(os.getenv('LOCK_TIMEOUT_BATCH_MS', 30000))
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
     JWT_TOKEN_LOCATION = ['headers']
@@ -16,3 +122,136 @@ class Config:
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER')
+
+    # Logging: JSON lines on stdout via a background thread. LOG_LEVELS sets
+    # per-module levels, e.g. "app.routes=DEBUG,sqlalchemy.engine=WARNING".
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 10))  # Records/second per message below WARNING
+    LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 20))
+
+    # Response compression (app/utils/compression.py). Codings are offered in
+    # this order when the client has no preference; zstd/br need their modules.
+    # Higher levels trade CPU for bandwidth: gzip 1-9, brotli 0-11, zstd 1-22.
+    COMPRESS_ALGORITHMS = os.getenv('COMPRESS_ALGORITHMS', 'zstd,br,gzip')  # Empty disables compression
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))  # Bytes
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', 4))
+    COMPRESS_ZSTD_LEVEL = int(os.getenv('COMPRESS_ZSTD_LEVEL', 3))
+
+    # Raise on any relationship lazy load that a route's loader profile
+    # (app/utils/loading.py) didn't plan for. Meant for development, tests and
+    # benchmarks, where it pins each endpoint's query count.
+    LOADER_STRICT = os.getenv('LOADER_STRICT', 'False').lower() in ('true', '1', 't')
+
+    # Replace SerializerMixin's reflective to_dict() with functions compiled at
+    # startup (app/utils/serializers.py). Output is identical either way.
+    SERIALIZERS_COMPILED = os.getenv('SERIALIZERS_COMPILED', 'True').lower() in ('true', '1', 't')
+
+    # Server-sent events (app/utils/events.py). Streams resume from the last
+    # EVENTS_BUFFER_SIZE events; EVENTS_REDIS_URL fans publishes out to every
+    # worker. Each open stream holds a thread, so streams need gthread or gevent
+    # workers: EVENTS_MAX_STREAMS per process defaults to half of GUNICORN_THREADS
+    # (or of GUNICORN_WORKER_CONNECTIONS under gevent), and to 0 under sync
+    # workers, where every stream gets a 503.
+    EVENTS_REDIS_URL = os.getenv('EVENTS_REDIS_URL') or os.getenv('REDIS_URL')
+    EVENTS_BUFFER_SIZE = int(os.getenv('EVENTS_BUFFER_SIZE', 1000))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', 15))
+    EVENTS_STREAM_MAX_SECONDS = float(os.getenv('EVENTS_STREAM_MAX_SECONDS', 300))
+    EVENTS_MAX_STREAMS = int(os.getenv('EVENTS_MAX_STREAMS', _events_max_streams()))
+
+    # Computed-value cache (app/utils/cache.py), shared by all workers through
+    # Redis when CACHE_REDIS_URL is set, else per process (single-worker
+    # setups only: evictions and replica pins wouldn't reach other workers).
+    # User summaries are evicted on the writes that change them and expire
+    # after USER_SUMMARY_CACHE_SECONDS regardless.
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL') or os.getenv('REDIS_URL')
+    CACHE_LOCAL_SIZE = int(os.getenv('CACHE_LOCAL_SIZE', 10000))
+    USER_SUMMARY_CACHE_SECONDS = float(os.getenv('USER_SUMMARY_CACHE_SECONDS', 60))
+
+    # POST /batch (app/routes/batch_routes.py): sub-requests allowed per batch
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+
+    # Delta sync (app/routes/sync_routes.py) reads change_log. Tokens never move
+    # past changes younger than SYNC_SETTLE_SECONDS, which covers transactions
+    # committing out of id order. `flask prune-change-log` keeps
+    # SYNC_RETENTION_DAYS; older tokens get a 410 and resync in full.
+    SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', 500))
+    SYNC_SETTLE_SECONDS = float(os.getenv('SYNC_SETTLE_SECONDS', 5))
+    SYNC_RETENTION_DAYS = int(os.getenv('SYNC_RETENTION_DAYS', 30))
+
+    # Cold-post archive (app/utils/archive.py). `flask archive-posts` moves posts
+    # older than ARCHIVE_AFTER_DAYS into compressed segments in ARCHIVE_DIR
+    # (default <instance>/archive; every host serving the API must see the same
+    # directory). The club and user post lists read through to it in pages of at
+    # most POSTS_PAGE_SIZE when the client sends ?limit= or ?cursor=; without
+    # either they return the live posts and a cursor to the archived ones.
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR')
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_COMPRESSION = os.getenv('ARCHIVE_COMPRESSION', 'zstd')  # zstd or gzip
+    ARCHIVE_FRAME_POSTS = int(os.getenv('ARCHIVE_FRAME_POSTS', 256))
+    POSTS_PAGE_SIZE = int(os.getenv('POSTS_PAGE_SIZE', 100))
+
+    # Personal data export, GET /users/<id>/export (app/utils/export.py). Each
+    # one streams from a server-side cursor and holds a pooled connection until
+    # the download finishes, so only EXPORT_MAX_CONCURRENT run per process.
+    EXPORT_MAX_CONCURRENT = int(os.getenv('EXPORT_MAX_CONCURRENT', 2))
+    EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 1000))  # Rows per cursor fetch
+    EXPORT_CHUNK_BYTES = int(os.getenv('EXPORT_CHUNK_BYTES', 64 * 1024))
+
+    # Trending posts and clubs (app/utils/trending.py). Post score: points /
+    # (age_hours + 2) ** TRENDING_GRAVITY; club score: recent posts and joins,
+    # halving every TRENDING_CLUB_HALF_LIFE_HOURS. Run `flask decay-trending`
+    # every few minutes; nothing older than TRENDING_WINDOW_HOURS trends.
+    TRENDING_GRAVITY = float(os.getenv('TRENDING_GRAVITY', 1.8))
+    TRENDING_LIKE_POINTS = float(os.getenv('TRENDING_LIKE_POINTS', 1))
+    TRENDING_COMMENT_POINTS = float(os.getenv('TRENDING_COMMENT_POINTS', 2))
+    TRENDING_CLUB_POST_POINTS = float(os.getenv('TRENDING_CLUB_POST_POINTS', 1))
+    TRENDING_CLUB_JOIN_POINTS = float(os.getenv('TRENDING_CLUB_JOIN_POINTS', 2))
+    TRENDING_CLUB_HALF_LIFE_HOURS = float(os.getenv('TRENDING_CLUB_HALF_LIFE_HOURS', 24))
+    TRENDING_WINDOW_HOURS = float(os.getenv('TRENDING_WINDOW_HOURS', 72))
+    TRENDING_PAGE_SIZE = int(os.getenv('TRENDING_PAGE_SIZE', 20))  # Default ?limit=, capped at 100
+
+    # Popular movies, GET /movies/popular (app/utils/popularity.py), read from
+    # the movie_popularity daily rollup that watchlist writes keep current.
+    # Run `flask rebuild-movie-popularity` after bulk-loading watchlists.
+    POPULAR_MOVIES_CACHE_SECONDS = int(os.getenv('POPULAR_MOVIES_CACHE_SECONDS', 60))
+    POPULAR_MOVIES_PAGE_SIZE = int(os.getenv('POPULAR_MOVIES_PAGE_SIZE', 20))  # Default ?limit=, capped at 100
+
+    # Poster thumbnails, GET /movies/<id>/thumbnail (app/utils/thumbnails.py).
+    # Originals live in POSTER_DIR (default <instance>/posters): path poster_urls
+    # are relative to it, http(s) ones are downloaded into it by
+    # `flask fetch-posters`. Variants are cached in THUMBNAIL_DIR (default
+    # <instance>/thumbnails), least recently used first out past THUMBNAIL_CACHE_MB.
+    POSTER_DIR = os.getenv('POSTER_DIR')
+    THUMBNAIL_DIR = os.getenv('THUMBNAIL_DIR')
+    THUMBNAIL_CACHE_MB = int(os.getenv('THUMBNAIL_CACHE_MB', 512))
+    THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', 80))  # WebP and JPEG quality, 1-100
+    THUMBNAIL_MAX_AGE = int(os.getenv('THUMBNAIL_MAX_AGE', 86400))  # Cache-Control max-age, seconds
+    POSTER_FETCH_MAX_MB = int(os.getenv('POSTER_FETCH_MAX_MB', 10))
+    POSTER_FETCH_TIMEOUT = float(os.getenv('POSTER_FETCH_TIMEOUT', 10))  # Seconds per download
+
+    # Post-to-movie links, posts.movie_id (app/utils/movie_links.py), behind
+    # GET /movies/<id>/posts. Set on new posts; `flask link-post-movies` links
+    # older ones and should run after movies are added. Fuzzy matches need a
+    # similarity of at least MOVIE_MATCH_CUTOFF (0-1). Each worker sees other
+    # workers' new movies within MOVIE_MATCHER_TTL seconds.
+    MOVIE_MATCH_CUTOFF = float(os.getenv('MOVIE_MATCH_CUTOFF', 0.85))
+    MOVIE_MATCHER_TTL = int(os.getenv('MOVIE_MATCHER_TTL', 300))
+
+    # Prometheus metrics on /metrics (app/utils/metrics.py). Under gunicorn also
+    # set PROMETHEUS_MULTIPROC_DIR so a scrape sums every worker's samples.
+    # With METRICS_TOKEN set, scrapes must send it as a Bearer token; with
+    # METRICS_REQUIRE_TOKEN (on when FLASK_ENV=production) and no token,
+    # /metrics is not served at all.
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() in ('true', '1', 't')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    METRICS_REQUIRE_TOKEN = os.getenv(
+        'METRICS_REQUIRE_TOKEN', str(os.getenv('FLASK_ENV') == 'production')
+    ).lower() in ('true', '1', 't')
+
+    # Slow-query log: statements slower than this (in ms) are logged, aggregated by
+    # fingerprint and EXPLAINed in the background. Set to -1 to disable.
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'True').lower() in ('true', '1', 't')
+    SLOW_QUERY_REPORT_DIR = os.getenv('SLOW_QUERY_REPORT_DIR')  # Defaults to <instance>/slow_queries
@@ -0,0 +1,29 @@
+# backend/app/models/change_log.py
+from app import db
+from datetime import datetime
+
+class ChangeLog(db.Model):
+    """
+    One row per insert, update or delete of a synced row (posts, comments,
+    watchlist items), written in the same transaction by app/utils/changes.py.
+    The id is the delta-sync cursor; club_id and user_id are the scopes the
+    change is visible in. No foreign keys: tombstones outlive their rows.
+    """
+    __tablename__ = 'change_log'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False) # 'post', 'comment' or 'watchlist'
+    entity_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(10), nullable=False) # 'upsert' or 'delete'
+    club_id = db.Column(db.Integer)
+    user_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_change_log_club_id_id', 'club_id', 'id'),
+        db.Index('ix_change_log_user_id_id', 'user_id', 'id'),
+        db.Index('ix_change_log_created_at', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<ChangeLog {self.id} {self.op} {self.entity} {self.entity_id}>'
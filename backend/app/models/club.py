@@ -13,6 +13,8 @@ class Club(BaseModelMixin, SerializerMixin, db.Model):
     genre = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Maintained by app/utils/trending.py; not part of to_dict()
+    trending_score = db.Column(db.Float, nullable=False, default=0, server_default='0', index=True)
 
     # REMOVED: created_by_user_id column
     # created_by_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -20,12 +22,13 @@ class Club(BaseModelMixin, SerializerMixin, db.Model):
     # Relationships
     # REMOVED: creator relationship
     # creator = db.relationship('User', back_populates='clubs_created')
-    members = db.relationship('ClubMember', back_populates='club', lazy=True, cascade='all, delete-orphan')
-    posts = db.relationship('Post', back_populates='club', lazy=True, cascade='all, delete-orphan') 
+    members = db.relationship('ClubMember', back_populates='club', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    posts = db.relationship('Post', back_populates='club', lazy=True, cascade='all, delete-orphan', passive_deletes=True) 
 
     serialize_rules = (
         '-created_at', 
         '-updated_at',
+        '-trending_score',
         # REMOVED: '-creator.password_hash',
         '-members.club', # Prevent recursion
         '-posts.club',   # Prevent recursion when serializing posts
@@ -39,8 +42,8 @@ class Club(BaseModelMixin, SerializerMixin, db.Model):
             'name': self.name,
             'description': self.description,
             'genre': self.genre,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
             # REMOVED: 'created_by_user_id': self.created_by_user_id,
             # REMOVED: 'creator_username': self.creator.username if self.creator else None,
             'member_count': len(self.members) # Include member count
@@ -6,8 +6,8 @@ class ClubMember(BaseModelMixin, SerializerMixin, db.Model):
     __tablename__ = 'club_members'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id', ondelete='CASCADE'), nullable=False, index=True)
 
     # Ensure a user can only be a member of a club once
     __table_args__ = (db.UniqueConstraint('user_id', 'club_id', name='_user_club_uc'),)
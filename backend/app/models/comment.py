@@ -5,8 +5,8 @@ from datetime import datetime
 class Comment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # NEW: Define the relationships with User and Post models
@@ -27,5 +27,5 @@ class Comment(db.Model):
             'user_id': self.user_id,
             'username': username, 
             'post_id': self.post_id,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
@@ -4,8 +4,8 @@ from datetime import datetime
 
 class Like(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     # NEW: Define the relationships with User and Post models
@@ -25,5 +25,5 @@ class Like(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'post_id': self.post_id,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at
         }
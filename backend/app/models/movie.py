@@ -14,8 +14,8 @@ class Movie(BaseModelMixin, SerializerMixin, db.Model):
     poster_url = db.Column(db.String(500)) 
 
     # Relationships
-    reviews = db.relationship('Review', back_populates='movie', lazy=True, cascade='all, delete-orphan')
-    watchlists = db.relationship('Watchlist', back_populates='movie', lazy=True, cascade='all, delete-orphan')
+    reviews = db.relationship('Review', back_populates='movie', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    watchlists = db.relationship('Watchlist', back_populates='movie', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     serialize_rules = (
         '-created_at',
@@ -0,0 +1,29 @@
+# backend/app/models/movie_popularity.py
+from app import db
+
+
+class MoviePopularity(db.Model):
+    """
+    Net watchlist additions per movie, status and UTC day: +1 when an item
+    enters a status, -1 when it leaves it or is removed. Summed over every
+    day, a movie's rows are its current watchlist counts; summed over the
+    last week, its movement that week. Maintained by app/utils/popularity.py
+    in the same transaction as the watchlist change.
+    """
+    __tablename__ = 'movie_popularity'
+
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(50), nullable=False)
+    genre = db.Column(db.String(100)) # The movie's, copied so genre leaderboards skip the join
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('day', 'movie_id', 'status', name='_movie_popularity_day_movie_status_uc'),
+        db.Index('ix_movie_popularity_genre_day', 'genre', 'day'),
+        db.Index('ix_movie_popularity_movie_id', 'movie_id'),
+    )
+
+    def __repr__(self):
+        return f'<MoviePopularity {self.day} Movie:{self.movie_id} {self.status} {self.count:+d}>'
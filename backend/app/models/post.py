@@ -9,25 +9,42 @@ class Post(BaseModelMixin, SerializerMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     movie_title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    club_id = db.Column(db.Integer, db.ForeignKey('clubs.id', ondelete='CASCADE'), nullable=False)
+    # Maintained by app/utils/trending.py; not part of to_dict()
+    trending_points = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    trending_score = db.Column(db.Float, nullable=False, default=0, server_default='0', index=True)
+    # The Movie movie_title names, if any; set by app/utils/movie_links.py, not part of to_dict()
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='SET NULL'))
+
+    __table_args__ = (
+        # GET /movies/<id>/posts, newest first
+        db.Index('ix_posts_movie_id_created_at', 'movie_id', 'created_at'),
+        # The club posts keyset pages; also what the clubs.id cascade looks rows up by
+        db.Index('ix_posts_club_id_created_at_id', 'club_id', 'created_at', 'id'),
+    )
 
     # Relationships
     # Ensure back_populates matches the relationship name in User ('posts')
     author = db.relationship('User', back_populates='posts', foreign_keys=[user_id])
     club = db.relationship('Club', back_populates='posts')
 
-    likes = db.relationship('Like', back_populates='post', lazy=True, cascade="all, delete-orphan")
-    comments = db.relationship('Comment', back_populates='post', lazy=True, cascade="all, delete-orphan")
+    # Likes and comments go with the post via ON DELETE CASCADE; passive_deletes
+    # keeps the ORM from loading them just to delete them one by one
+    likes = db.relationship('Like', back_populates='post', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
+    comments = db.relationship('Comment', back_populates='post', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     # FIX: Add serialize_rules to prevent recursion and control what SerializerMixin does.
     # We explicitly exclude all relationships here and rely on to_dict() for nested data.
     serialize_rules = (
         '-created_at',
         '-updated_at',
+        '-trending_points',
+        '-trending_score',
+        '-movie_id',
         '-author',   # Exclude the 'author' relationship
         '-club',     # Exclude the 'club' relationship
         '-likes',    # Exclude the 'likes' relationship (we'll handle it manually in to_dict)
@@ -42,8 +59,8 @@ class Post(BaseModelMixin, SerializerMixin, db.Model):
             'content': self.content,
             'user_id': self.user_id,
             'club_id': self.club_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
         }
         
         if self.author:
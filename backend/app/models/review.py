@@ -9,8 +9,8 @@ class Review(BaseModelMixin, SerializerMixin, db.Model):
     rating = db.Column(db.Integer, nullable=False)
     comment = db.Column(db.Text)
     
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), nullable=False, index=True)
 
     user = db.relationship('User', back_populates='reviews', foreign_keys=[user_id])
     movie = db.relationship('Movie', back_populates='reviews', foreign_keys=[movie_id])
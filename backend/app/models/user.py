@@ -22,29 +22,32 @@ class User(BaseModelMixin, SerializerMixin):
     reset_token = db.Column(db.String(128), unique=True, nullable=True)
     reset_token_expires_at = db.Column(db.DateTime, nullable=True)
 
-    # Relationships
-    posts = db.relationship('Post', back_populates='author', lazy=True, cascade='all, delete-orphan')
-    likes = db.relationship('Like', back_populates='user', lazy=True, cascade='all, delete-orphan')
-    comments = db.relationship('Comment', back_populates='user', lazy=True, cascade='all, delete-orphan')
-    club_memberships = db.relationship('ClubMember', back_populates='user', lazy=True, cascade='all, delete-orphan')
+    # Relationships. The database deletes the children (ON DELETE CASCADE),
+    # so deleting a user doesn't load them first (passive_deletes)
+    posts = db.relationship('Post', back_populates='author', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    likes = db.relationship('Like', back_populates='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    comments = db.relationship('Comment', back_populates='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
+    club_memberships = db.relationship('ClubMember', back_populates='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
     following = db.relationship(
         'Follow',
         primaryjoin="User.id == Follow.follower_id",
         back_populates='follower',
         lazy='dynamic',
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
     followers = db.relationship(
         'Follow',
         primaryjoin="User.id == Follow.followed_id",
         back_populates='followed',
         lazy='dynamic',
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
-    watchlists = db.relationship('Watchlist', back_populates='user', lazy=True, cascade='all, delete-orphan')
+    watchlists = db.relationship('Watchlist', back_populates='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
     
-    reviews = db.relationship('Review', back_populates='user', lazy=True, cascade='all, delete-orphan')
+    reviews = db.relationship('Review', back_populates='user', lazy=True, cascade='all, delete-orphan', passive_deletes=True)
 
     # Serialization rules (simplified to avoid recursion with SerializerMixin)
     serialize_rules = (
@@ -9,8 +9,8 @@ class Watchlist(BaseModelMixin, SerializerMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Foreign Keys
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    movie_id = db.Column(db.Integer, db.ForeignKey('movies.id', ondelete='CASCADE'), nullable=False, index=True)
 
     # NEW COLUMNS: These were missing and are causing the TypeError
     movie_title = db.Column(db.String(255), nullable=False) # Title of the movie/post
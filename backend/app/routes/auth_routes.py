@@ -4,10 +4,12 @@ from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identi
 from datetime import datetime, timedelta
 import secrets
 import os # NEW: Import os for environment variables
-from flask_mail import Message # Import Message for email content
 from .. import db, bcrypt, mail # Corrected: Import db, bcrypt, mail objects from app/__init__.py
 
 from ..models.user import User
+import logging
+
+logger = logging.getLogger(__name__)
 
 class UserRegistration(Resource):
     """
@@ -115,9 +117,9 @@ class ForgotPassword(Resource):
             reset_link = f"http://localhost:3000/reset-password?token={reset_token}" # Adjust this URL to your frontend's reset page
 
             try:
-                msg = Message("Password Reset Request for CineClub",
-                              sender=os.getenv('MAIL_DEFAULT_SENDER'), # Use default sender from config
-                              recipients=[user.email])
+                msg = mail.message("Password Reset Request for CineClub",
+                                   sender=os.getenv('MAIL_DEFAULT_SENDER'), # Use default sender from config
+                                   recipients=[user.email])
                 msg.body = f"""
                 To reset your password, visit the following link:
                 {reset_link}
@@ -125,13 +127,12 @@ class ForgotPassword(Resource):
                 If you did not make this request then please ignore this email.
                 """
                 mail.send(msg)
-                print(f"DEBUG: Password reset email sent to {user.email}")
-            except Exception as e:
-                print(f"ERROR: Failed to send email: {e}")
+                logger.info("Password reset email sent to user %s", user.id)
+            except Exception:
+                logger.exception("Failed to send password reset email to user %s", user.id)
                 # Log the error, but still return success to frontend for security
                 return {'message': 'An error occurred while sending the email. Please try again later.'}, 500
             
-            print(f"DEBUG: Password reset link generated for {user.email}: {reset_link}") # For development
             return {'message': 'If an account with that email exists, a password reset link has been sent.'}, 200
         else:
             # If user not found, still return success for security
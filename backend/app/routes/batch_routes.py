@@ -0,0 +1,105 @@
+from contextvars import ContextVar
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import event
+from werkzeug.test import EnvironBuilder
+from .. import db
+
+batch_bp = Blueprint('batch_bp', __name__)
+
+METHODS = frozenset(('GET', 'POST', 'PUT', 'PATCH', 'DELETE'))
+# Shared with every sub-request: who is calling, and their cookies
+FORWARDED_HEADERS = ('Authorization', 'Cookie', 'X-Request-ID')
+# Streams never finish (or are downloads) and batches don't nest
+NOT_BATCHABLE = frozenset((
+    'batch_bp.batch', 'event_bp.club_events', 'event_bp.user_events', 'user_bp.export_user_data',
+    'movie_bp.get_movie_thumbnail', 'metrics',
+))
+
+# Rows loaded while a batch runs. The identity map only holds weak
+# references, so without these a user loaded by one sub-request would be
+# gone, and queried again, by the next.
+_pinned = ContextVar('batch_pinned', default=None)
+
+
+def _pin_loaded(session, instance):
+    pinned = _pinned.get()
+    if pinned is not None:
+        pinned.append(instance)
+
+
+@batch_bp.record_once
+def _listen_for_loads(state):
+    if not event.contains(db.session, 'loaded_as_persistent', _pin_loaded):
+        event.listen(db.session, 'loaded_as_persistent', _pin_loaded)
+
+
+def _error(status, message):
+    return {'status': status, 'body': {'message': message}}
+
+
+def _dispatch(app, method, path, body, headers):
+    """
+    Runs one sub-request through routing, its view and the error handlers.
+    The app context (so g and the DB session) is the batch's own; the
+    before/after_request hooks ran once for the batch and don't run again.
+    """
+    environ = EnvironBuilder(
+        path=path, method=method, json=body, headers=headers,
+        environ_base={'REMOTE_ADDR': request.remote_addr},
+    ).get_environ()
+    with app.request_context(environ):
+        if request.endpoint in NOT_BATCHABLE:
+            return _error(400, f'{method} {path} cannot be batched')
+        try:
+            response = app.make_response(app.dispatch_request())
+        except Exception as error:
+            response = app.make_response(app.handle_user_exception(error))
+        if response.is_streamed:
+            response.close()
+            return _error(400, f'{method} {path} cannot be batched')
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True) or None
+        return {'status': response.status_code, 'body': body}
+
+
+@batch_bp.route('/batch', methods=['POST'])
+def batch():
+    """
+    Serves several API calls in one round trip, e.g. a profile page:
+
+        POST /batch
+        {"requests": [{"method": "GET", "path": "/users/1"},
+                      {"method": "GET", "path": "/users/1/clubs"},
+                      {"method": "POST", "path": "/posts/5/comments", "body": {"content": "Nice"}}]}
+
+    Sub-requests run in order with the batch's Authorization header, sharing
+    one DB session (rows loaded by one are identity-map hits for the next)
+    and one pooled connection. Each keeps its own route's auth checks and
+    commits, so a failing one doesn't undo the others. The response lists
+    {"status", "body"} per sub-request, in order; at most BATCH_MAX_REQUESTS.
+    """
+    data = request.get_json(silent=True)
+    subrequests = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(subrequests, list) or not subrequests:
+        return jsonify({"message": "Expected a JSON body with a non-empty 'requests' list"}), 400
+    limit = current_app.config.get('BATCH_MAX_REQUESTS', 20)
+    if len(subrequests) > limit:
+        return jsonify({"message": f"A batch may hold at most {limit} requests"}), 400
+
+    app = current_app._get_current_object()
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    responses = []
+    pinned = _pinned.set([])
+    try:
+        for sub in subrequests:
+            method = str(sub.get('method', 'GET')).upper() if isinstance(sub, dict) else None
+            path = sub.get('path') if isinstance(sub, dict) else None
+            if method not in METHODS or not isinstance(path, str) or not path.startswith('/'):
+                responses.append(_error(400, "Each request needs a 'path' starting with / and a valid 'method'"))
+                continue
+            responses.append(_dispatch(app, method, path, sub.get('body'), headers))
+    finally:
+        _pinned.reset(pinned)
+    return jsonify({'responses': responses}), 200
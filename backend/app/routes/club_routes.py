@@ -1,9 +1,13 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from .. import db
 from ..models.club import Club
 from ..models.club_member import ClubMember
 from ..models.user import User 
+from ..utils.loading import load_profile
+import logging
+
+logger = logging.getLogger(__name__)
 
 club_bp = Blueprint('club_bp', __name__)
 
@@ -13,7 +17,20 @@ def get_all_clubs():
     """
     Retrieves a list of all clubs.
     """
-    clubs = Club.query.all()
+    clubs = Club.query.options(*load_profile('club_list')).all()
+    return jsonify([club.to_dict() for club in clubs]), 200
+
+@club_bp.route('/trending', methods=['GET'])
+def get_trending_clubs():
+    """
+    Clubs with the most recent posts and joins, best first. ?limit= up to
+    100, TRENDING_PAGE_SIZE by default.
+    """
+    limit = min(max(request.args.get('limit', current_app.config.get('TRENDING_PAGE_SIZE', 20), type=int), 1), 100)
+    clubs = (
+        Club.query.options(*load_profile('club_list'))
+        .filter(Club.trending_score > 0).order_by(Club.trending_score.desc()).limit(limit).all()
+    )
     return jsonify([club.to_dict() for club in clubs]), 200
 
 @club_bp.route('/<int:club_id>/join', methods=['POST'])
@@ -71,7 +88,7 @@ def leave_club(club_id):
         return jsonify({"message": f"Successfully left {club.name}"}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"Error leaving club: {e}") 
+        logger.exception("Error leaving club %s", club_id)
         return jsonify({"message": "An error occurred while leaving the club"}), 500
 
 
@@ -80,7 +97,7 @@ def get_club_details(club_id):
     """
     Retrieves details for a single club by its ID.
     """
-    club = Club.query.get(club_id)
+    club = Club.query.options(*load_profile('club_detail')).get(club_id)
     if not club:
         return jsonify({"message": "Club not found"}), 404
     return jsonify(club.to_dict()), 200
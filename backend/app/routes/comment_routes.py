@@ -1,10 +1,15 @@
 # backend/app/routes/comment_routes.py
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
+from app import db, event_bus
 from app.models.comment import Comment # Import the Comment model
 from app.models.post import Post     # Import the Post model (to find the post for commenting)
 from app.models.user import User     # Import the User model (to get username for comment)
+from app.utils.loading import load_profile
+from app.utils.events import club_channel, user_channel
+import logging
+
+logger = logging.getLogger(__name__)
 
 comment_bp = Blueprint('comment_bp', __name__)
 
@@ -35,11 +40,14 @@ def add_comment(post_id):
         user_id=current_user_id,
         post_id=post_id
     )
+    channels = [club_channel(post.club_id), user_channel(post.user_id)]
     db.session.add(new_comment)
     db.session.commit()
 
     # Return the new comment's data, including the username
-    return jsonify(new_comment.to_dict()), 201
+    comment_data = new_comment.to_dict()
+    event_bus.publish(channels, 'comment_added', comment_data)
+    return jsonify(comment_data), 201
 
 @comment_bp.route('/comments/<int:comment_id>', methods=['DELETE'])
 @jwt_required()
@@ -63,7 +71,7 @@ def delete_comment(comment_id):
         return jsonify({'message': 'Comment deleted successfully'}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting comment {comment_id}: {e}")
+        logger.exception("Error deleting comment %s", comment_id)
         return jsonify({'message': 'An error occurred while deleting the comment'}), 500
 
 @comment_bp.route('/posts/<int:post_id>/comments', methods=['GET'])
@@ -71,7 +79,7 @@ def get_comments_for_post(post_id):
     """
     Retrieves all comments for a specific post, ordered by creation date (oldest first).
     """
-    post = Post.query.get(post_id)
+    post = Post.query.options(*load_profile('post_comments')).get(post_id)
     if not post:
         return jsonify({'message': 'Post not found'}), 404
 
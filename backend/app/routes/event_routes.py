@@ -0,0 +1,43 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from .. import event_bus
+from ..models.club import Club
+from ..models.club_member import ClubMember
+from ..utils.events import club_channel, user_channel
+
+event_bp = Blueprint('event_bp', __name__)
+
+
+def _last_event_id():
+    # EventSource sends the header on reconnect; the query parameter lets a
+    # fresh page resume from an id it kept
+    return request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+
+@event_bp.route('/posts/clubs/<int:club_id>/events', methods=['GET'])
+def club_events(club_id):
+    """
+    Server-sent events for one club: post_created, post_deleted, like and
+    comment_added, each with a compact payload. Replaces polling
+    GET /posts/clubs/<club_id>/posts; on a `reset` event, refetch that list.
+    """
+    if not Club.query.get(club_id):
+        return jsonify({"message": "Club not found"}), 404
+    return event_bus.stream([club_channel(club_id)], _last_event_id())
+
+
+@event_bp.route('/users/<int:user_id>/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string']) # EventSource can't set headers: ?jwt=<token>
+def user_events(user_id):
+    """
+    Server-sent events for a user's timeline: everything in the clubs they
+    belong to, plus likes and comments on their own posts. Memberships are
+    read when the stream opens; streams end every EVENTS_STREAM_MAX_SECONDS
+    and the reconnect picks up changes.
+    """
+    if get_jwt_identity() != user_id:
+        return jsonify({"message": "Unauthorized: You can only follow your own timeline"}), 403
+
+    club_ids = ClubMember.query.with_entities(ClubMember.club_id).filter_by(user_id=user_id).all()
+    channels = [user_channel(user_id)] + [club_channel(club_id) for (club_id,) in club_ids]
+    return event_bus.stream(channels, _last_event_id())
@@ -1,9 +1,11 @@
 # backend/app/routes/like_routes.py
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app import db
+from app import db, event_bus
 from app.models.like import Like 
 from app.models.post import Post 
+from app.utils.loading import load_profile
+from app.utils.events import club_channel, user_channel
 
 like_bp = Blueprint('like_bp', __name__)
 
@@ -20,6 +22,9 @@ def toggle_like(post_id):
     if not post:
         return jsonify({'message': 'Post not found'}), 404
 
+    # Read before commit expires the post, for the event below
+    channels = [club_channel(post.club_id), user_channel(post.user_id)]
+
     # Check if the user has already liked this post
     existing_like = Like.query.filter_by(user_id=current_user_id, post_id=post_id).first()
 
@@ -28,7 +33,8 @@ def toggle_like(post_id):
         db.session.delete(existing_like)
         db.session.commit()
     
-        likes_count = len(post.likes)
+        likes_count = Like.query.filter_by(post_id=post_id).count()
+        _publish_like(channels, post_id, current_user_id, False, likes_count)
         return jsonify({'message': 'Post unliked successfully', 'likes_count': likes_count, 'liked': False}), 200
     else:
         # If not liked, like it
@@ -36,9 +42,15 @@ def toggle_like(post_id):
         db.session.add(new_like)
         db.session.commit()
         
-        likes_count = len(post.likes)
+        likes_count = Like.query.filter_by(post_id=post_id).count()
+        _publish_like(channels, post_id, current_user_id, True, likes_count)
         return jsonify({'message': 'Post liked successfully', 'likes_count': likes_count, 'liked': True}), 201
 
+def _publish_like(channels, post_id, user_id, liked, likes_count):
+    event_bus.publish(channels, 'like', {
+        'post_id': post_id, 'user_id': user_id, 'liked': liked, 'likes_count': likes_count,
+    })
+
 @like_bp.route('/posts/<int:post_id>/likes', methods=['GET'])
 def get_likes_for_post(post_id):
     """
@@ -51,8 +63,8 @@ def get_likes_for_post(post_id):
     likes = Like.query.filter_by(post_id=post_id).all()
     likes_data = [like.to_dict() for like in likes]
     
-    # We can also return the count directly from the relationship
-    likes_count = len(post.likes)
+    # Same rows as post.likes, so count them rather than loading the relationship too
+    likes_count = len(likes)
 
     return jsonify({
         'likes_count': likes_count,
@@ -64,6 +76,7 @@ def get_liked_posts_by_user(user_id):
     """
     Gets all posts liked by a specific user.
     """
-    liked_posts = [like.post.to_dict() for like in Like.query.filter_by(user_id=user_id).all()]
+    likes = Like.query.options(*load_profile('liked_posts')).filter_by(user_id=user_id).all()
+    liked_posts = [like.post.to_dict() for like in likes]
     return jsonify(liked_posts), 200
 
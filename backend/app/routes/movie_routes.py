@@ -1,24 +1,101 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from .. import db
+from sqlalchemy import select
+from .. import db, thumbnails
 from ..models.movie import Movie
+from ..models.post import Post
+from ..utils.archive import InvalidCursor, page_args, read_posts
+from ..utils.loading import load_profile
+from ..utils.popularity import WINDOWS, popular_movies
+from ..utils.thumbnails import FORMATS, SIZES
 
 movie_bp = Blueprint('movie_bp', __name__)
 
 # Route to get all movies
 @movie_bp.route('/', methods=['GET'])
 def get_all_movies():
-    movies = Movie.query.all()
+    movies = Movie.query.options(*load_profile('movie_list')).all()
     return jsonify([movie.to_dict() for movie in movies]), 200
 
+# Route to get the most watchlisted movies
+@movie_bp.route('/popular', methods=['GET'])
+def get_popular_movies():
+    """
+    Movies with the most net watchlist additions over ?window= (day, week,
+    month, year or all; week by default), optionally only in ?genre= and
+    only into ?status=, e.g. ?window=week&status=watched for the most
+    watched this week. ?limit= up to 100, POPULAR_MOVIES_PAGE_SIZE by default.
+    """
+    window = request.args.get('window', 'week')
+    if window not in WINDOWS:
+        return jsonify({"message": f"window must be one of: {', '.join(WINDOWS)}"}), 400
+    limit = min(max(request.args.get('limit', current_app.config.get('POPULAR_MOVIES_PAGE_SIZE', 20), type=int), 1), 100)
+    movies = popular_movies(window, genre=request.args.get('genre'), status=request.args.get('status'), limit=limit)
+    return jsonify(movies), 200
+
 # Route to get a specific movie by ID
 @movie_bp.route('/<int:movie_id>', methods=['GET'])
 def get_movie_by_id(movie_id):
-    movie = Movie.query.get(movie_id)
+    movie = Movie.query.options(*load_profile('movie_detail')).get(movie_id)
     if not movie:
         return jsonify({"message": "Movie not found"}), 404
     return jsonify(movie.to_dict()), 200
 
+# Route to get the posts about a movie
+@movie_bp.route('/<int:movie_id>/posts', methods=['GET'])
+def get_movie_posts(movie_id):
+    """
+    Posts whose movie_title was matched to this movie, newest first, one
+    page at a time like the club posts (?limit=, then ?cursor= from the
+    X-Next-Cursor header). Archived posts aren't included.
+    """
+    if db.session.execute(select(Movie.id).where(Movie.id == movie_id)).first() is None:
+        return jsonify({"message": "Movie not found"}), 404
+
+    maximum = current_app.config.get('POSTS_PAGE_SIZE', 100)
+    try:
+        limit, before = page_args(request.args, maximum)
+    except InvalidCursor:
+        return jsonify({"message": "Invalid cursor"}), 400
+    statement = select(Post).options(*load_profile('post_list')).filter_by(movie_id=movie_id)
+    posts, next_cursor = read_posts(db.session, statement, None, movie_id, limit or maximum, before)
+    response = jsonify(posts)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+# Route to get a movie's poster as a thumbnail
+@movie_bp.route('/<int:movie_id>/thumbnail', methods=['GET'])
+def get_movie_thumbnail(movie_id):
+    """
+    The movie's poster at ?size= (small, medium or large; medium by
+    default) as ?format= webp or jpeg. Without a format it is WebP if the
+    Accept header lists image/webp over image/jpeg, else JPEG. 404 when
+    there is no local copy of the poster to make it from; clients then fall
+    back to poster_url.
+    """
+    size = request.args.get('size', 'medium')
+    if size not in SIZES:
+        return jsonify({"message": f"size must be one of: {', '.join(SIZES)}"}), 400
+    fmt = request.args.get('format')
+    if fmt is not None and fmt not in FORMATS:
+        return jsonify({"message": f"format must be one of: {', '.join(FORMATS)}"}), 400
+
+    poster_url = db.session.execute(select(Movie.poster_url).where(Movie.id == movie_id)).first()
+    if poster_url is None:
+        return jsonify({"message": "Movie not found"}), 404
+    negotiated = fmt is None
+    if negotiated:
+        # WebP only when the client names it: */*, image/* and ties get JPEG, which everything decodes
+        best = request.accept_mimetypes.best_match(['image/jpeg', 'image/webp'])
+        fmt = 'webp' if best == 'image/webp' else 'jpeg'
+    response = thumbnails.response(poster_url[0], size, fmt, request.if_none_match)
+    if response is None:
+        return jsonify({"message": "No thumbnail available for this poster"}), 404
+    if negotiated:
+        response.vary.add('Accept')
+    return response
+
 # Route to create a new movie
 @movie_bp.route('/', methods=['POST'])
 @jwt_required() 
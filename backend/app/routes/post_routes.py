@@ -1,9 +1,16 @@
-from flask import Blueprint, jsonify, request, make_response
+from flask import Blueprint, current_app, jsonify, request, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from .. import db
+from sqlalchemy import select
+from .. import db, event_bus, movie_matcher
 from ..models.post import Post
 from ..models.club import Club 
 from ..models.user import User 
+from ..utils.loading import load_profile
+from ..utils.events import club_channel
+from ..utils.archive import InvalidCursor, page_args, read_posts
+import logging
+
+logger = logging.getLogger(__name__)
 
 post_bp = Blueprint('post_bp', __name__)
 
@@ -12,12 +19,38 @@ post_bp = Blueprint('post_bp', __name__)
 def get_club_posts(club_id):
     """
     Retrieves all posts for a specific club, ordered by creation date (newest first).
+    With ?limit= (and then ?cursor= from the X-Next-Cursor header) it returns
+    one page at a time, reading on into archived posts. Without it, the live
+    posts, and X-Next-Cursor when older ones are archived.
     """
     club = Club.query.get(club_id)
     if not club:
         return jsonify({"message": "Club not found"}), 404
-    
-    posts = Post.query.filter_by(club_id=club_id).order_by(Post.created_at.desc()).all()
+
+    try:
+        limit, before = page_args(request.args, current_app.config.get('POSTS_PAGE_SIZE', 100))
+    except InvalidCursor:
+        return jsonify({"message": "Invalid cursor"}), 400
+    statement = select(Post).options(*load_profile('post_list')).filter_by(club_id=club_id)
+    if limit is None:
+        statement = statement.order_by(Post.created_at.desc())
+    posts, next_cursor = read_posts(db.session, statement, 'clubs', club_id, limit, before)
+    response = jsonify(posts)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@post_bp.route('/posts/trending', methods=['GET'])
+def get_trending_posts():
+    """
+    The highest-scoring posts right now (likes and comments, decayed with
+    age), best first. ?limit= up to 100, TRENDING_PAGE_SIZE by default.
+    """
+    limit = min(max(request.args.get('limit', current_app.config.get('TRENDING_PAGE_SIZE', 20), type=int), 1), 100)
+    posts = (
+        Post.query.options(*load_profile('post_list'))
+        .filter(Post.trending_score > 0).order_by(Post.trending_score.desc()).limit(limit).all()
+    )
     return jsonify([post.to_dict() for post in posts]), 200
 
 # Route to create a new post in a specific club
@@ -46,12 +79,18 @@ def create_club_post(club_id):
         movie_title=movie_title,
         content=content,
         user_id=user.id,
-        club_id=club.id
+        club_id=club.id,
+        movie_id=movie_matcher.match(movie_title),
     )
     db.session.add(new_post)
     db.session.commit()
 
-    return jsonify(new_post.to_dict()), 201
+    post_data = new_post.to_dict()
+    event_bus.publish([club_channel(club.id)], 'post_created', {
+        key: post_data[key]
+        for key in ('id', 'club_id', 'user_id', 'author_username', 'movie_title', 'content', 'created_at')
+    })
+    return jsonify(post_data), 201
 
 # Manual OPTIONS handler for /posts/<int:post_id>
 @post_bp.route('/posts/<int:post_id>', methods=['OPTIONS'])
@@ -86,12 +125,14 @@ def delete_post(post_id):
         return jsonify({"message": "Unauthorized: You can only delete your own posts"}), 403
 
     try:
+        club_id = post.club_id
         db.session.delete(post)
         db.session.commit()
+        event_bus.publish([club_channel(club_id)], 'post_deleted', {'id': post_id, 'club_id': club_id})
         return jsonify({"message": "Post deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
-        print(f"Error deleting post {post_id}: {e}")
+        logger.exception("Error deleting post %s", post_id)
         return jsonify({"message": "An error occurred while deleting the post"}), 500
 
 # NEW ROUTE: Get all posts for the main feed
@@ -102,7 +143,7 @@ def get_feed_posts():
     Retrieves all posts for the main feed, ordered by creation date (newest first).
     Requires authentication.
     """
-    posts = Post.query.order_by(Post.created_at.desc()).all()
+    posts = Post.query.options(*load_profile('post_list')).order_by(Post.created_at.desc()).all()
     
     feed_posts_data = [post.to_dict() for post in posts]
     
@@ -0,0 +1,104 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from ..models.change_log import ChangeLog
+from ..models.club import Club
+from ..models.post import Post
+from ..models.user import User
+from ..models.watchlist import Watchlist
+from ..utils.changes import (
+    InvalidSyncToken, SyncTokenExpired, decode_token, encode_token, read_changes, snapshot_cursor,
+)
+from ..utils.loading import load_profile
+
+sync_bp = Blueprint('sync_bp', __name__)
+
+# entity in change_log -> (response key, model, loader profile)
+ENTITIES = {
+    'post': ('posts', Post, 'post_list'),
+    'watchlist': ('watchlist', Watchlist, 'watchlist'),
+}
+
+
+def _page_size():
+    maximum = current_app.config.get('SYNC_PAGE_SIZE', 500)
+    limit = request.args.get('limit', maximum, type=int)
+    return min(max(limit, 1), maximum)
+
+
+def _load(entity, ids):
+    _, model, profile = ENTITIES[entity]
+    if not ids:
+        return []
+    return model.query.options(*load_profile(profile)).filter(model.id.in_(ids)).order_by(model.id).all()
+
+
+def _sync(scope, entities, snapshot):
+    """
+    The response for one feed. Without ?token= it is a full snapshot
+    (`snapshot` maps each entity to its query); with one, the rows inserted or
+    updated since plus the ids of deleted rows under `deleted`. Either way
+    `sync_token` is what to send next time; keep paging while `has_more`.
+    """
+    settle_seconds = current_app.config.get('SYNC_SETTLE_SECONDS', 5)
+    token = request.args.get('token')
+
+    if not token:
+        # The cursor is taken before the snapshot is read, so nothing falls between them
+        cursor = snapshot_cursor(settle_seconds)
+        body = {'sync_token': encode_token(cursor), 'has_more': False, 'full': True}
+        for entity in entities:
+            key, model, profile = ENTITIES[entity]
+            rows = snapshot[entity].options(*load_profile(profile)).order_by(model.id).all()
+            body[key] = [row.to_dict() for row in rows]
+        body['deleted'] = {ENTITIES[entity][0]: [] for entity in entities}
+        return jsonify(body), 200
+
+    try:
+        cursor = decode_token(token)
+    except InvalidSyncToken:
+        return jsonify({"message": "Invalid sync token"}), 400
+    try:
+        changes, cursor, has_more = read_changes(scope, cursor, _page_size(), settle_seconds)
+    except SyncTokenExpired:
+        return jsonify({"message": "Sync token expired, fetch a full snapshot without a token"}), 410
+
+    body = {'sync_token': encode_token(cursor), 'has_more': has_more, 'full': False, 'deleted': {}}
+    for entity in entities:
+        key = ENTITIES[entity][0]
+        ops = changes.get(entity, {})
+        rows = _load(entity, [entity_id for entity_id, op in ops.items() if op == 'upsert'])
+        found = {row.id for row in rows}
+        body[key] = [row.to_dict() for row in rows]
+        # Rows logged as upserts that are gone by now were deleted after this page
+        body['deleted'][key] = sorted(entity_id for entity_id in ops if entity_id not in found)
+    return jsonify(body), 200
+
+
+@sync_bp.route('/sync/clubs/<int:club_id>', methods=['GET'])
+def sync_club(club_id):
+    """
+    Delta sync for a club's posts (each with its likes and comments). Call
+    without a token for a full snapshot, then with ?token=<sync_token> for
+    what changed since. 410 means the token is older than the change log's
+    retention: start again without one.
+    """
+    if not Club.query.get(club_id):
+        return jsonify({"message": "Club not found"}), 404
+    return _sync(
+        ChangeLog.club_id == club_id, ('post',),
+        {'post': Post.query.filter_by(club_id=club_id)},
+    )
+
+
+@sync_bp.route('/sync/users/<int:user_id>', methods=['GET'])
+@jwt_required()
+def sync_user(user_id):
+    """Delta sync for a user's own posts and watchlist; same protocol as the club feed."""
+    if get_jwt_identity() != user_id:
+        return jsonify({"message": "Unauthorized access"}), 403
+    if not User.query.get(user_id):
+        return jsonify({"message": "User not found"}), 404
+    return _sync(
+        ChangeLog.user_id == user_id, ('post', 'watchlist'),
+        {'post': Post.query.filter_by(user_id=user_id), 'watchlist': Watchlist.query.filter_by(user_id=user_id)},
+    )
@@ -1,13 +1,19 @@
-from flask import Blueprint, request, jsonify, make_response
+from flask import Blueprint, current_app, request, jsonify, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from .. import db
+from sqlalchemy import select
+from .. import db, data_export
 from ..models.user import User
 from ..models.club_member import ClubMember 
 from ..models.club import Club 
 from ..models.follow import Follow 
 from ..models.post import Post # Import Post model
+from ..utils.loading import load_profile
+from ..utils.summaries import user_summary
+from ..utils.archive import InvalidCursor, page_args, read_posts
 import re 
-import traceback # NEW: Import traceback for detailed error logging
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Create a Blueprint for user routes. 
 user_bp = Blueprint('user_bp', __name__)
@@ -22,13 +28,30 @@ def get_user_details(user_id):
     """
     current_user_id = get_jwt_identity()
     
-    user = User.query.get(user_id)
+    user = User.query.options(*load_profile('profile')).get(user_id)
     if not user:
         return jsonify({"message": "User not found"}), 404
-    
-    print(f"Backend: Serving GET request for user {user_id}. User data: {user.to_dict()}")
+
     return make_response(jsonify(user.to_dict()), 200)
 
+# Route to get a user's profile header: basic fields plus counts
+@user_bp.route('/users/<int:user_id>/summary', methods=['GET'])
+@jwt_required()
+def get_user_summary(user_id):
+    """
+    Retrieves a user's id, username, bio and join date with their post,
+    follower, following, club and watchlist counts, from one cached query.
+    Carries an ETag, so clients can revalidate with If-None-Match.
+    """
+    summary = user_summary(user_id)
+    if summary is None:
+        return jsonify({"message": "User not found"}), 404
+
+    response = make_response(jsonify(summary), 200)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
 # Route to update user details
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 @jwt_required()
@@ -48,8 +71,9 @@ def update_user_details(user_id):
         return jsonify({'message': 'User not found'}), 404
 
     data = request.get_json()
-    print(f"Backend: Received PUT request for user {user_id}. Data: {data}") 
-    print(f"Backend: Current user object before update: {user.username}, {user.email}, {user._password_hash[:10]}...") 
+    if logger.isEnabledFor(logging.DEBUG):
+        # Field names only: the values may include a password
+        logger.debug("Updating user %s: fields %s", user_id, sorted(data))
 
     if 'username' in data:
         new_username = data['username'].strip()
@@ -59,7 +83,6 @@ def update_user_details(user_id):
         if new_username != user.username and User.query.filter(User.username == new_username).first():
             return jsonify({'message': 'Username already taken'}), 409
         user.username = new_username
-        print(f"Backend: Updating username to {new_username}") 
 
     if 'email' in data:
         new_email = data['email'].strip()
@@ -69,7 +92,6 @@ def update_user_details(user_id):
         if new_email != user.email and User.query.filter(User.email == new_email).first():
             return jsonify({'message': 'Email already taken'}), 409
         user.email = new_email
-        print(f"Backend: Updating email to {new_email}") 
 
     if 'password' in data:
         new_password = data['password']
@@ -85,17 +107,15 @@ def update_user_details(user_id):
             return jsonify({'message': 'Password must contain at least one number'}), 400
         
         user.password_hash = new_password 
-        print(f"Backend: Attempting to update password for user {user.username}") 
-        print(f"Backend: Password hash setter called. New hash (partial): {user._password_hash[:10]}...") 
 
     try:
         db.session.add(user) 
         db.session.commit()
-        print(f"Backend: User {user.username} updated successfully and committed.") 
+        logger.info("User %s updated", user_id)
         return make_response(jsonify(user.to_dict()), 200)
     except Exception as e:
         db.session.rollback()
-        print(f"Backend ERROR: Failed to update user {user.username}. Error: {str(e)}") 
+        logger.exception("Failed to update user %s", user_id)
         return jsonify({'message': f'Error updating user: {str(e)}'}), 500
 
 # Route to get clubs a user has joined
@@ -114,7 +134,7 @@ def get_user_clubs(user_id):
     if not user:
         return jsonify({"message": "User not found"}), 404
 
-    memberships = ClubMember.query.filter_by(user_id=user.id).all()
+    memberships = ClubMember.query.options(*load_profile('user_clubs')).filter_by(user_id=user.id).all()
     
     joined_clubs = [membership.club.to_dict() for membership in memberships if membership.club]
     
@@ -126,7 +146,8 @@ def get_user_clubs(user_id):
 def get_user_posts(user_id):
     """
     Retrieves all posts created by a specific user.
-    Requires authentication.
+    Requires authentication. Pages like the club posts list with ?limit= and
+    ?cursor=, which read on into archived posts.
     """
     current_user_id = get_jwt_identity()
     user = User.query.get(user_id)
@@ -139,24 +160,32 @@ def get_user_posts(user_id):
     # if current_user_id != user_id:
     #     return jsonify({'message': 'Unauthorized to view this user\'s posts'}), 403
 
-    user_posts_data = []
-    for post in user.posts: # Iterate through the posts relationship
-        try:
-            # Attempt to serialize each post
-            post_dict = post.to_dict()
-            user_posts_data.append(post_dict)
-        except Exception as e:
-            # If an error occurs during serialization of a specific post, log it
-            print(f"ERROR: Failed to serialize post ID {post.id} for user {user_id}: {e}")
-            traceback.print_exc() # Print full traceback for the specific post
-            # Optionally, you can skip this post or return a partial list
-            # For now, we'll just log and continue, but the 500 will still occur if the list is returned with error
-            # To prevent 500, you might return a 200 with a message about partial data
-            # or include an 'errors' field in the response.
-            # For debugging, just logging is fine. The 500 will still tell us something went wrong.
-            return jsonify({"message": f"Error processing posts for user {user_id}: {str(e)}"}), 500 # Return 500 immediately for any post error
-
-    return jsonify(user_posts_data), 200
+    try:
+        limit, before = page_args(request.args, current_app.config.get('POSTS_PAGE_SIZE', 100))
+    except InvalidCursor:
+        return jsonify({"message": "Invalid cursor"}), 400
+    statement = select(Post).options(*load_profile('post_list')).filter_by(user_id=user.id)
+    user_posts_data, next_cursor = read_posts(db.session, statement, 'users', user.id, limit, before)
+    response = jsonify(user_posts_data)
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+
+@user_bp.route('/users/<int:user_id>/export', methods=['GET'])
+@jwt_required()
+def export_user_data(user_id):
+    """
+    Downloads everything the user owns (profile, posts, comments, likes,
+    follows, watchlist, reviews) as a ZIP of JSON-lines files, streamed
+    while it is built. Users can only export their own data.
+    """
+    if get_jwt_identity() != user_id:
+        return jsonify({"message": "Unauthorized: You can only export your own data"}), 403
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+    return data_export.response(user)
 
 
 # Route to get users that a specific user is following
@@ -174,7 +203,8 @@ def get_user_following(user_id):
         return jsonify({'message': 'User not found'}), 404
 
     following_users_data = []
-    for followed_user_obj in user.following: 
+    follows = Follow.query.options(*load_profile('following')).filter_by(follower_id=user.id).all()
+    for followed_user_obj in follows:
         followed_user = followed_user_obj.followed 
         following_users_data.append({
             'id': followed_user.id,
@@ -254,10 +284,10 @@ def get_user_followers(user_id):
     if not user:
         return jsonify({'message': 'User not found'}), 404
 
-    # The 'followers' relationship on the User model is defined in models/user.py
-    # It should correctly return Follow objects where this user is the 'followed' party.
+    # Follow rows where this user is the 'followed' party, with each follower joined in
     follower_users_data = []
-    for follower_obj in user.followers: 
+    follows = Follow.query.options(*load_profile('followers')).filter_by(followed_id=user.id).all()
+    for follower_obj in follows:
         # Access the 'follower' User object from the Follow object
         follower_user = follower_obj.follower 
         follower_users_data.append({
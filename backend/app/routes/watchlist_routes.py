@@ -4,9 +4,12 @@ from flask_restful import Api, Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db # Assuming 'db' is your SQLAlchemy instance
 from app.models.watchlist import Watchlist # Import your Watchlist model
+from app.utils.fast_json import output_json
+from app.utils.loading import load_profile
 
 watchlist_bp = Blueprint('watchlist_bp', __name__)
 api = Api(watchlist_bp)
+api.representations['application/json'] = output_json
 
 class UserWatchlistResource(Resource):
     @jwt_required()
@@ -15,7 +18,7 @@ class UserWatchlistResource(Resource):
         if current_user_id != user_id:
             return {'message': 'Unauthorized access'}, 403
 
-        watchlist_items = Watchlist.query.filter_by(user_id=user_id).all()
+        watchlist_items = Watchlist.query.options(*load_profile('watchlist')).filter_by(user_id=user_id).all()
         # Ensure that the to_dict method is correctly returning all necessary fields
         return jsonify([item.to_dict() for item in watchlist_items])
 
@@ -35,7 +38,7 @@ class UserWatchlistResource(Resource):
             return {'message': 'Movie ID and title are required'}, 400
 
         # Check if item already exists for this user and movie
-        existing_item = Watchlist.query.filter_by(user_id=user_id, movie_id=movie_id).first()
+        existing_item = Watchlist.query.options(*load_profile('watchlist')).filter_by(user_id=user_id, movie_id=movie_id).first()
         if existing_item:
             # If it exists, update its status if different, otherwise return conflict
             if existing_item.status != status:
@@ -62,7 +65,7 @@ class WatchlistItemResource(Resource):
         if current_user_id != user_id:
             return {'message': 'Unauthorized access'}, 403
 
-        item = Watchlist.query.filter_by(id=watchlist_item_id, user_id=user_id).first()
+        item = Watchlist.query.options(*load_profile('watchlist')).filter_by(id=watchlist_item_id, user_id=user_id).first()
         if not item:
             return {'message': 'Watchlist item not found'}, 404
 
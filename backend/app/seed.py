@@ -0,0 +1,363 @@
+"""
+Deterministic, high-volume synthetic data for development, load and benchmark work.
+
+    flask seed                      # ~1k posts and everything around them
+    flask seed --posts 1000000      # ~7M rows in total
+    flask seed --posts 5000 --seed 7 --chunk-size 10000
+
+Rows are generated with Faker from a fixed seed and written with Core bulk
+inserts in chunks, with primary keys assigned up front so foreign keys never
+need a round trip. The same arguments always produce the same data:
+timestamps are spread back from an epoch derived from the seed, not from
+the time of the run (pass --epoch to date the data from another moment).
+
+Faker is a development dependency (requirements-dev.txt), so seeding needs
+that install, not just the server's requirements.txt.
+"""
+import importlib.util
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, select, text
+
+from . import db, bcrypt
+from .utils.movie_links import link_posts
+from .utils.popularity import rebuild as rebuild_popularity
+
+SEED_PASSWORD = 'Password123'
+
+FAKER_MISSING = "Seeding needs Faker, a development dependency: pip install -r requirements-dev.txt"
+
+
+def seed_epoch(seed):
+    """The moment generated timestamps count back from: fixed for a given seed."""
+    return datetime(2025, 1, 1) + timedelta(days=seed % 365)
+
+GENRES = ('Thriller', 'Romance', 'Sci-Fi', 'Horror', 'Action', 'Anime',
+          'Drama', 'Documentary', 'Fantasy', 'Classic', 'Comedy', 'Animation')
+
+DEFAULT_CLUBS = [
+    {"name": "Thriller Fanatics", "description": "Dive deep into thrilling mysteries and suspense.", "genre": "Thriller"},
+    {"name": "Rom-Com Lovers", "description": "Celebrate romance and comedy with us.", "genre": "Romance"},
+    {"name": "Sci-Fi Nerds", "description": "Explore galaxies, aliens, and future tech.", "genre": "Sci-Fi"},
+    {"name": "Horror Vault", "description": "Spine-chilling horror films and creepy tales await.", "genre": "Horror"},
+    {"name": "Action Addicts", "description": "Explosions, fights, and adrenaline-pumping scenes all day.", "genre": "Action"},
+    {"name": "Anime Alliance", "description": "From classics to new-gen anime – all in one club.", "genre": "Anime"},
+    {"name": "Drama Queens", "description": "All about emotions, tears, and powerful performances.", "genre": "Drama"},
+    {"name": "Documentary Diggers", "description": "Explore real-world stories and truths through documentaries.", "genre": "Documentary"},
+    {"name": "Fantasy Realm", "description": "Dragons, magic, and epic quests from middle-earth to Westeros.", "genre": "Fantasy"},
+    {"name": "Classic Cinema", "description": "Discuss timeless masterpieces from the golden age of film.", "genre": "Classic"}
+]
+
+
+def plan_counts(posts, users=None, clubs=None, movies=None):
+    """Derives every table's size from the number of posts, keeping the ratios realistic."""
+    return {
+        'users': users or max(20, posts // 10),
+        'clubs': clubs or max(len(DEFAULT_CLUBS), posts // 1_000),
+        'movies': movies or max(20, posts // 100),
+        'posts': posts,
+        'likes_per_post': 3,
+        'comments_per_post': 2,
+        'follows_per_user': 10,
+        'memberships_per_user': 3,
+        'watchlist_per_user': 5,
+        'reviews_per_user': 2,
+    }
+
+
+class _Writer:
+    """Buffers rows per table and flushes them as chunked executemany inserts."""
+
+    def __init__(self, chunk_size, echo):
+        self.chunk_size = chunk_size
+        self.echo = echo
+        self.written = {}
+
+    def write(self, table, rows):
+        started = time.perf_counter()
+        chunk, total = [], 0
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                db.session.execute(insert(table), chunk)
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            db.session.execute(insert(table), chunk)
+            total += len(chunk)
+        db.session.commit()
+        self.written[table.name] = total
+        if self.echo:
+            self.echo(f"  {table.name:<14} {total:>10,} rows in {time.perf_counter() - started:6.1f}s")
+        return total
+
+
+def _next_id(table):
+    return (db.session.scalar(select(func.max(table.c.id))) or 0) + 1
+
+
+def seed_database(counts, seed=42, chunk_size=5_000, echo=None, epoch=None):
+    """
+    Generates users, clubs, memberships, movies, posts, likes, comments,
+    follows, watchlists and reviews according to `counts` (see plan_counts),
+    dated back from `epoch` (seed_epoch(seed) by default). New rows are
+    appended after any existing ids. Returns rows written per table.
+    """
+    try:
+        from faker import Faker
+    except ImportError as error:
+        raise RuntimeError(FAKER_MISSING) from error
+    from .models.user import User
+    from .models.club import Club
+    from .models.club_member import ClubMember
+    from .models.movie import Movie
+    from .models.post import Post
+    from .models.like import Like
+    from .models.comment import Comment
+    from .models.follow import Follow
+    from .models.watchlist import Watchlist
+    from .models.review import Review
+
+    rng = random.Random(seed)
+    fake = Faker()
+    fake.seed_instance(seed)
+    writer = _Writer(chunk_size, echo)
+    now = (epoch or seed_epoch(seed)).replace(microsecond=0)
+
+    if db.engine.dialect.name == 'sqlite':
+        # Bulk loading only: trade durability for speed on this connection
+        db.session.execute(text('PRAGMA synchronous = OFF'))
+
+    # Faker is the slowest part of generation, so draw text from pre-built pools
+    sentences = [fake.sentence(nb_words=10) for _ in range(2_000)]
+    paragraphs = [fake.paragraph(nb_sentences=4) for _ in range(2_000)]
+    bios = [fake.sentence(nb_words=14) for _ in range(500)]
+
+    def created_at(max_days=365):
+        return now - timedelta(seconds=rng.randrange(max_days * 86_400))
+
+    # Users: one shared bcrypt hash keeps generation independent of bcrypt's cost factor
+    password_hash = bcrypt.generate_password_hash(SEED_PASSWORD.encode('utf-8')).decode('utf-8')
+    first_user = _next_id(User.__table__)
+    user_ids = range(first_user, first_user + counts['users'])
+
+    def users():
+        for user_id in user_ids:
+            username = f"{fake.user_name()}{user_id}"
+            yield {
+                'id': user_id,
+                'username': username,
+                'email': f"{username}@{fake.free_email_domain()}",
+                '_password_hash': password_hash,
+                'bio': rng.choice(bios),
+                'created_at': created_at(),
+            }
+    writer.write(User.__table__, users())
+
+    # Clubs: the ten classic clubs first (when missing), then generated ones
+    first_club = _next_id(Club.__table__)
+    existing_names = set(db.session.scalars(select(Club.name)))
+    club_specs = [club for club in DEFAULT_CLUBS if club['name'] not in existing_names]
+    club_ids = range(first_club, first_club + counts['clubs'])
+
+    def clubs():
+        for index, club_id in enumerate(club_ids):
+            if index < len(club_specs):
+                spec = club_specs[index]
+            else:
+                genre = rng.choice(GENRES)
+                spec = {
+                    'name': f"{fake.city()} {genre} Society #{club_id}",
+                    'description': rng.choice(sentences),
+                    'genre': genre,
+                }
+            stamp = created_at()
+            yield dict(spec, id=club_id, created_at=stamp, updated_at=stamp)
+    writer.write(Club.__table__, clubs())
+
+    first_movie = _next_id(Movie.__table__)
+    movie_ids = range(first_movie, first_movie + counts['movies'])
+    movie_info = {}
+
+    def movies():
+        for movie_id in movie_ids:
+            title = f"{fake.catch_phrase().title()} #{movie_id}"
+            genre = rng.choice(GENRES)
+            movie_info[movie_id] = (title, genre)
+            yield {
+                'id': movie_id,
+                'title': title,
+                'genre': genre,
+                'release_year': rng.randint(1930, now.year),
+                'director': fake.name(),
+                'description': rng.choice(paragraphs),
+                'poster_url': f"https://picsum.photos/seed/{movie_id}/300/450",
+                'created_at': created_at(),
+            }
+    writer.write(Movie.__table__, movies())
+
+    first_member = _next_id(ClubMember.__table__)
+
+    def memberships():
+        row_id = first_member
+        per_user = min(counts['memberships_per_user'], len(club_ids))
+        for user_id in user_ids:
+            for club_id in rng.sample(club_ids, per_user):
+                yield {'id': row_id, 'user_id': user_id, 'club_id': club_id, 'created_at': created_at()}
+                row_id += 1
+    writer.write(ClubMember.__table__, memberships())
+
+    first_post = _next_id(Post.__table__)
+    post_ids = range(first_post, first_post + counts['posts'])
+
+    def posts():
+        for post_id in post_ids:
+            stamp = created_at()
+            yield {
+                'id': post_id,
+                'movie_title': movie_info[rng.choice(movie_ids)][0],
+                'content': rng.choice(paragraphs),
+                'user_id': rng.choice(user_ids),
+                'club_id': rng.choice(club_ids),
+                'created_at': stamp,
+                'updated_at': stamp,
+            }
+    writer.write(Post.__table__, posts())
+
+    first_like = _next_id(Like.__table__)
+
+    def likes():
+        row_id = first_like
+        per_post = min(counts['likes_per_post'], len(user_ids))
+        for post_id in post_ids:
+            for user_id in rng.sample(user_ids, per_post):
+                yield {'id': row_id, 'user_id': user_id, 'post_id': post_id, 'created_at': created_at(30)}
+                row_id += 1
+    writer.write(Like.__table__, likes())
+
+    first_comment = _next_id(Comment.__table__)
+
+    def comments():
+        row_id = first_comment
+        for post_id in post_ids:
+            for _ in range(counts['comments_per_post']):
+                yield {
+                    'id': row_id,
+                    'content': rng.choice(sentences),
+                    'user_id': rng.choice(user_ids),
+                    'post_id': post_id,
+                    'created_at': created_at(30),
+                }
+                row_id += 1
+    writer.write(Comment.__table__, comments())
+
+    first_follow = _next_id(Follow.__table__)
+
+    def follows():
+        row_id = first_follow
+        per_user = min(counts['follows_per_user'] + 1, len(user_ids))
+        for follower_id in user_ids:
+            for followed_id in rng.sample(user_ids, per_user):
+                if followed_id == follower_id:
+                    continue
+                yield {'id': row_id, 'follower_id': follower_id, 'followed_id': followed_id, 'created_at': created_at()}
+                row_id += 1
+    writer.write(Follow.__table__, follows())
+
+    first_watchlist = _next_id(Watchlist.__table__)
+
+    def watchlists():
+        row_id = first_watchlist
+        per_user = min(counts['watchlist_per_user'], len(movie_ids))
+        for user_id in user_ids:
+            for movie_id in rng.sample(movie_ids, per_user):
+                title, genre = movie_info[movie_id]
+                yield {
+                    'id': row_id,
+                    'user_id': user_id,
+                    'movie_id': movie_id,
+                    'movie_title': title,
+                    'genre': genre,
+                    'status': rng.choice(('pending', 'watched', 'liked')),
+                    'created_at': created_at(),
+                }
+                row_id += 1
+    writer.write(Watchlist.__table__, watchlists())
+
+    first_review = _next_id(Review.__table__)
+
+    def reviews():
+        row_id = first_review
+        for user_id in user_ids:
+            for _ in range(counts['reviews_per_user']):
+                yield {
+                    'id': row_id,
+                    'rating': rng.randint(1, 5),
+                    'comment': rng.choice(sentences),
+                    'user_id': user_id,
+                    'movie_id': rng.choice(movie_ids),
+                    'created_at': created_at(),
+                }
+                row_id += 1
+    writer.write(Review.__table__, reviews())
+
+    _reset_sequences()
+    return writer.written
+
+
+def _reset_sequences():
+    """Moves Postgres id sequences past the explicitly inserted ids."""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    for table in db.metadata.sorted_tables:
+        if 'id' not in table.c:
+            continue
+        db.session.execute(
+            select(func.setval(
+                func.pg_get_serial_sequence(f'"{table.name}"', 'id'),
+                select(func.coalesce(func.max(table.c.id), 0) + 1).scalar_subquery(),
+                False,
+            ))
+        )
+    db.session.commit()
+
+
+def finish_seed(session):
+    """
+    Fills in what the bulk inserts bypass the session hooks for: the movie
+    popularity rollup and the posts' movie links. Returns the rollup rows
+    written.
+    """
+    rows = rebuild_popularity(session)
+    session.commit()
+    link_posts(session)
+    return rows
+
+
+@click.command('seed')
+@click.option('--posts', default=1_000, show_default=True, help='Number of posts; other tables scale from it.')
+@click.option('--users', type=int, help='Override the derived number of users.')
+@click.option('--clubs', type=int, help='Override the derived number of clubs.')
+@click.option('--movies', type=int, help='Override the derived number of movies.')
+@click.option('--seed', 'seed_value', default=42, show_default=True, help='Random seed; same seed, same data.')
+@click.option('--chunk-size', default=5_000, show_default=True, help='Rows per bulk INSERT.')
+@click.option('--epoch', type=click.DateTime(), help='Date the data back from this moment instead of the seed\'s epoch.')
+@click.option('--create-tables', is_flag=True, help='Run db.create_all() first (handy for scratch databases).')
+@with_appcontext
+def seed_command(posts, users, clubs, movies, seed_value, chunk_size, epoch, create_tables):
+    """Fill the database with deterministic synthetic data. Needs Faker (requirements-dev.txt)."""
+    if importlib.util.find_spec('faker') is None:
+        raise click.ClickException(FAKER_MISSING)
+    if create_tables:
+        db.create_all()
+    counts = plan_counts(posts, users=users, clubs=clubs, movies=movies)
+    click.echo(f"Seeding {db.engine.url.render_as_string(hide_password=True)} (seed={seed_value})")
+    started = time.perf_counter()
+    written = seed_database(counts, seed=seed_value, chunk_size=chunk_size, echo=click.echo, epoch=epoch)
+    written['movie_popularity'] = finish_seed(db.session)
+    click.echo(f"Wrote {sum(written.values()):,} rows in {time.perf_counter() - started:.1f}s. "
+               f"Every generated user's password is '{SEED_PASSWORD}'.")
@@ -0,0 +1,522 @@
+"""
+Cold-post archive.
+
+`flask archive-posts` moves posts older than ARCHIVE_AFTER_DAYS, with their
+likes and comments, out of the database into compressed JSON-lines segments
+under ARCHIVE_DIR, one segment per batch:
+
+    posts-20261019T031500-0001.jsonl.zst    one post per line, newest first
+    posts-20261019T031500-0001.idx.json     sidecar index
+
+A segment is a run of independently compressed frames of up to
+ARCHIVE_FRAME_POSTS posts, so `zstdcat`/`zcat` still read it whole while the
+reader only decompresses the frames holding the club or user it was asked
+for. The index lists each frame's byte range, newest and oldest post, post
+counts per club and per user, and the users who liked or commented on its
+posts (for data exports).
+
+Cursor pages of the club and user post lists read through to the archive
+(see read_posts); the unpaged lists stay on the database. Archived posts are read-only: liking, commenting on or deleting one is a
+404. Usernames are looked up when a post is read, so renames show and the
+posts, likes and comments of deleted users and clubs drop out, as ON DELETE
+CASCADE would have removed them.
+"""
+import base64
+import binascii
+import gzip
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, or_, select
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+CURSOR_VERSION = 'v1'
+EXTENSIONS = {'zstd': '.jsonl.zst', 'gzip': '.jsonl.gz'}
+_EPOCH = datetime(1970, 1, 1)
+_IN_CHUNK = 500  # Ids per IN (...) list
+
+
+class InvalidCursor(ValueError):
+    """The page cursor wasn't issued by this API."""
+
+
+def _micros(value):
+    return (value - _EPOCH) // timedelta(microseconds=1) if value is not None else 0
+
+
+def _datetime(value):
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), _IN_CHUNK):
+        yield ids[start:start + _IN_CHUNK]
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(f'{CURSOR_VERSION}:{key[0]}:{key[1]}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """The (created_at in microseconds, id) key a cursor points below."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        version, micros, post_id = raw.split(':')
+        if version != CURSOR_VERSION:
+            raise ValueError(version)
+        return int(micros), int(post_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+# --- segments -----------------------------------------------------------------
+
+def _compress(data, compression):
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9)
+
+
+def _decompress(data, compression):
+    if compression == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class _Frame:
+    __slots__ = ('offset', 'length', 'newest', 'oldest', 'clubs', 'users', 'engaged')
+
+    def __init__(self, entry):
+        self.offset = entry['offset']
+        self.length = entry['length']
+        self.newest = tuple(entry['newest'])
+        self.oldest = tuple(entry['oldest'])
+        self.clubs = {int(key): count for key, count in entry['clubs'].items()}
+        self.users = {int(key): count for key, count in entry['users'].items()}
+        # None for indexes written before it was recorded: any user may be in the frame
+        self.engaged = set(entry['engaged']) if 'engaged' in entry else None
+
+
+class _Segment:
+    def __init__(self, path, index):
+        self.path = path
+        self.compression = index['compression']
+        self.frames = [_Frame(entry) for entry in index['frames']]
+
+    def read(self, frame):
+        with open(self.path, 'rb') as f:
+            f.seek(frame.offset)
+            data = f.read(frame.length)
+        return [json.loads(line) for line in _decompress(data, self.compression).splitlines()]
+
+
+class _PendingSegment:
+    """A written segment under temporary names, published once the database delete is in."""
+
+    def __init__(self, renames):
+        self.renames = renames
+
+    def publish(self):
+        # Data first: a segment only exists for readers once its index does
+        for temporary, final in self.renames:
+            os.replace(temporary, final)
+
+    def discard(self):
+        for temporary, final in self.renames:
+            for path in (temporary, final):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class PostArchive:
+    """
+    The archive directory, and a per-process catalog of its indexes that is
+    reloaded whenever a segment is added (the directory's mtime changes).
+    """
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.compression = 'gzip'
+        self.frame_posts = 256
+        self._segments = []
+        self._stamp = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['archive'] = self
+        self.directory = app.config.get('ARCHIVE_DIR') or os.path.join(app.instance_path, 'archive')
+        self.frame_posts = app.config.get('ARCHIVE_FRAME_POSTS', 256)
+        compression = app.config.get('ARCHIVE_COMPRESSION', 'zstd')
+        if compression not in EXTENSIONS:
+            raise ValueError(f"ARCHIVE_COMPRESSION must be one of {', '.join(EXTENSIONS)}, not {compression!r}")
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("ARCHIVE_COMPRESSION is zstd but zstandard is not installed; archiving with gzip")
+            compression = 'gzip'
+        self.compression = compression
+        app.cli.add_command(archive_posts_command)
+
+    # --- reading --------------------------------------------------------------
+
+    def segments(self):
+        try:
+            stamp = os.stat(self.directory).st_mtime_ns
+        except (FileNotFoundError, TypeError):
+            return []
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._segments = self._load()
+                    self._stamp = stamp
+        return self._segments
+
+    def _load(self):
+        segments = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.idx.json'):
+                continue
+            with open(os.path.join(self.directory, name)) as f:
+                index = json.load(f)
+            if index.get('version') != INDEX_VERSION:
+                logger.warning("Skipping archive index %s with unknown version %s", name, index.get('version'))
+                continue
+            segments.append(_Segment(os.path.join(self.directory, index['segment']), index))
+        return segments
+
+    def _frames(self, scope, value, before=None):
+        for segment in self.segments():
+            for frame in segment.frames:
+                if value in getattr(frame, scope) and (before is None or frame.oldest < before):
+                    yield segment, frame
+
+    def count(self, scope, value):
+        """Archived posts in a club (`scope` 'clubs') or by a user ('users')."""
+        return sum(getattr(frame, scope)[value] for _, frame in self._frames(scope, value))
+
+    def newest(self, scope, value):
+        """The (created_at, id) key of the newest archived post in scope, or None."""
+        return max((frame.newest for _, frame in self._frames(scope, value)), default=None)
+
+    def scan(self, scope, value, before=None):
+        """
+        Archived post records in scope, newest first, keyed below `before`.
+        Frames are opened lazily: only once the merge reaches their newest post.
+        """
+        frames = sorted(self._frames(scope, value, before), key=lambda item: item[1].newest, reverse=True)
+        key = 'club_id' if scope == 'clubs' else 'user_id'
+        heap = []
+        opened = pushed = 0
+        while True:
+            while opened < len(frames) and (not heap or frames[opened][1].newest > (-heap[0][0], -heap[0][1])):
+                segment, frame = frames[opened]
+                opened += 1
+                for record in segment.read(frame):
+                    record_key = (_micros(_datetime(record['created_at'])), record['id'])
+                    if record[key] == value and (before is None or record_key < before):
+                        pushed += 1
+                        heapq.heappush(heap, (-record_key[0], -record_key[1], pushed, record))
+            if not heap:
+                return
+            yield heapq.heappop(heap)[3]
+
+    def engaged(self, user_id):
+        """Archived post records `user_id` liked or commented on, in no particular order."""
+        for segment in self.segments():
+            for frame in segment.frames:
+                if frame.engaged is not None and user_id not in frame.engaged:
+                    continue
+                for record in segment.read(frame):
+                    if user_id in record['likes'] or any(comment['user_id'] == user_id
+                                                         for comment in record['comments']):
+                        yield record
+
+    # --- writing --------------------------------------------------------------
+
+    def write_segment(self, records):
+        """Writes `records` (newest first) as a new segment under temporary names."""
+        os.makedirs(self.directory, exist_ok=True)
+        stem = f"posts-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{time.time_ns() % 10_000:04d}"
+        data_name = stem + EXTENSIONS[self.compression]
+        data_path = os.path.join(self.directory, data_name)
+        index_path = os.path.join(self.directory, stem + '.idx.json')
+
+        frames = []
+        offset = 0
+        with open(data_path + '.tmp', 'wb') as f:
+            for start in range(0, len(records), self.frame_posts):
+                chunk = records[start:start + self.frame_posts]
+                data = _compress(b''.join(json.dumps(record).encode() + b'\n' for record in chunk), self.compression)
+                f.write(data)
+                clubs, users, engaged = {}, {}, set()
+                for record in chunk:
+                    clubs[record['club_id']] = clubs.get(record['club_id'], 0) + 1
+                    users[record['user_id']] = users.get(record['user_id'], 0) + 1
+                    engaged.update(record['likes'])
+                    engaged.update(comment['user_id'] for comment in record['comments'])
+                frames.append({
+                    'offset': offset, 'length': len(data),
+                    'newest': [_micros(_datetime(chunk[0]['created_at'])), chunk[0]['id']],
+                    'oldest': [_micros(_datetime(chunk[-1]['created_at'])), chunk[-1]['id']],
+                    'clubs': clubs, 'users': users, 'engaged': sorted(engaged),
+                })
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(index_path + '.tmp', 'w') as f:
+            json.dump({
+                'version': INDEX_VERSION, 'segment': data_name, 'compression': self.compression,
+                'posts': len(records), 'archived_at': datetime.utcnow().isoformat(), 'frames': frames,
+            }, f)
+        return _PendingSegment([(data_path + '.tmp', data_path), (index_path + '.tmp', index_path)])
+
+
+# --- rendering ----------------------------------------------------------------
+
+def _render(records, scope):
+    """
+    Steps (see post_reader) giving Post.to_dict() for archived records,
+    minus whatever a cascade would have removed since.
+    """
+    from ..models.club import Club
+    from ..models.user import User
+
+    if not records:
+        return []
+
+    def lookup(session):
+        user_ids = set()
+        for record in records:
+            user_ids.add(record['user_id'])
+            user_ids.update(record['likes'])
+            user_ids.update(comment['user_id'] for comment in record['comments'])
+        usernames = {}
+        for chunk in _chunks(sorted(user_ids)):
+            usernames.update(session.execute(select(User.id, User.username).where(User.id.in_(chunk))).all())
+        clubs = None
+        if scope == 'users':
+            clubs = set()
+            for chunk in _chunks(sorted({record['club_id'] for record in records})):
+                clubs.update(session.execute(select(Club.id).where(Club.id.in_(chunk))).scalars())
+        return usernames, clubs
+
+    usernames, clubs = yield True, lookup
+    return (yield False, lambda: _archived_posts(records, usernames, clubs))
+
+
+def _archived_posts(records, usernames, clubs):
+    posts = []
+    for record in records:
+        if record['user_id'] not in usernames or (clubs is not None and record['club_id'] not in clubs):
+            continue
+        likes = [{'user_id': user_id, 'username': usernames[user_id]}
+                 for user_id in record['likes'] if user_id in usernames]
+        posts.append({
+            'id': record['id'],
+            'movie_title': record['movie_title'],
+            'content': record['content'],
+            'user_id': record['user_id'],
+            'club_id': record['club_id'],
+            'created_at': _datetime(record['created_at']),
+            'updated_at': _datetime(record['updated_at']),
+            'author_username': usernames[record['user_id']],
+            'author_id': record['user_id'],
+            'likes_count': len(likes),
+            'likes': likes,
+            'comments': [{
+                'id': comment['id'],
+                'content': comment['content'],
+                'user_id': comment['user_id'],
+                'username': usernames[comment['user_id']],
+                'post_id': record['id'],
+                'created_at': _datetime(comment['created_at']),
+            } for comment in record['comments'] if comment['user_id'] in usernames],
+        })
+    return posts
+
+
+def page_args(args, maximum):
+    """
+    (limit, cursor key) from ?limit= and ?cursor=, or (None, None) when the
+    caller asked for neither and gets the whole list.
+    """
+    limit, cursor = args.get('limit'), args.get('cursor')
+    if limit is None and cursor is None:
+        return None, None
+    try:
+        limit = int(limit) if limit is not None else maximum
+    except ValueError:
+        limit = maximum
+    return min(max(limit, 1), maximum), decode_cursor(cursor) if cursor else None
+
+
+def read_posts(session, statement, scope, value, limit=None, before=None):
+    """
+    The posts `statement` (a select(Post) with its filter and loader options)
+    finds, continued into the archive for `scope` ('clubs' or 'users', or
+    None for live posts only) and `value`, as Post.to_dict() dicts. Returns
+    (posts, next cursor or None).
+
+    Without `limit` that is every live post, in the statement's order, and a
+    cursor to the archived ones if `scope` has any. With it, a page of at most
+    `limit` posts newest first, keyed below `before`. The archive is only
+    opened once a page reaches past the newest post archived in scope.
+    """
+    steps = post_reader(statement, scope, value, limit, before)
+    result = None
+    while True:
+        try:
+            needs_session, step = steps.send(result)
+        except StopIteration as done:
+            return done.value
+        result = step(session) if needs_session else step()
+
+
+def post_reader(statement, scope, value, limit=None, before=None):
+    """
+    read_posts as a generator of steps, for callers that keep database work
+    apart from archive reads and serialization (the async read tier). It
+    yields (needs_session, step) pairs: send back step(session) or step()
+    respectively. Its return value is read_posts'.
+    """
+    from .. import archive
+    from ..models.post import Post
+
+    if limit is None:
+        rows = yield True, lambda session: session.scalars(statement).all()
+
+        def live_only():
+            posts = [post.to_dict() for post in rows]
+            # Only the sidecar indexes are read here; the frames wait for a cursor page
+            newest_archived = archive.newest(scope, value) if scope is not None else None
+            if newest_archived is None:
+                return posts, None
+            # Keyed just above the newest archived post, or below the oldest live one
+            # if that is older still, so the next page starts where this list ends
+            keys = [(_micros(post.created_at), post.id) for post in rows]
+            return posts, encode_cursor(min(keys + [(newest_archived[0], newest_archived[1] + 1)]))
+
+        return (yield False, live_only)
+
+    statement = statement.order_by(Post.created_at.desc(), Post.id.desc())
+    if before is not None:
+        created_at = _EPOCH + timedelta(microseconds=before[0])
+        statement = statement.where(or_(
+            Post.created_at < created_at, and_(Post.created_at == created_at, Post.id < before[1]),
+        ))
+    rows = yield True, lambda session: session.scalars(statement.limit(limit + 1)).all()
+    page = [((_micros(post.created_at), post.id), post) for post in rows]
+
+    def open_archive():
+        newest_archived = archive.newest(scope, value)
+        if newest_archived is None or (len(page) > limit and page[limit - 1][0] >= newest_archived):
+            return None, []
+        scan = archive.scan(scope, value, before)
+        return scan, list(islice(scan, limit + 1))
+
+    scan, batch = (yield False, open_archive) if scope is not None else (None, [])
+    if scan is not None:
+        live = {post.id for _, post in page}
+        archived = []
+        while True:
+            archived += yield from _render([record for record in batch if record['id'] not in live], scope)
+            # Posts of since-deleted users and clubs drop out in _render; read on until the page is full
+            if len(archived) > limit or len(batch) <= limit:
+                break
+            batch = yield False, lambda: list(islice(scan, limit + 1))
+        page += [((_micros(post['created_at']), post['id']), post) for post in archived]
+        page.sort(key=lambda item: item[0], reverse=True)
+
+    more = len(page) > limit
+    page = page[:limit]
+    posts = yield False, lambda: [post if isinstance(post, dict) else post.to_dict() for _, post in page]
+    return posts, encode_cursor(page[-1][0]) if more else None
+
+
+# --- archiving ----------------------------------------------------------------
+
+def _records(session, posts):
+    """Archive records for a batch of post rows, newest first, with their likes and comments."""
+    from ..models.comment import Comment
+    from ..models.like import Like
+
+    likes, comments = {}, {}
+    ids = [post.id for post in posts]
+    for chunk in _chunks(ids):
+        for post_id, user_id in session.execute(
+            select(Like.post_id, Like.user_id).where(Like.post_id.in_(chunk)).order_by(Like.id)
+        ):
+            likes.setdefault(post_id, []).append(user_id)
+        for comment in session.execute(
+            select(Comment.id, Comment.post_id, Comment.user_id, Comment.content, Comment.created_at)
+            .where(Comment.post_id.in_(chunk)).order_by(Comment.id)
+        ):
+            comments.setdefault(comment.post_id, []).append({
+                'id': comment.id, 'user_id': comment.user_id, 'content': comment.content,
+                'created_at': comment.created_at.isoformat() if comment.created_at else None,
+            })
+    return [{
+        'id': post.id,
+        'club_id': post.club_id,
+        'user_id': post.user_id,
+        'movie_title': post.movie_title,
+        'content': post.content,
+        'created_at': post.created_at.isoformat() if post.created_at else None,
+        'updated_at': post.updated_at.isoformat() if post.updated_at else None,
+        'likes': likes.get(post.id, []),
+        'comments': comments.get(post.id, []),
+    } for post in reversed(posts)]
+
+
+@click.command('archive-posts')
+@click.option('--days', type=int, help='Archive posts older than this many days (default: ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, default=10_000, show_default=True, help='Posts per segment and transaction.')
+@with_appcontext
+def archive_posts_command(days, batch_size):
+    """Move old posts, with their likes and comments, from the database to the archive."""
+    from .. import archive, db
+    from ..models.post import Post
+
+    if days is None:
+        days = current_app.config.get('ARCHIVE_AFTER_DAYS', 365)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    total = 0
+    while True:
+        posts = db.session.execute(
+            select(Post.id, Post.club_id, Post.user_id, Post.movie_title, Post.content, Post.created_at, Post.updated_at)
+            .where(Post.created_at < cutoff)
+            .order_by(Post.created_at, Post.id)
+            .limit(batch_size)
+        ).all()
+        if not posts:
+            break
+        pending = archive.write_segment(_records(db.session, posts))
+        try:
+            # Likes and comments go with them by ON DELETE CASCADE
+            for chunk in _chunks([post.id for post in posts]):
+                db.session.execute(delete(Post).where(Post.id.in_(chunk)), execution_options={'synchronize_session': False})
+            pending.publish()
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            pending.discard()
+            raise
+        total += len(posts)
+        logger.info("Archived %s posts up to %s", len(posts), posts[-1].created_at)
+    click.echo(f"Archived {total:,} posts older than {days} days to {archive.directory}")
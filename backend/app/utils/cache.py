@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Backend failures that degrade to a cache miss
+_BACKEND_ERRORS = (redis.RedisError,) if redis is not None else ()
+
+
+class _LocalBackend:
+    """Per-process LRU of (expiry, value), bounded to `size` entries."""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+class _RedisBackend:
+    """Shared by every worker, so an invalidation in one is seen by all."""
+
+    def __init__(self, client, prefix):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, json.dumps(value), ex=max(1, int(ttl)))
+
+    def delete_many(self, keys):
+        if keys:
+            self.client.delete(*(self.prefix + key for key in keys))
+
+
+class Cache:
+    """
+    Small TTL cache for computed JSON-able values, e.g. the user summaries.
+
+    With CACHE_REDIS_URL (or REDIS_URL) entries live in Redis and are shared
+    by all workers; otherwise each process keeps up to CACHE_LOCAL_SIZE of
+    them, and a write served by one worker only invalidates that worker's
+    copy (the others catch up within the entry's TTL), so deployments with
+    more than one worker should set CACHE_REDIS_URL; startup warns when
+    WEB_CONCURRENCY says there are several. A Redis outage degrades to cache
+    misses, never to failed requests.
+    """
+
+    def __init__(self, app=None):
+        self.backend = _LocalBackend(10_000)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['cache'] = self
+        url = app.config.get('CACHE_REDIS_URL')
+        if url and redis is None:
+            logger.warning("CACHE_REDIS_URL is set but redis is not installed; caching per process")
+        if url and redis is not None:
+            self.backend = _RedisBackend(redis.Redis.from_url(url), app.config.get('CACHE_KEY_PREFIX', 'movieclub:'))
+        else:
+            self.backend = _LocalBackend(app.config.get('CACHE_LOCAL_SIZE', 10_000))
+            if int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+                logger.warning("Caching per process but WEB_CONCURRENCY=%s: a write only evicts its own worker's "
+                               "entries and replica pins don't reach the others; set CACHE_REDIS_URL",
+                               os.getenv('WEB_CONCURRENCY'))
+
+    def get(self, key):
+        try:
+            return self.backend.get(key)
+        except _BACKEND_ERRORS:
+            logger.warning("Cache read failed for %s", key, exc_info=True)
+            return None
+
+    def set(self, key, value, ttl):
+        try:
+            self.backend.set(key, value, ttl)
+        except _BACKEND_ERRORS:
+            logger.warning("Cache write failed for %s", key, exc_info=True)
+
+    def delete_many(self, keys):
+        try:
+            self.backend.delete_many(list(keys))
+        except _BACKEND_ERRORS:
+            logger.warning("Cache invalidation failed for %s", keys, exc_info=True)
@@ -0,0 +1,270 @@
+import base64
+import binascii
+import logging
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, inspect as sa_inspect, or_, select
+
+logger = logging.getLogger(__name__)
+
+TOKEN_VERSION = 'v1'
+
+
+class InvalidSyncToken(ValueError):
+    """The token wasn't issued by this API."""
+
+
+class SyncTokenExpired(Exception):
+    """Changes after the token have been pruned; the client needs a full resync."""
+
+
+# --- capture ------------------------------------------------------------------
+
+def _values(obj, *keys):
+    # Straight from the instance dict: no attribute loads inside a flush
+    state = sa_inspect(obj).dict
+    return tuple(state.get(key) for key in keys)
+
+
+class _FlushChanges:
+    """The change-log rows for one flush, last op per row winning."""
+
+    def __init__(self, session):
+        self.session = session
+        self.rows = {}
+        self.deleted_posts = {}
+        self._post_scopes = {}
+
+    def add(self, entity, entity_id, op, club_id=None, user_id=None):
+        if entity_id is None:
+            return
+        key = (entity, entity_id)
+        if self.rows.get(key, {}).get('op') == 'delete':
+            return
+        self.rows[key] = {'entity': entity, 'entity_id': entity_id, 'op': op,
+                          'club_id': club_id, 'user_id': user_id, 'created_at': datetime.utcnow()}
+
+    def post(self, obj, op):
+        post_id, club_id, user_id = _values(obj, 'id', 'club_id', 'user_id')
+        self._post_scopes[post_id] = (club_id, user_id)
+        if op == 'delete':
+            self.deleted_posts[post_id] = (club_id, user_id)
+        self.add('post', post_id, op, club_id, user_id)
+
+    def touch_post(self, post_id):
+        """Comments and likes are part of Post.to_dict(), so they re-sync their post."""
+        if post_id is None or post_id in self.deleted_posts:
+            return
+        scope = self._post_scopes.get(post_id) or self._post_scope(post_id)
+        if scope is not None:
+            self.add('post', post_id, 'upsert', *scope)
+
+    def _post_scope(self, post_id):
+        from ..models.post import Post
+
+        post = self.session.identity_map.get(sa_inspect(Post).identity_key_from_primary_key((post_id,)))
+        if post is not None:
+            scope = _values(post, 'club_id', 'user_id')
+        else:
+            scope = self.session.connection().execute(
+                select(Post.club_id, Post.user_id).where(Post.id == post_id)
+            ).first()
+        self._post_scopes[post_id] = tuple(scope) if scope else None
+        return self._post_scopes[post_id]
+
+
+def _before_flush(session, flush_context, instances):
+    """
+    Deleting a user or club removes their posts and watchlist items by ON
+    DELETE CASCADE, which the ORM never sees; note their tombstones, and the
+    posts that lose the user's likes and comments, while they still exist.
+    """
+    from ..models.club import Club
+    from ..models.comment import Comment
+    from ..models.like import Like
+    from ..models.post import Post
+    from ..models.user import User
+    from ..models.watchlist import Watchlist
+
+    users = [_values(obj, 'id')[0] for obj in session.deleted if isinstance(obj, User)]
+    clubs = [_values(obj, 'id')[0] for obj in session.deleted if isinstance(obj, Club)]
+    if not users and not clubs:
+        return
+
+    connection = session.connection()
+    cascaded = []
+    posts = connection.execute(
+        select(Post.id, Post.club_id, Post.user_id).where(or_(Post.user_id.in_(users), Post.club_id.in_(clubs)))
+    ).all()
+    cascaded += [('post', post_id, 'delete', club_id, user_id) for post_id, club_id, user_id in posts]
+    if users:
+        items = connection.execute(select(Watchlist.id, Watchlist.user_id).where(Watchlist.user_id.in_(users))).all()
+        cascaded += [('watchlist', item_id, 'delete', None, user_id) for item_id, user_id in items]
+        touched = connection.execute(
+            select(Post.id, Post.club_id, Post.user_id).where(or_(
+                Post.id.in_(select(Like.post_id).where(Like.user_id.in_(users))),
+                Post.id.in_(select(Comment.post_id).where(Comment.user_id.in_(users))),
+            ))
+        ).all()
+        cascaded += [('post', post_id, 'upsert', club_id, user_id) for post_id, club_id, user_id in touched]
+    session.info.setdefault('cascaded_changes', []).extend(cascaded)
+
+
+def _after_flush(session, flush_context):
+    from ..models.change_log import ChangeLog
+    from ..models.comment import Comment
+    from ..models.like import Like
+    from ..models.post import Post
+    from ..models.watchlist import Watchlist
+
+    changed = [(obj, 'upsert') for obj in session.new]
+    changed += [(obj, 'upsert') for obj in session.dirty if session.is_modified(obj, include_collections=False)]
+    changed += [(obj, 'delete') for obj in session.deleted]
+    cascaded = session.info.pop('cascaded_changes', ())
+    if not changed and not cascaded:
+        return
+
+    changes = _FlushChanges(session)
+    # Deletes first, so a post that lost likes and was deleted stays deleted
+    for entity, entity_id, op, club_id, user_id in sorted(cascaded, key=lambda change: change[2] != 'delete'):
+        if entity == 'post' and op == 'delete':
+            changes.deleted_posts[entity_id] = (club_id, user_id)
+        changes.add(entity, entity_id, op, club_id, user_id)
+    # Posts first, so comments and likes flushed alongside them see their scope
+    for obj, op in changed:
+        if isinstance(obj, Post):
+            changes.post(obj, op)
+    for obj, op in changed:
+        if isinstance(obj, (Comment, Like)):
+            changes.touch_post(*_values(obj, 'post_id'))
+        elif isinstance(obj, Watchlist):
+            item_id, user_id = _values(obj, 'id', 'user_id')
+            changes.add('watchlist', item_id, op, user_id=user_id)
+
+    if changes.rows:
+        session.connection().execute(ChangeLog.__table__.insert(), list(changes.rows.values()))
+
+
+def _forget_cascaded(session, previous_transaction):
+    session.info.pop('cascaded_changes', None)
+
+
+def init_change_log(app):
+    """Records post and watchlist changes in change_log, in the same transaction as the change."""
+    from .. import db
+
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'after_soft_rollback', _forget_cascaded)
+
+
+# --- sync tokens --------------------------------------------------------------
+
+def encode_token(cursor):
+    return base64.urlsafe_b64encode(f'{TOKEN_VERSION}:{cursor}'.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        version, cursor = raw.split(':', 1)
+        if version != TOKEN_VERSION:
+            raise ValueError(version)
+        cursor = int(cursor)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidSyncToken(token)
+    if cursor < 0:
+        raise InvalidSyncToken(token)
+    return cursor
+
+
+# --- reading ------------------------------------------------------------------
+
+def _settled_before(settle_seconds):
+    return datetime.utcnow() - timedelta(seconds=settle_seconds)
+
+
+def snapshot_cursor(settle_seconds):
+    """
+    The cursor a full snapshot taken now is consistent with: the newest
+    change older than the settle window. Anything later is replayed by the
+    next delta, which is harmless since upserts and tombstones are idempotent.
+    """
+    from .. import db
+    from ..models.change_log import ChangeLog
+
+    cursor = db.session.execute(
+        select(func.max(ChangeLog.id)).where(ChangeLog.created_at <= _settled_before(settle_seconds))
+    ).scalar()
+    return cursor or 0
+
+
+def read_changes(scope, cursor, limit, settle_seconds):
+    """
+    Changes visible in `scope` (a column == value clause on ChangeLog) after
+    `cursor`, in log order. Returns ({entity: {id: op}}, next cursor, has_more).
+
+    Ids are allocated when a row is inserted but become visible when its
+    transaction commits, so on Postgres a lower id can appear after a higher
+    one was read. The cursor therefore never moves past a change younger
+    than SYNC_SETTLE_SECONDS: those are sent now and sent again next time.
+    """
+    from .. import db
+    from ..models.change_log import ChangeLog
+
+    oldest = db.session.execute(select(func.min(ChangeLog.id))).scalar()
+    if oldest is not None and cursor < oldest - 1:
+        raise SyncTokenExpired(cursor)
+
+    rows = db.session.execute(
+        select(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op, ChangeLog.created_at)
+        .where(scope, ChangeLog.id > cursor)
+        .order_by(ChangeLog.id)
+        .limit(limit + 1)
+    ).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    settled_before = _settled_before(settle_seconds)
+    next_cursor, settled = cursor, True
+    changes = {}
+    for row in rows:
+        changes.setdefault(row.entity, {})[row.entity_id] = row.op
+        settled = settled and row.created_at <= settled_before
+        if settled:
+            next_cursor = row.id
+    if settled and not more:
+        # Caught up: move past other scopes' changes too, so a quiet club's
+        # token doesn't fall behind the retention window
+        next_cursor = max(next_cursor, snapshot_cursor(settle_seconds))
+    # A page cut short by the settle window is the end for now; poll again later
+    more = more and settled
+    return changes, next_cursor, more
+
+
+# --- retention ----------------------------------------------------------------
+
+@click.command('prune-change-log')
+@click.option('--days', type=int, help='Keep this many days of changes (default: SYNC_RETENTION_DAYS).')
+@with_appcontext
+def prune_change_log_command(days):
+    """Delete change-log rows older than the retention window."""
+    from flask import current_app
+    from .. import db
+    from ..models.change_log import ChangeLog
+
+    if days is None:
+        days = current_app.config.get('SYNC_RETENTION_DAYS', 30)
+    newest = db.session.execute(select(func.max(ChangeLog.id))).scalar()
+    if newest is None:
+        click.echo("change_log is empty")
+        return
+    # The newest row always stays: it is how read_changes tells a pruned token from a quiet one
+    result = db.session.execute(
+        delete(ChangeLog).where(ChangeLog.created_at < datetime.utcnow() - timedelta(days=days), ChangeLog.id < newest)
+    )
+    db.session.commit()
+    click.echo(f"Deleted {result.rowcount:,} change-log rows older than {days} days")
@@ -0,0 +1,214 @@
+import gzip
+import logging
+import re
+import zlib
+
+from flask import g, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/html',
+    'text/plain',
+    'text/css',
+    'text/csv',
+))
+_ETAG_SUFFIX = re.compile(r'-(gzip|br|zstd)"')
+
+
+def available_encodings():
+    encodings = []
+    if zstandard is not None:
+        encodings.append('zstd')
+    if brotli is not None:
+        encodings.append('br')
+    encodings.append('gzip')
+    return encodings
+
+
+def parse_accept_encoding(header):
+    """Parses an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for item in (header or '').split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(header, enabled):
+    """The enabled coding the client prefers most (ties go to the order of `enabled`), or None."""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in enabled:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    """Uniform incremental interface over zlib/brotli/zstandard."""
+
+    def __init__(self, encoding, levels):
+        self.encoding = encoding
+        if encoding == 'gzip':
+            # wbits=31 writes a gzip header/trailer rather than raw deflate
+            self._obj = zlib.compressobj(levels['gzip'], zlib.DEFLATED, 31)
+            self.compress, self._finish = self._obj.compress, self._obj.flush
+        elif encoding == 'br':
+            self._obj = brotli.Compressor(quality=levels['br'])
+            self.compress, self._finish = self._obj.process, self._obj.finish
+        elif encoding == 'zstd':
+            self._obj = zstandard.ZstdCompressor(level=levels['zstd']).compressobj()
+            self.compress, self._finish = self._obj.compress, self._obj.flush
+        else:
+            raise ValueError(f'Unsupported content coding {encoding!r}')
+
+    def finish(self):
+        return self._finish()
+
+
+def compress(data, encoding, levels):
+    """One-shot compression of a complete body."""
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=levels['gzip'], mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=levels['br'])
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=levels['zstd']).compress(data)
+    raise ValueError(f'Unsupported content coding {encoding!r}')
+
+
+def _compressed_stream(chunks, compressor):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def strip_etag_encoding(header):
+    """Removes the -<coding> suffix we add to ETags, so views see their own values."""
+    return _ETAG_SUFFIX.sub('"', header)
+
+
+class Compression:
+    """
+    Negotiated response compression: zstd and brotli when their modules are
+    installed, gzip always. Bodies below COMPRESS_MIN_SIZE, non-text types,
+    already-encoded and `Cache-Control: no-transform` responses are left as
+    they are. Streamed responses are compressed chunk by chunk, and ETags get
+    a -<coding> suffix so each representation keeps a distinct validator.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['compression'] = self
+        enabled = [coding.strip() for coding in app.config.get('COMPRESS_ALGORITHMS', '').split(',') if coding.strip()]
+        self.enabled = [coding for coding in enabled if coding in available_encodings()]
+        skipped = set(enabled) - set(self.enabled)
+        if skipped:
+            logger.info("Compression codings not available and skipped: %s", ', '.join(sorted(skipped)))
+        if not self.enabled:
+            return
+
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        self.levels = {
+            'gzip': app.config.get('COMPRESS_LEVEL', 6),
+            'br': app.config.get('COMPRESS_BR_LEVEL', 4),
+            'zstd': app.config.get('COMPRESS_ZSTD_LEVEL', 3),
+        }
+
+        @app.before_request
+        def strip_conditional_etags():
+            for key in ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MATCH'):
+                value = request.environ.get(key)
+                if value:
+                    match = _ETAG_SUFFIX.search(value)
+                    if match:
+                        # A 304 must repeat the validator the client holds
+                        g.etag_coding = match.group(1)
+                        request.environ[key] = strip_etag_encoding(value)
+
+        app.after_request(self.compress_response)
+
+    def negotiate(self, accept_encoding):
+        return choose_encoding(accept_encoding, self.enabled)
+
+    def compress_body(self, data, encoding):
+        """Compressed bytes, or None if `data` is too small or doesn't shrink."""
+        if len(data) < self.min_size:
+            return None
+        compressed = compress(data, encoding, self.levels)
+        return compressed if len(compressed) < len(data) else None
+
+    def compress_response(self, response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if response.status_code == 304:
+            coding = getattr(g, 'etag_coding', None)
+            etag, weak = response.get_etag()
+            if etag and coding:
+                response.set_etag(f'{etag}-{coding}', weak)
+            return response
+        if (request.method == 'HEAD'
+                or response.status_code < 200 or response.status_code == 204
+                or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        encoding = self.negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compressed_stream(response.response, _Compressor(encoding, self.levels))
+            response.headers.pop('Content-Length', None)
+        else:
+            compressed = self.compress_body(response.get_data(), encoding)
+            if compressed is None:
+                return response
+            response.set_data(compressed)
+
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+        return response
@@ -0,0 +1,197 @@
+import logging
+import threading
+
+from flask import current_app, g, has_request_context, jsonify, make_response, request
+from sqlalchemy import event, exc
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+# Postgres SQLSTATEs for statement_timeout and lock_timeout cancellations
+QUERY_CANCELED = '57014'
+LOCK_NOT_AVAILABLE = '55P03'
+
+
+def statement_timeout(ms, lock_ms=None):
+    """
+    Overrides the per-transaction statement (and optionally lock) timeout for
+    one view, e.g. a report endpoint that legitimately needs longer than the
+    STATEMENT_TIMEOUT_READ_MS default:
+
+        @post_bp.route('/posts/export')
+        @statement_timeout(15000)
+        def export_posts(): ...
+    """
+    def decorator(view):
+        view._statement_timeout_ms = ms
+        view._lock_timeout_ms = lock_ms
+        return view
+    return decorator
+
+
+class PoolStats:
+    """Thread-safe counters fed by connection pool events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.exhausted = 0
+
+    def incr(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, engines):
+        with self._lock:
+            counters = {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'exhausted': self.exhausted,
+            }
+        pools = {}
+        for bind_key, engine in engines.items():
+            pool = engine.pool
+            pools[bind_key or 'default'] = {
+                'class': type(pool).__name__,
+                'size': pool.size() if hasattr(pool, 'size') else None,
+                'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+                'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+                'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+            }
+        return dict(counters, pools=pools)
+
+
+class EngineProfile:
+    """
+    Applies the production engine profile at runtime:
+
+    - SET LOCAL statement_timeout / lock_timeout at the start of every
+      Postgres transaction, short for reads, longer for writes and longest for
+      requestless batch jobs, overridable per view with @statement_timeout
+    - pool event counters (see pool_stats())
+    - fail-fast 503 responses when the pool is exhausted or a statement is
+      cancelled by its timeout, so clients retry instead of piling up
+    - foreign keys enforced on SQLite too, so ON DELETE CASCADE behaves as
+      it does on Postgres
+    """
+
+    def __init__(self, app=None):
+        self.stats = PoolStats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from .. import db
+
+        app.extensions['engine_profile'] = self
+
+        with app.app_context():
+            for engine in db.engines.values():
+                if event.contains(engine.pool, 'checkout', self._on_checkout):
+                    continue
+                event.listen(engine.pool, 'connect', self._on_connect)
+                event.listen(engine.pool, 'checkout', self._on_checkout)
+                event.listen(engine.pool, 'checkin', self._on_checkin)
+                event.listen(engine.pool, 'invalidate', self._on_invalidate)
+                if engine.dialect.name == 'sqlite':
+                    event.listen(engine, 'connect', _enable_sqlite_foreign_keys)
+
+        if not event.contains(db.session, 'after_begin', _set_transaction_timeouts):
+            event.listen(db.session, 'after_begin', _set_transaction_timeouts)
+
+        app.register_error_handler(exc.TimeoutError, self._pool_exhausted)
+        app.register_error_handler(exc.OperationalError, _operational_error)
+
+    def dispose_pools(self, app):
+        """
+        Call in a freshly forked worker: drops the connections inherited from
+        the parent without closing them (that would close the parent's
+        sockets too), so the worker opens its own.
+        """
+        from .. import db
+
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
+
+    def pool_stats(self):
+        from .. import db
+        return self.stats.snapshot(db.engines)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.stats.incr('connects')
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.stats.incr('checkouts')
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.stats.incr('checkins')
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.stats.incr('invalidations')
+
+    def _pool_exhausted(self, error):
+        from .. import db
+
+        self.stats.incr('exhausted')
+        g.pool_exhausted = True
+        db.session.rollback()
+        logger.warning("Connection pool exhausted on %s %s: %s", request.method, request.path, error)
+        response = make_response(jsonify({'message': 'Service busy, please retry'}), 503)
+        response.headers['Retry-After'] = '1'
+        return response
+
+
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, ON DELETE CASCADE included, unless asked per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+def _timeouts_for_current_context(config):
+    """Returns (statement_timeout_ms, lock_timeout_ms) for the running request or job."""
+    if not has_request_context():
+        return config['STATEMENT_TIMEOUT_BATCH_MS'], config['LOCK_TIMEOUT_BATCH_MS']
+
+    view = current_app.view_functions.get(request.endpoint)
+    # Flask-RESTful resources keep the class on the generated view function
+    view_class = getattr(view, 'view_class', None)
+    handler = getattr(view_class, request.method.lower(), None) if view_class else view
+    override = getattr(handler, '_statement_timeout_ms', None)
+    if override is not None:
+        lock_override = getattr(handler, '_lock_timeout_ms', None)
+        return override, config['LOCK_TIMEOUT_MS'] if lock_override is None else lock_override
+
+    if request.method in READ_METHODS:
+        return config['STATEMENT_TIMEOUT_READ_MS'], config['LOCK_TIMEOUT_MS']
+    return config['STATEMENT_TIMEOUT_WRITE_MS'], config['LOCK_TIMEOUT_MS']
+
+
+def _set_transaction_timeouts(session, transaction, connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    statement_ms, lock_ms = _timeouts_for_current_context(current_app.config)
+    # Integers from config only, so formatting them into the statement is safe
+    connection.exec_driver_sql(
+        f"SET LOCAL statement_timeout = {int(statement_ms)}; SET LOCAL lock_timeout = {int(lock_ms)}"
+    )
+
+
+def _operational_error(error):
+    from .. import db
+
+    db.session.rollback()
+    pgcode = getattr(error.orig, 'pgcode', None)
+    if pgcode in (QUERY_CANCELED, LOCK_NOT_AVAILABLE):
+        logger.warning("Statement cancelled (%s) on %s %s", pgcode, request.method, request.path)
+        response = make_response(jsonify({'message': 'The request took too long, please retry'}), 503)
+        response.headers['Retry-After'] = '1'
+        return response
+    logger.exception("Database error on %s %s", request.method, request.path)
+    return make_response(jsonify({'message': f'Unexpected error: {str(error)}'}), 500)
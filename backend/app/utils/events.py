@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import deque
+
+from flask import Response, current_app, jsonify, make_response
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_OVERFLOW = object()
+
+
+def club_channel(club_id):
+    return f'club:{club_id}'
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def _new_event_id():
+    # Time-ordered for readability; resume only ever matches ids exactly
+    return f'{time.time_ns() // 1000:x}-{secrets.token_hex(3)}'
+
+
+class Event:
+    __slots__ = ('id', 'type', 'channels', 'data', 'frame')
+
+    def __init__(self, event_id, event_type, channels, data):
+        self.id = event_id
+        self.type = event_type
+        self.channels = frozenset(channels)
+        self.data = data  # Already JSON-encoded
+        self.frame = f'id: {event_id}\nevent: {event_type}\ndata: {data}\n\n'.encode()
+
+    def to_json(self):
+        return json.dumps({'id': self.id, 'type': self.type, 'channels': sorted(self.channels), 'data': self.data})
+
+    @classmethod
+    def from_json(cls, raw):
+        message = json.loads(raw)
+        return cls(message['id'], message['type'], message['channels'], message['data'])
+
+
+class StreamLimitReached(Exception):
+    """This process already serves EVENTS_MAX_STREAMS open streams."""
+
+
+class _Subscription:
+    def __init__(self, channels, size):
+        self.channels = frozenset(channels)
+        self.queue = queue.Queue(maxsize=size)
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def overflow(self):
+        """A client this far behind resyncs over REST instead of growing the queue."""
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.offer(_OVERFLOW)
+
+
+class EventBus:
+    """
+    Server-sent events for club and user timelines.
+
+    Routes publish compact events after their commit; every open stream whose
+    channels match gets them. The last EVENTS_BUFFER_SIZE events are kept so a
+    reconnecting EventSource resumes from its Last-Event-ID; if that id has
+    already left the buffer the stream sends `reset` and the client refetches.
+
+    Without EVENTS_REDIS_URL the bus is per process, so a stream only sees
+    events published by the worker serving it and can only resume on that
+    worker: that mode is for a single worker (development, tests), and
+    startup warns when WEB_CONCURRENCY says there are more. With it,
+    publishes go through one Redis channel that every worker listens on,
+    which also gives all workers the same order and so the same resume buffer.
+
+    Each open stream holds a worker thread (or greenlet) but no DB connection,
+    so serve them from gthread or gevent workers; EVENTS_MAX_STREAMS keeps
+    streams from taking every thread in a process, and is 0 by default under
+    gunicorn's sync worker, whose one thread a stream would hold past the
+    worker timeout.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._buffer = deque(maxlen=1000)
+        self._redis = None
+        self._listener_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['events'] = self
+        self._buffer = deque(self._buffer, maxlen=app.config.get('EVENTS_BUFFER_SIZE', 1000))
+        self.heartbeat = app.config.get('EVENTS_HEARTBEAT_SECONDS', 15)
+        self.max_seconds = app.config.get('EVENTS_STREAM_MAX_SECONDS', 300)
+        self.max_streams = app.config.get('EVENTS_MAX_STREAMS', 50)
+        self.queue_size = app.config.get('EVENTS_QUEUE_SIZE', 256)
+        self.redis_channel = app.config.get('EVENTS_REDIS_CHANNEL', 'movieclub:events')
+
+        url = app.config.get('EVENTS_REDIS_URL')
+        if url and redis is None:
+            logger.warning("EVENTS_REDIS_URL is set but redis is not installed; events stay per process")
+        elif url:
+            self._redis = redis.Redis.from_url(url)
+        if self._redis is None and int(os.getenv('WEB_CONCURRENCY', 1)) > 1:
+            logger.warning("Events are per process but WEB_CONCURRENCY=%s: streams will miss events published "
+                           "by other workers and can't resume across them; set EVENTS_REDIS_URL",
+                           os.getenv('WEB_CONCURRENCY'))
+
+    # --- publishing -----------------------------------------------------------
+
+    def publish(self, channels, event_type, payload):
+        """Sends `payload` (JSON-encodable) to every stream listening on any of `channels`."""
+        event = Event(_new_event_id(), event_type, channels, current_app.json.dumps(payload))
+        if self._redis is not None:
+            self._ensure_listener()
+            try:
+                self._redis.publish(self.redis_channel, event.to_json())
+                return event
+            except redis.RedisError:
+                logger.warning("Redis publish failed; delivering %s to this process only", event_type, exc_info=True)
+        self._deliver(event)
+        return event
+
+    def _deliver(self, event):
+        with self._lock:
+            self._buffer.append(event)
+            subscribers = [sub for sub in self._subscribers if sub.channels & event.channels]
+        for sub in subscribers:
+            if not sub.offer(event):
+                sub.overflow()
+
+    # --- Redis fan-out --------------------------------------------------------
+
+    def _ensure_listener(self):
+        """Starts this process's Redis listener; after a fork the child needs its own."""
+        if self._redis is None or self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.redis_channel)
+            threading.Thread(target=self._listen, args=(pubsub,), name='event-bus-redis', daemon=True).start()
+
+    def _listen(self, pubsub):
+        while True:
+            try:
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self._deliver(Event.from_json(message['data']))
+            except Exception:
+                # pubsub resubscribes on the next listen()
+                logger.exception("Event bus Redis listener failed; reconnecting")
+                time.sleep(1)
+
+    # --- streaming ------------------------------------------------------------
+
+    def subscribe(self, channels, last_event_id=None):
+        """Registers a subscription; returns (subscription, replay events or None if the id is gone)."""
+        self._ensure_listener()
+        sub = _Subscription(channels, self.queue_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                raise StreamLimitReached()
+            self._subscribers.add(sub)
+            replay = []
+            if last_event_id:
+                ids = [event.id for event in self._buffer]
+                if last_event_id not in ids:
+                    return sub, None
+                for event in list(self._buffer)[ids.index(last_event_id) + 1:]:
+                    if event.channels & sub.channels:
+                        replay.append(event)
+        return sub, replay
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stream(self, channels, last_event_id=None):
+        """An open text/event-stream response for `channels`, or a 503 when this process is full."""
+        try:
+            sub, replay = self.subscribe(channels, last_event_id)
+        except StreamLimitReached:
+            response = make_response(jsonify({'message': 'Too many open event streams, please retry'}), 503)
+            response.headers['Retry-After'] = '5'
+            return response
+
+        response = Response(self._frames(sub, replay), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # Keep proxies from holding events back
+        return response
+
+    def _frames(self, sub, replay):
+        # Runs after the request context is gone: nothing in here may touch the DB
+        deadline = time.monotonic() + self.max_seconds
+        try:
+            yield b'retry: 3000\n\n'
+            if replay is None:
+                yield b'event: reset\ndata: {}\n\n'
+                replay = []
+            for event in replay:
+                yield event.frame
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Clients reconnect with Last-Event-ID, which also picks up new memberships
+                    return
+                try:
+                    event = sub.queue.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    yield b': ping\n\n'
+                    continue
+                if event is _OVERFLOW:
+                    yield b'event: reset\ndata: {}\n\n'
+                    return
+                yield event.frame
+        finally:
+            self.unsubscribe(sub)
@@ -0,0 +1,197 @@
+"""
+Personal data export: a ZIP of JSON-lines files, one per kind of row a user
+owns, streamed to the client as it is built.
+
+    profile.json     posts.jsonl      comments.jsonl   likes.jsonl
+    follows.jsonl    watchlist.jsonl  reviews.jsonl
+
+Rows are read as plain column tuples through server-side cursors
+(yield_per), written into the ZIP entry and handed to the WSGI server in
+EXPORT_CHUNK_BYTES pieces, so memory stays flat however long the user's
+history is and no relationship is ever loaded. Each export holds one pooled
+connection until the client has the whole file, which is why only
+EXPORT_MAX_CONCURRENT run at once per process.
+
+Posts, comments and likes moved to the archive (app/utils/archive.py)
+follow the live rows in their files, marked "archived": true. The archive
+keeps only who liked which post, so an archived like has no id or date.
+"""
+import io
+import logging
+import threading
+import time
+import zipfile
+
+from flask import Response, current_app, jsonify, make_response, stream_with_context
+from sqlalchemy import or_, select
+
+logger = logging.getLogger(__name__)
+
+# Credentials never leave the server, not even to their owner; derived columns (ranking, movie links) aren't the user's data
+NOT_EXPORTED = frozenset((
+    '_password_hash', 'reset_token', 'reset_token_expires_at', 'trending_points', 'trending_score', 'movie_id',
+))
+
+
+class _Sink(io.RawIOBase):
+    """The ZIP's output file: collects what ZipFile writes until the stream takes it."""
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _columns(model):
+    return [column for column in model.__table__.c if column.name not in NOT_EXPORTED]
+
+
+def _batches(statement, fetch_size, **extra):
+    """The statement's rows as dicts, a cursor fetch at a time."""
+    from .. import db
+
+    result = db.session.execute(statement, execution_options={'yield_per': fetch_size})
+    for partition in result.mappings().partitions():
+        yield [dict(row, **extra) for row in partition]
+
+
+def _in_batches(rows, fetch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= fetch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _post_batches(user_id, fetch_size):
+    from .. import archive
+    from ..models.post import Post
+
+    yield from _batches(
+        select(*_columns(Post)).where(Post.user_id == user_id).order_by(Post.id), fetch_size, archived=False,
+    )
+    # Archived posts as they were stored; their likes and comments go in the files below
+    columns = [column.name for column in _columns(Post)]
+    yield from _in_batches(
+        (dict({name: record.get(name) for name in columns}, archived=True)
+         for record in archive.scan('users', user_id)),
+        fetch_size,
+    )
+
+
+def _comment_batches(user_id, fetch_size):
+    from .. import archive
+    from ..models.comment import Comment
+
+    yield from _batches(
+        select(*_columns(Comment)).where(Comment.user_id == user_id).order_by(Comment.id), fetch_size, archived=False,
+    )
+    # On anyone's archived posts, not only the user's own
+    columns = [column.name for column in _columns(Comment)]
+    yield from _in_batches(
+        (dict({name: comment.get(name) for name in columns}, post_id=record['id'], archived=True)
+         for record in archive.engaged(user_id) for comment in record['comments'] if comment['user_id'] == user_id),
+        fetch_size,
+    )
+
+
+def _like_batches(user_id, fetch_size):
+    from .. import archive
+    from ..models.like import Like
+
+    yield from _batches(
+        select(*_columns(Like)).where(Like.user_id == user_id).order_by(Like.id), fetch_size, archived=False,
+    )
+    columns = [column.name for column in _columns(Like)]
+    yield from _in_batches(
+        (dict(dict.fromkeys(columns), user_id=user_id, post_id=record['id'], archived=True)
+         for record in archive.engaged(user_id) if user_id in record['likes']),
+        fetch_size,
+    )
+
+
+def _files(user_id, fetch_size):
+    from ..models.follow import Follow
+    from ..models.review import Review
+    from ..models.user import User
+    from ..models.watchlist import Watchlist
+
+    def owned(model, *clauses):
+        return _batches(select(*_columns(model)).where(*clauses).order_by(model.id), fetch_size)
+
+    return (
+        ('profile.json', owned(User, User.id == user_id)),
+        ('posts.jsonl', _post_batches(user_id, fetch_size)),
+        ('comments.jsonl', _comment_batches(user_id, fetch_size)),
+        ('likes.jsonl', _like_batches(user_id, fetch_size)),
+        # Both directions: who they follow and who follows them
+        ('follows.jsonl', owned(Follow, or_(Follow.follower_id == user_id, Follow.followed_id == user_id))),
+        ('watchlist.jsonl', owned(Watchlist, Watchlist.user_id == user_id)),
+        ('reviews.jsonl', owned(Review, Review.user_id == user_id)),
+    )
+
+
+class DataExport:
+    """Streams users' data exports, at most EXPORT_MAX_CONCURRENT at a time per process."""
+
+    def __init__(self, app=None):
+        self._slots = threading.BoundedSemaphore(2)
+        self.fetch_size = 1000
+        self.chunk_bytes = 64 * 1024
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['data_export'] = self
+        self._slots = threading.BoundedSemaphore(max(1, app.config.get('EXPORT_MAX_CONCURRENT', 2)))
+        self.fetch_size = app.config.get('EXPORT_FETCH_SIZE', 1000)
+        self.chunk_bytes = app.config.get('EXPORT_CHUNK_BYTES', 64 * 1024)
+
+    def response(self, user):
+        """A streamed application/zip response with everything `user` owns, or a 503 when this process is busy."""
+        if not self._slots.acquire(blocking=False):
+            response = make_response(jsonify({'message': 'Too many exports in progress, please retry'}), 503)
+            response.headers['Retry-After'] = '30'
+            return response
+
+        response = Response(stream_with_context(self._stream(user.id)), mimetype='application/zip')
+        # Released when the server closes the response, whether or not it was read to the end
+        response.call_on_close(self._slots.release)
+        filename = f"movieclub-export-{user.username}-{time.strftime('%Y%m%d')}.zip"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'private, no-store'
+        return response
+
+    def _stream(self, user_id):
+        dumps = current_app.json.dumps
+        started = time.monotonic()
+        date_time = time.localtime()[:6]
+        sink = _Sink()
+        with zipfile.ZipFile(sink, 'w') as bundle:
+            for name, batches in _files(user_id, self.fetch_size):
+                info = zipfile.ZipInfo(name, date_time=date_time)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                # Sizes aren't known up front, so allow for entries past 4 GiB
+                with bundle.open(info, 'w', force_zip64=True) as entry:
+                    for batch in batches:
+                        entry.write(''.join(dumps(row) + '\n' for row in batch).encode())
+                        if sink.size >= self.chunk_bytes:
+                            yield sink.take()
+        yield sink.take()
+        logger.info("Exported user %s's data in %.1fs", user_id, time.monotonic() - started)
@@ -0,0 +1,91 @@
+import dataclasses
+import decimal
+import uuid
+from datetime import date, datetime, time
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # Falls back to the stdlib encoder below
+    orjson = None
+
+
+def _default(o):
+    """Types neither encoder handles natively. Dates use ISO 8601 on both paths."""
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson when it is installed. Keeps Flask's
+    defaults (sorted keys, compact output, indent=2 in debug) and encodes
+    datetimes as ISO 8601, so models can put them in to_dict() as-is.
+    Calls with options orjson doesn't support, and values it can't encode
+    (e.g. ints beyond 64 bits), go through the stdlib encoder instead.
+    """
+
+    default = staticmethod(_default)
+
+    def _orjson_options(self, kwargs):
+        """orjson option flags for these json.dumps kwargs, or None if orjson can't honour them."""
+        if orjson is None:
+            return None
+        kwargs = dict(kwargs)
+        sort_keys = kwargs.pop('sort_keys', self.sort_keys)
+        indent = kwargs.pop('indent', None)
+        kwargs.pop('separators', None)
+        kwargs.pop('ensure_ascii', None)  # orjson always writes UTF-8
+        if kwargs or indent not in (None, 2):
+            return None
+        options = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj, **kwargs):
+        options = self._orjson_options(kwargs)
+        if options is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=options)
+            except orjson.JSONEncodeError:
+                pass
+        return super().dumps(obj, **kwargs).encode()
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers see the same error
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        dump_args = {}
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args['indent'] = 2
+        else:
+            dump_args['separators'] = (',', ':')
+        # Hands the encoded bytes straight to the response, skipping a str round trip
+        return self._app.response_class(self.dumps_bytes(obj, **dump_args) + b'\n', mimetype=self.mimetype)
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation that encodes through the app's JSON provider."""
+    response = current_app.json.response(data)
+    response.status_code = code
+    response.headers.extend(headers or {})
+    return response
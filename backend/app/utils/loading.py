@@ -0,0 +1,109 @@
+import logging
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+
+logger = logging.getLogger(__name__)
+
+# Named loader profiles: the root model and the relationship paths each
+# endpoint reads while serializing. Collections are selectin-loaded (one
+# extra query per level), many-to-ones joined into the parent query. Keep
+# these in step with the to_dict() methods they feed.
+PROFILES = {
+    # Post.to_dict(): author, likes with their users, comments with their users
+    'post_list': ('Post', ('author', 'likes.user', 'comments.user')),
+    'post_comments': ('Post', ('comments.user',)),
+    # Club.to_dict(): member_count
+    'club_list': ('Club', ('members',)),
+    'club_detail': ('Club', ('members',)),
+    # Compiled Movie serializer: reviews and watchlist entries with their users
+    'movie_list': ('Movie', ('reviews.user', 'watchlists.user')),
+    'movie_detail': ('Movie', ('reviews.user', 'watchlists.user')),
+    # Compiled User serializer reads columns only
+    'profile': ('User', ()),
+    'user_clubs': ('ClubMember', ('club.members',)),
+    'liked_posts': ('Like', ('post.author', 'post.likes.user', 'post.comments.user')),
+    'following': ('Follow', ('followed',)),
+    'followers': ('Follow', ('follower',)),
+    # Compiled Watchlist serializer: the user, and the movie with its reviews' users
+    'watchlist': ('Watchlist', ('user', 'movie.reviews.user')),
+}
+
+_compiled = {}
+
+
+def _model(name):
+    from .. import db
+    for mapper in db.Model.registry.mappers:
+        if mapper.class_.__name__ == name:
+            return mapper.class_
+    raise ValueError(f'No mapped model named {name!r}')
+
+
+def _tree(paths):
+    tree = {}
+    for path in paths:
+        node = tree
+        for key in path.split('.'):
+            node = node.setdefault(key, {})
+    return tree
+
+
+def _options(model, tree, strict):
+    relationships = sa_inspect(model).relationships
+    options = []
+    for key, subtree in tree.items():
+        if key not in relationships:
+            raise ValueError(f'{model.__name__} has no relationship {key!r}')
+        relationship = relationships[key]
+        attribute = getattr(model, key)
+        loader = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        children = _options(relationship.mapper.class_, subtree, strict)
+        if children:
+            loader = loader.options(*children)
+        options.append(loader)
+    if strict:
+        # Anything the profile didn't plan for raises instead of querying
+        options.append(raiseload('*', sql_only=True))
+    return options
+
+
+def is_strict():
+    return has_app_context() and current_app.config.get('LOADER_STRICT', False)
+
+
+def load_profile(name, strict=None):
+    """
+    Loader options for the named profile, e.g.
+
+        Post.query.options(*load_profile('post_list')).filter_by(club_id=club_id)
+
+    In strict mode (LOADER_STRICT) every level also gets raiseload('*'), so
+    touching a relationship the profile doesn't list raises.
+    """
+    if strict is None:
+        strict = is_strict()
+    key = (name, bool(strict))
+    if key not in _compiled:
+        model_name, paths = PROFILES[name]
+        _compiled[key] = tuple(_options(_model(model_name), _tree(paths), strict))
+    return _compiled[key]
+
+
+def _raise_on_unplanned_loads(execute_state):
+    """Strict mode: top-level ORM SELECTs without a profile may not lazy load either."""
+    if (execute_state.is_select and not execute_state.is_column_load
+            and not execute_state.is_relationship_load and is_strict()):
+        execute_state.statement = execute_state.statement.options(raiseload('*', sql_only=True))
+
+
+def init_loader_profiles(app):
+    """Validates every profile at startup and, with LOADER_STRICT, enforces them session-wide."""
+    from .. import db
+
+    for name in PROFILES:
+        load_profile(name, strict=False)
+    if app.config.get('LOADER_STRICT') and not event.contains(db.session, 'do_orm_execute', _raise_on_unplanned_loads):
+        event.listen(db.session, 'do_orm_execute', _raise_on_unplanned_loads)
+        logger.info("Strict loader profiles enabled: unplanned lazy loads will raise")
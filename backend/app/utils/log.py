@@ -0,0 +1,173 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+
+class JsonFormatter(logging.Formatter):
+    """Renders a record as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records emitted while handling a request with that request's id."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = getattr(g, 'request_id', None)
+            record.endpoint = request.endpoint
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits high-frequency records below `max_level`: each (logger, message
+    template) key may emit `rate` records per second (with bursts up to `burst`).
+    Dropped records are counted and reported on the next record that gets through
+    as `suppressed`, so volume stays visible without paying for every line.
+    """
+
+    def __init__(self, rate=10.0, burst=20, max_level=logging.WARNING):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.max_level = max_level
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= self.max_level or self.rate <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1.0:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1.0, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only merges the message arguments on the calling thread
+    (so later mutation of the arguments can't change the log line) and leaves
+    JSON encoding and traceback rendering to the listener thread.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+_listener = None
+
+
+def _parse_levels(spec):
+    """Parses 'app.routes=DEBUG,sqlalchemy.engine=WARNING' into a dict."""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def _restart_listener():
+    """
+    The writer thread doesn't survive fork(), so processes forked from a
+    preloaded gunicorn master start their own. Records still queued in the
+    parent are its to write; the child's copies are dropped.
+    """
+    while True:
+        try:
+            _listener.queue.get_nowait()
+        except queue.Empty:
+            break
+    _listener.start()
+
+
+def configure_logging(app):
+    """
+    Routes all logging through a non-blocking queue to a single JSON stdout
+    writer thread, applies LOG_LEVEL and per-module LOG_LEVELS, samples noisy
+    events and correlates every record with the request that produced it.
+    """
+    global _listener
+
+    root = logging.getLogger()
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    for name, level in _parse_levels(app.config.get('LOG_LEVELS')).items():
+        logging.getLogger(name).setLevel(level)
+
+    if _listener is None:
+        log_queue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(JsonFormatter())
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+        _listener.start()
+        atexit.register(_listener.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_restart_listener)
+
+        queue_handler = _DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        queue_handler.addFilter(SamplingFilter(
+            rate=app.config.get('LOG_SAMPLE_RATE', 10.0),
+            burst=app.config.get('LOG_SAMPLE_BURST', 20),
+        ))
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+
+    # Flask's own app.logger would otherwise attach a second, synchronous stderr handler
+    app.logger.handlers.clear()
+    app.logger.propagate = True
+
+    @app.before_request
+    def assign_request_id():
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        g.request_id = incoming if 0 < len(incoming) <= 64 and incoming.isprintable() else uuid.uuid4().hex
+
+    @app.after_request
+    def expose_request_id(response):
+        request_id = getattr(g, 'request_id', None)
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,41 @@
+import threading
+
+from flask import current_app
+
+
+class LazyMail:
+    """
+    Flask-Mail, imported and initialised on first use. Only the password
+    reset flow sends mail, so workers don't load flask_mail (and the
+    smtplib/email packages behind it) at boot. Reads the same MAIL_*
+    config as Flask-Mail.
+    """
+
+    def __init__(self, app=None):
+        self._mail = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['lazy_mail'] = self
+
+    def _state(self):
+        app = current_app._get_current_object()
+        if 'mail' not in app.extensions:
+            with self._lock:
+                if self._mail is None:
+                    from flask_mail import Mail
+                    self._mail = Mail()
+                if 'mail' not in app.extensions:
+                    self._mail.init_app(app)
+        return self._mail
+
+    def message(self, *args, **kwargs):
+        """A flask_mail.Message; defaults such as the sender come from the app's config."""
+        self._state()
+        from flask_mail import Message
+        return Message(*args, **kwargs)
+
+    def send(self, message):
+        self._state().send(message)
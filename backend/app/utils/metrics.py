@@ -0,0 +1,226 @@
+import functools
+import hmac
+import logging
+import os
+import threading
+import time
+
+from flask import Response, abort, g, request
+from sqlalchemy import event
+from sqlalchemy.engine.default import CacheStats
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+_CACHE_LABELS = {
+    CacheStats.CACHE_HIT: 'hit',
+    CacheStats.CACHE_MISS: 'miss',
+    CacheStats.CACHING_DISABLED: 'disabled',
+    CacheStats.NO_CACHE_KEY: 'no_key',
+    CacheStats.NO_DIALECT_SUPPORT: 'unsupported',
+}
+
+
+def multiprocess_dir():
+    """The shared directory gunicorn workers write their samples to, if configured."""
+    return os.getenv('PROMETHEUS_MULTIPROC_DIR') or os.getenv('prometheus_multiproc_dir')
+
+
+class Metrics:
+    """
+    Prometheus metrics served on /metrics:
+
+    - request count and latency per endpoint (e.g. post_bp.get_feed_posts),
+      method and status, plus statements issued per request
+    - statements by compiled-cache outcome (hit/miss), i.e. the SQLAlchemy
+      statement cache hit ratio
+    - app cache lookups (app/utils/cache.py) by key kind, the part of the
+      key before the first colon (user-summary, popular-movies, ...), and
+      hit/miss
+    - pooled connections checked out and opened, and pool exhaustion
+    - bcrypt hashes in progress (the CPU queue logins and sign-ups wait in)
+      and their duration
+
+    Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to a directory shared by
+    the workers (gunicorn.conf.py clears it at startup); each scrape then
+    aggregates every worker's samples. Recording a request is a dict lookup
+    and a few increments; nothing is computed until a scrape.
+
+    Scrapes send METRICS_TOKEN as a Bearer token. With METRICS_REQUIRE_TOKEN
+    (the default in production) and no token configured, /metrics is not
+    served at all.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self._requests = {}
+        self._local = threading.local()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from .. import bcrypt, cache, db
+
+        app.extensions['metrics'] = self
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        if prometheus_client is None:
+            logger.info("prometheus_client is not installed; /metrics is disabled")
+            return
+        self.token = app.config.get('METRICS_TOKEN')
+        if not self.token and app.config.get('METRICS_REQUIRE_TOKEN'):
+            logger.error("METRICS_TOKEN is not set; /metrics is disabled rather than served publicly")
+            return
+        if not self.enabled:
+            self._create_metrics()
+            self._instrument_bcrypt(bcrypt)
+            self._instrument_cache(cache)
+        self.enabled = True
+
+        with app.app_context():
+            for engine in db.engines.values():
+                if event.contains(engine, 'after_cursor_execute', self._after_cursor_execute):
+                    continue
+                event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+                event.listen(engine.pool, 'connect', self._on_connect)
+                event.listen(engine.pool, 'checkout', self._on_checkout)
+                event.listen(engine.pool, 'checkin', self._on_checkin)
+
+        app.before_request(self._start_timer)
+        app.after_request(self._record_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def _create_metrics(self):
+        Counter, Gauge, Histogram = prometheus_client.Counter, prometheus_client.Gauge, prometheus_client.Histogram
+        self.request_count = Counter(
+            'movieclub_http_requests_total', 'HTTP requests handled',
+            ('endpoint', 'method', 'status'))
+        self.request_latency = Histogram(
+            'movieclub_http_request_duration_seconds', 'Time from routing to the finished response',
+            ('endpoint', 'method', 'status'), buckets=LATENCY_BUCKETS)
+        self.request_queries = Histogram(
+            'movieclub_http_request_queries', 'SQL statements issued per request',
+            ('endpoint',), buckets=QUERY_BUCKETS)
+        self.statements = Counter(
+            'movieclub_db_statements_total', 'SQL statements executed, by compiled-statement cache outcome',
+            ('cache',))
+        self._statements = {stat: self.statements.labels(label) for stat, label in _CACHE_LABELS.items()}
+        self._no_cache_key = self._statements[CacheStats.NO_CACHE_KEY]
+        self.pool_checked_out = Gauge(
+            'movieclub_db_pool_checked_out', 'Pooled connections currently checked out',
+            multiprocess_mode='livesum')
+        self.pool_connects = Counter(
+            'movieclub_db_pool_connects_total', 'New DBAPI connections opened by the pools')
+        self.pool_exhausted = Counter(
+            'movieclub_db_pool_exhausted_total', 'Requests answered 503 because the pool was exhausted')
+        self.bcrypt_in_progress = Gauge(
+            'movieclub_bcrypt_in_progress', 'bcrypt hashes being computed or waiting for a CPU',
+            multiprocess_mode='livesum')
+        self.bcrypt_latency = Histogram(
+            'movieclub_bcrypt_duration_seconds', 'Time spent hashing or checking a password',
+            ('operation',), buckets=LATENCY_BUCKETS)
+        self.cache_lookups = Counter(
+            'movieclub_cache_lookups_total', 'App cache lookups, by key kind and hit/miss',
+            ('kind', 'result'))
+
+    def _instrument_bcrypt(self, bcrypt):
+        for name, operation in (('generate_password_hash', 'hash'), ('check_password_hash', 'check')):
+            method = getattr(bcrypt, name)
+            setattr(bcrypt, name, self._timed_bcrypt(method, self.bcrypt_latency.labels(operation)))
+
+    def _timed_bcrypt(self, method, histogram):
+        in_progress = self.bcrypt_in_progress
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            in_progress.inc()
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+                in_progress.dec()
+        return wrapper
+
+    def _instrument_cache(self, cache):
+        get = cache.get
+        lookups = self.cache_lookups
+        children = {}
+
+        @functools.wraps(get)
+        def wrapper(key):
+            value = get(key)
+            labels = (key.partition(':')[0], 'miss' if value is None else 'hit')
+            child = children.get(labels)
+            if child is None:
+                child = children[labels] = lookups.labels(*labels)
+            child.inc()
+            return value
+        cache.get = wrapper
+
+    # --- hooks ----------------------------------------------------------------
+
+    def _start_timer(self):
+        # Thread-local rather than flask.g: each proxied g access costs about a microsecond
+        self._local.started = time.perf_counter()
+        self._local.queries = 0
+
+    def _record_request(self, response):
+        local = self._local
+        started, local.started = getattr(local, 'started', None), None
+        if started is None:
+            return response
+        req = request._get_current_object()
+        endpoint = req.endpoint or '<unmatched>'
+        status = response.status_code
+        key = (endpoint, req.method, status)
+        children = self._requests.get(key)
+        if children is None:
+            labels = (endpoint, req.method, str(status))
+            children = self._requests[key] = (
+                self.request_count.labels(*labels),
+                self.request_latency.labels(*labels),
+                self.request_queries.labels(endpoint),
+            )
+        count, latency, queries = children
+        count.inc()
+        latency.observe(time.perf_counter() - started)
+        queries.observe(local.queries)
+        if status == 503 and g.get('pool_exhausted'):
+            self.pool_exhausted.inc()
+        return response
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._statements.get(getattr(context, 'cache_hit', None), self._no_cache_key).inc()
+        # Statements outside a request also land here; the next request resets it
+        self._local.queries = getattr(self._local, 'queries', 0) + 1
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.pool_connects.inc()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.pool_checked_out.inc()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.pool_checked_out.dec()
+
+    # --- exposition -----------------------------------------------------------
+
+    def metrics_view(self):
+        if self.token:
+            supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+            if not hmac.compare_digest(supplied.encode(), self.token.encode()):
+                abort(404)
+        if multiprocess_dir():
+            registry = prometheus_client.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prometheus_client.REGISTRY
+        return Response(prometheus_client.generate_latest(registry), mimetype=prometheus_client.CONTENT_TYPE_LATEST)
@@ -0,0 +1,244 @@
+"""
+Links free-text post titles to Movie rows: posts.movie_id, set when a post
+is created and by `flask link-post-movies` for the rest, is what
+GET /movies/<id>/posts reads through its (movie_id, created_at) index.
+
+Titles are compared normalized: accents and case folded, '&' read as 'and',
+apostrophes dropped and other punctuation treated as spaces, a leading or
+trailing article removed, and a year in brackets or after a comma or dash
+set aside. A title that doesn't match exactly is tried without a bare
+trailing year ("Dune 2021"), then fuzzily against the few movies sharing
+the most of its rarest three-letter sequences, which survive typos. A fuzzy
+match must have the same numbers ("2", "ii") as the title, and titles
+shorter than five characters aren't matched fuzzily. A year picks between
+movies with the same title; a title that still fits more than one movie, or
+none closely enough, stays unlinked.
+
+Each process keeps the catalog index in memory. Movie writes it commits
+itself rebuild it; other workers' show up within MOVIE_MATCHER_TTL seconds.
+"""
+import difflib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event, select, update
+
+logger = logging.getLogger(__name__)
+
+_APOSTROPHES = re.compile(r"['’`]")
+_BRACKETED_YEAR = re.compile(r'[(\[]\s*((?:18|19|20)\d\d)\s*[)\]]')
+_SEPARATED_YEAR = re.compile(r'\s*[,\-–—]\s*((?:18|19|20)\d\d)\s*$')
+_BARE_YEAR = re.compile(r'\s((?:18|19|20)\d\d)$')
+_PUNCTUATION = re.compile(r'[\W_]+')
+_ARTICLES = re.compile(r'^(?:the|a|an) | (?:the|a|an)$')
+_NUMBER = re.compile(r'\d+|ii|iii|iv|v|vi|vii|viii|ix')
+
+# Fuzzy matching compares a title with at most this many catalog titles, and
+# only titles of at least this many characters (normalized)
+_FUZZY_CANDIDATES = 50
+_FUZZY_MIN_LENGTH = 5
+
+
+def _numbers(text):
+    """The sequel and part numbers in a normalized title, which a typo can't excuse."""
+    return [token for token in text.split() if _NUMBER.fullmatch(token)]
+
+
+def _trigrams(text):
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def normalize_title(title):
+    """(normalized title, year or None) for a free-text movie title."""
+    text = unicodedata.normalize('NFKD', title or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    text = _APOSTROPHES.sub('', text.replace('&', ' and '))
+    year = None
+    for pattern in (_BRACKETED_YEAR, _SEPARATED_YEAR):
+        found = pattern.search(text)
+        if found:
+            year = int(found.group(1))
+            text = text[:found.start()] + ' ' + text[found.end():]
+            break
+    text = ' '.join(_PUNCTUATION.sub(' ', text).split())
+    return _ARTICLES.sub('', text).strip(), year
+
+
+class _CatalogIndex:
+    def __init__(self, movies):
+        self.titles = {}
+        self.trigrams = {}
+        for movie_id, title, release_year in movies:
+            normalized, _ = normalize_title(title)
+            if not normalized:
+                continue
+            self.titles.setdefault(normalized, []).append((movie_id, release_year))
+            for trigram in _trigrams(normalized):
+                self.trigrams.setdefault(trigram, set()).add(normalized)
+
+    def _pick(self, normalized, year):
+        movies = self.titles.get(normalized)
+        if not movies:
+            return None
+        if len(movies) > 1 and year is not None:
+            movies = [movie for movie in movies if movie[1] == year]
+        return movies[0][0] if len(movies) == 1 else None
+
+    def match(self, title, cutoff):
+        normalized, year = normalize_title(title)
+        if not normalized:
+            return None
+        if normalized in self.titles:
+            return self._pick(normalized, year)
+        bare = _BARE_YEAR.search(normalized)
+        if bare and normalized[:bare.start()] in self.titles:
+            return self._pick(normalized[:bare.start()], int(bare.group(1)))
+        if len(normalized) < _FUZZY_MIN_LENGTH:
+            return None
+
+        # Fuzzy: rank titles by how many of the query's rarest trigrams they share, compare the best few
+        trigrams = sorted((trigram for trigram in _trigrams(normalized) if trigram in self.trigrams),
+                          key=lambda trigram: len(self.trigrams[trigram]))
+        shared = Counter()
+        for trigram in trigrams[:12]:
+            shared.update(self.trigrams[trigram])
+        best, best_ratio, tied = None, cutoff, False
+        numbers = _numbers(normalized)
+        matcher = difflib.SequenceMatcher(b=normalized, autojunk=False)
+        for candidate, _ in shared.most_common(_FUZZY_CANDIDATES):
+            # "Godfather 2" is close to "Godfather" but isn't it
+            if _numbers(candidate) != numbers:
+                continue
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio > best_ratio:
+                best, best_ratio, tied = candidate, ratio, False
+            elif ratio == best_ratio and best is not None:
+                tied = True
+        if best is None or tied:
+            return None
+        return self._pick(best, year)
+
+
+class MovieMatcher:
+    """Matches free-text titles to movie ids against an in-memory index of the catalog."""
+
+    def __init__(self, app=None):
+        self.ttl = 300
+        self.cutoff = 0.85
+        self._index = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from .. import db
+
+        app.extensions['movie_matcher'] = self
+        self.ttl = app.config.get('MOVIE_MATCHER_TTL', 300)
+        self.cutoff = app.config.get('MOVIE_MATCH_CUTOFF', 0.85)
+        if not event.contains(db.session, 'after_flush', _note_movie_writes):
+            event.listen(db.session, 'after_flush', _note_movie_writes)
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_soft_rollback', _forget_movie_writes)
+        app.cli.add_command(link_post_movies_command)
+
+    def _after_commit(self, session):
+        if session.info.pop('movies_changed', False):
+            self.invalidate()
+
+    def invalidate(self):
+        self._expires = 0.0
+
+    def _catalog(self, session):
+        if time.monotonic() >= self._expires:
+            with self._lock:
+                if time.monotonic() >= self._expires:
+                    from ..models.movie import Movie
+
+                    movies = session.execute(select(Movie.id, Movie.title, Movie.release_year)).all()
+                    self._index = _CatalogIndex(movies)
+                    self._expires = time.monotonic() + self.ttl
+        return self._index
+
+    def match(self, title, session=None):
+        """The id of the movie `title` refers to, or None if no movie (or more than one) fits."""
+        from .. import db
+
+        return self._catalog(session or db.session).match(title, self.cutoff)
+
+
+def _note_movie_writes(session, flush_context):
+    from ..models.movie import Movie
+
+    if any(isinstance(obj, Movie) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['movies_changed'] = True
+
+
+def _forget_movie_writes(session, previous_transaction):
+    session.info.pop('movies_changed', None)
+
+
+# --- backfill -----------------------------------------------------------------
+
+def link_posts(session, relink=False, batch_size=1000):
+    """
+    Sets posts.movie_id for posts that have none (every post with `relink`),
+    a batch at a time, committing after each. Returns (posts read, posts
+    whose link changed).
+    """
+    from .. import movie_matcher
+    from ..models.post import Post
+
+    posts = Post.__table__
+    set_link = (
+        update(posts).where(posts.c.id == bindparam('post_id'))
+        .values(movie_id=bindparam('movie_id'), updated_at=posts.c.updated_at)  # Not an edit
+    )
+    matched = {}
+    read = changed = 0
+    last_id = 0
+    while True:
+        statement = select(Post.id, Post.movie_title, Post.movie_id).where(Post.id > last_id)
+        if not relink:
+            statement = statement.where(Post.movie_id.is_(None))
+        rows = session.execute(statement.order_by(Post.id).limit(batch_size)).all()
+        if not rows:
+            break
+        params = []
+        for post_id, title, movie_id in rows:
+            if title not in matched:
+                matched[title] = movie_matcher.match(title, session)
+            if matched[title] != movie_id:
+                params.append({'post_id': post_id, 'movie_id': matched[title]})
+        if params:
+            session.execute(set_link, params)
+        session.commit()
+        read += len(rows)
+        changed += len(params)
+        last_id = rows[-1].id
+    return read, changed
+
+
+@click.command('link-post-movies')
+@click.option('--relink', is_flag=True, help='Match every post again, not only the unlinked ones.')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Posts per transaction.')
+@with_appcontext
+def link_post_movies_command(relink, batch_size):
+    """Link posts to the movies their titles name. Run after migrating, and after adding movies."""
+    from .. import db
+
+    started = time.perf_counter()
+    read, changed = link_posts(db.session, relink=relink, batch_size=batch_size)
+    logger.info("Linked %s of %s posts to movies in %.1fs", changed, read, time.perf_counter() - started)
+    click.echo(f"Linked {changed:,} of {read:,} posts to movies")
@@ -0,0 +1,216 @@
+"""
+Movie popularity leaderboards from a daily rollup of watchlist changes.
+
+movie_popularity holds, per UTC day, movie and status, the net number of
+watchlist items that entered that status: adding an item is +1 for its
+status, changing its status -1 for the old one and +1 for the new one,
+removing it -1. Summed over a window that is the movie's movement in the
+window; summed over every day, its current watchlist counts. Either way a
+leaderboard reads a few rows per movie per day instead of grouping the
+whole watchlists table, and the result is cached for
+POPULAR_MOVIES_CACHE_SECONDS on top.
+
+Watchlist inserts, status changes and deletes (including those a deleted
+user's ON DELETE CASCADE makes) update today's rows in the transaction that
+writes them. Bulk loads bypass the session, so `flask rebuild-movie-popularity`
+recomputes the table from watchlists; it has to date each item's current
+status by the item's last update, the closest thing watchlists record.
+"""
+import logging
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, inspect as sa_inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+logger = logging.getLogger(__name__)
+
+# ?window= values and the days they cover, today included; None is all time
+WINDOWS = {'day': 1, 'week': 7, 'month': 30, 'year': 365, 'all': None}
+
+_UPSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _today():
+    return datetime.utcnow().date()
+
+
+# --- incremental updates ------------------------------------------------------
+
+def _status(obj, key):
+    """(old, new) value of `key` on a flushed watchlist item."""
+    history = sa_inspect(obj).attrs[key].history
+    new = history.added[0] if history.added else sa_inspect(obj).dict.get(key)
+    old = history.deleted[0] if history.deleted else new
+    return old, new
+
+
+def _collect_cascaded(session, flush_context, instances):
+    """Deleting a user removes their watchlist by ON DELETE CASCADE; note what it held while it exists."""
+    from ..models.user import User
+    from ..models.watchlist import Watchlist
+
+    users = [sa_inspect(obj).dict.get('id') for obj in session.deleted if isinstance(obj, User)]
+    if not users:
+        return
+    items = session.connection().execute(
+        select(Watchlist.id, Watchlist.movie_id, Watchlist.status).where(Watchlist.user_id.in_(users))
+    )
+    removed = session.info.setdefault('cascaded_watchlist', {})
+    removed.update((item_id, (movie_id, status)) for item_id, movie_id, status in items)
+
+
+def _apply_changes(session, flush_context):
+    from ..models.watchlist import Watchlist
+
+    # Keyed by item id: an item the ORM deleted may also be among the cascaded ones
+    removed = session.info.pop('cascaded_watchlist', {})
+    deltas = {}
+    for obj in session.deleted:
+        if isinstance(obj, Watchlist):
+            (movie_id, _), (status, _) = _status(obj, 'movie_id'), _status(obj, 'status')
+            removed[sa_inspect(obj).dict.get('id')] = (movie_id, status)
+    for key in removed.values():
+        deltas[key] = deltas.get(key, 0) - 1
+
+    for obj in session.new:
+        if isinstance(obj, Watchlist):
+            state = sa_inspect(obj).dict
+            key = (state.get('movie_id'), state.get('status'))
+            deltas[key] = deltas.get(key, 0) + 1
+    for obj in session.dirty:
+        if isinstance(obj, Watchlist) and obj not in session.deleted:
+            (old_movie, new_movie), (old_status, new_status) = _status(obj, 'movie_id'), _status(obj, 'status')
+            if (old_movie, old_status) != (new_movie, new_status):
+                deltas[old_movie, old_status] = deltas.get((old_movie, old_status), 0) - 1
+                deltas[new_movie, new_status] = deltas.get((new_movie, new_status), 0) + 1
+
+    deltas = {key: delta for key, delta in deltas.items() if delta and None not in key}
+    if deltas:
+        _add_counts(session, deltas)
+
+
+def _add_counts(session, deltas):
+    from ..models.movie import Movie
+    from ..models.movie_popularity import MoviePopularity
+
+    connection = session.connection()
+    movie_ids = {movie_id for movie_id, _ in deltas}
+    # Movies deleted in this flush are gone already, and so are their rollup rows
+    genres = dict(connection.execute(select(Movie.id, Movie.genre).where(Movie.id.in_(movie_ids))).all())
+    day = _today()
+    rows = [
+        {'day': day, 'movie_id': movie_id, 'status': status, 'genre': genres[movie_id], 'count': delta}
+        for (movie_id, status), delta in deltas.items()
+        if movie_id in genres
+    ]
+    if not rows:
+        return
+
+    table = MoviePopularity.__table__
+    upsert = _UPSERTS.get(connection.dialect.name)
+    if upsert is not None:
+        statement = upsert(table)
+        connection.execute(
+            statement.on_conflict_do_update(
+                index_elements=['day', 'movie_id', 'status'],
+                set_={'count': table.c.count + statement.excluded.count, 'genre': statement.excluded.genre},
+            ),
+            rows,
+        )
+        return
+    for row in rows:
+        key = (table.c.day == row['day'], table.c.movie_id == row['movie_id'], table.c.status == row['status'])
+        if not connection.execute(update(table).where(*key).values(count=table.c.count + row['count'])).rowcount:
+            connection.execute(insert(table), row)
+
+
+def _forget_cascaded(session, previous_transaction):
+    session.info.pop('cascaded_watchlist', None)
+
+
+def init_movie_popularity(app):
+    """Keeps movie_popularity current as watchlist items are added, change status or are removed."""
+    from .. import db
+
+    if not event.contains(db.session, 'after_flush', _apply_changes):
+        event.listen(db.session, 'before_flush', _collect_cascaded)
+        event.listen(db.session, 'after_flush', _apply_changes)
+        event.listen(db.session, 'after_soft_rollback', _forget_cascaded)
+
+
+# --- reading ------------------------------------------------------------------
+
+def popular_movies(window, genre=None, status=None, limit=20):
+    """
+    The `limit` movies with the most net watchlist additions over `window`
+    (a WINDOWS key), optionally only in `genre` and only into `status`,
+    as dicts of the movie's basic fields plus `count`. Cached for
+    POPULAR_MOVIES_CACHE_SECONDS.
+    """
+    from .. import cache, db
+    from ..models.movie import Movie
+    from ..models.movie_popularity import MoviePopularity
+
+    key = f'popular-movies:{window}:{genre or ""}:{status or ""}:{limit}'
+    movies = cache.get(key)
+    if movies is not None:
+        return movies
+
+    clauses = []
+    if WINDOWS[window] is not None:
+        clauses.append(MoviePopularity.day >= _today() - timedelta(days=WINDOWS[window] - 1))
+    if genre:
+        clauses.append(MoviePopularity.genre == genre)
+    if status:
+        clauses.append(MoviePopularity.status == status)
+    counts = (
+        select(MoviePopularity.movie_id, func.sum(MoviePopularity.count).label('count'))
+        .where(*clauses)
+        .group_by(MoviePopularity.movie_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        select(Movie.id, Movie.title, Movie.genre, Movie.release_year, Movie.director, Movie.poster_url, counts.c.count)
+        .join(counts, counts.c.movie_id == Movie.id)
+        .where(counts.c.count > 0)
+        .order_by(counts.c.count.desc(), Movie.id)
+        .limit(limit)
+    ).mappings()
+    movies = [dict(row) for row in rows]
+    cache.set(key, movies, current_app.config.get('POPULAR_MOVIES_CACHE_SECONDS', 60))
+    return movies
+
+
+# --- rebuild ------------------------------------------------------------------
+
+def rebuild(session):
+    """Recomputes movie_popularity from watchlists and returns the rows written; the caller commits."""
+    from ..models.movie import Movie
+    from ..models.movie_popularity import MoviePopularity
+    from ..models.watchlist import Watchlist
+
+    day = func.date(func.coalesce(Watchlist.updated_at, Watchlist.created_at))
+    current = (
+        select(day, Watchlist.movie_id, Watchlist.status, Movie.genre, func.count())
+        .join(Movie, Movie.id == Watchlist.movie_id)
+        .group_by(day, Watchlist.movie_id, Watchlist.status, Movie.genre)
+    )
+    session.execute(delete(MoviePopularity))
+    return session.execute(
+        insert(MoviePopularity).from_select(['day', 'movie_id', 'status', 'genre', 'count'], current)
+    ).rowcount
+
+
+@click.command('rebuild-movie-popularity')
+@with_appcontext
+def rebuild_movie_popularity_command():
+    """Recompute the movie popularity rollup from watchlists, e.g. after a bulk load."""
+    from .. import db
+
+    written = rebuild(db.session)
+    db.session.commit()
+    logger.info("Rebuilt movie popularity: %s rows", written)
+    click.echo(f"Wrote {written:,} movie popularity rows")
@@ -0,0 +1,148 @@
+import logging
+import random
+import sqlite3
+
+import click
+from flask import current_app, g, has_request_context, request
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads made while serving GET/HEAD requests to a read
+    replica, one picked per request, and everything else (writes, flushes,
+    requestless jobs and recently-writing users) to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _should_read_from_replica(clause):
+            replica_key = _request_replica()
+            if replica_key is not None:
+                return self._db.engines[replica_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _should_read_from_replica(clause):
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+    if clause is not None and getattr(clause, 'is_dml', False):
+        return False
+    return not getattr(g, 'db_wrote', False)
+
+
+def _request_replica():
+    """The replica this request reads from, or None for the primary; decided on its first read."""
+    if 'db_replica' not in g:
+        replica_keys = current_app.config.get('SQLALCHEMY_REPLICA_BINDS')
+        identity = request_identity() if replica_keys else None
+        if not replica_keys or (identity is not None and is_pinned_to_primary(identity)):
+            g.db_replica = None
+        else:
+            g.db_replica = random.choice(replica_keys)
+    return g.db_replica
+
+
+def request_identity():
+    """
+    The caller's JWT identity, decoding the bearer token if the view hasn't
+    (public routes never do), or None when there is no valid access token.
+    """
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+    from flask_jwt_extended.exceptions import JWTExtendedException
+    from jwt import PyJWTError
+
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except (JWTExtendedException, PyJWTError, RuntimeError):
+        # A bad token is the view's to reject; here it just reads as anonymous
+        return None
+
+
+def _pin_key(identity):
+    return f'primary-pin:{identity}'
+
+
+def pin_to_primary(identity, seconds):
+    """Sends `identity`'s reads to the primary for the next `seconds`, in every worker sharing the cache."""
+    from .. import cache
+
+    cache.set(_pin_key(identity), True, seconds)
+
+
+def is_pinned_to_primary(identity):
+    from .. import cache
+
+    return cache.get(_pin_key(identity)) is not None
+
+
+def _mark_write(session, flush_context, instances):
+    if has_request_context() and (session.new or session.dirty or session.deleted):
+        g.db_wrote = True
+
+
+class ReplicaRouter:
+    """
+    Wires read-your-writes stickiness around RoutingSession: once a request
+    has flushed changes, the writing user's reads stay on the primary for
+    REPLICA_STICKY_SECONDS. The pin is kept in the app cache under the
+    user's identity, so with CACHE_REDIS_URL every worker (and the async
+    read tier) honours it; with the per-process cache only the worker that
+    served the write does.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from .. import db
+
+        app.extensions['replica_router'] = self
+        app.cli.add_command(replica_sync_command)
+        if not app.config.get('SQLALCHEMY_REPLICA_BINDS'):
+            return
+
+        if not event.contains(db.session, 'before_flush', _mark_write):
+            event.listen(db.session, 'before_flush', _mark_write)
+
+        @app.after_request
+        def pin_writer_to_primary(response):
+            if getattr(g, 'db_wrote', False):
+                identity = request_identity()
+                if identity is not None:
+                    pin_to_primary(identity, app.config['REPLICA_STICKY_SECONDS'])
+            return response
+
+
+@click.command('replica-sync')
+@with_appcontext
+def replica_sync_command():
+    """Copy a SQLite primary onto SQLite replica files (local testing only)."""
+    from .. import db
+
+    primary = db.engines[None]
+    if primary.dialect.name != 'sqlite':
+        raise click.UsageError('replica-sync only copies SQLite files; use streaming replication for Postgres')
+    keys = current_app.config.get('SQLALCHEMY_REPLICA_BINDS') or ()
+    if not keys:
+        raise click.UsageError('No replicas configured; set DATABASE_REPLICA_URLS')
+    for key in keys:
+        replica = db.engines[key]
+        if replica.dialect.name != 'sqlite':
+            raise click.UsageError(f'{key} is not a SQLite database')
+        source = sqlite3.connect(primary.url.database)
+        target = sqlite3.connect(replica.url.database)
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        replica.dispose()
+        click.echo(f'Copied {primary.url.database} -> {replica.url.database}')
@@ -0,0 +1,190 @@
+import logging
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import ColumnProperty, RelationshipProperty, configure_mappers
+from sqlalchemy_serializer import SerializerMixin
+from sqlalchemy_serializer.lib.schema import Schema
+from sqlalchemy_serializer.serializer import IsNotSerializable, Serializer
+
+logger = logging.getLogger(__name__)
+
+MAX_DEPTH = 8
+# Column python types whose values are emitted unchanged, as the reflective serializer does
+_PASSTHROUGH_TYPES = (int, str, float, bool)
+_CONVERTED_TYPES = (datetime, date, time, Decimal, bytes, uuid.UUID)
+
+
+class CompileError(Exception):
+    """The model's rules use something the compiler doesn't reproduce exactly."""
+
+
+class _Unit:
+    """Code generation state for one root model."""
+
+    def __init__(self, root):
+        self.root = root
+        self.functions = []
+        self.namespace = {'IsNotSerializable': IsNotSerializable}
+        self.opts = {
+            'date_format': root.date_format,
+            'datetime_format': root.datetime_format,
+            'time_format': root.time_format,
+            'decimal_format': root.decimal_format,
+        }
+        self._scalar = Serializer(tzinfo=None, serialize_types=(), **self.opts).serialize
+        self.namespace['_scalar'] = self._scalar
+
+    def converter(self, python_type):
+        """Name of a namespace helper that formats one column value like Serializer.serialize."""
+        name = f'_{python_type.__name__.lower()}'
+        if name not in self.namespace:
+            scalar = self._scalar
+
+            def convert(value, python_type=python_type):
+                return scalar(value) if isinstance(value, python_type) else value
+            self.namespace[name] = convert
+        return name
+
+    def compile_model(self, model, schema, depth):
+        """
+        Mirrors Serializer.serialize_model against `schema` and emits a function
+        for it; returns the function name. Nested relationships are compiled
+        against the forked sub-schema, exactly as the reflective walk forks it.
+        """
+        if depth > MAX_DEPTH:
+            raise CompileError(f'{model.__name__} nests deeper than {MAX_DEPTH} levels')
+        if not issubclass(model, SerializerMixin):
+            raise CompileError(f'{model.__name__} is not a SerializerMixin model')
+
+        schema.update(only=model.serialize_only, extend=model.serialize_rules)
+        mapper = sa_inspect(model)
+        keys = schema.keys
+        if schema.is_greedy:
+            keys.update(attr.key for attr in mapper.attrs)
+
+        name = f'_serialize_{model.__name__}_{len(self.functions)}'
+        self.functions.append(None)  # Reserve the slot so nested names stay unique
+        index = len(self.functions) - 1
+        lines, fields = [], []
+        for key in sorted(keys):
+            if not schema.is_included(key):
+                continue
+            if not key.isidentifier():
+                raise CompileError(f'{model.__name__}.{key} is not an attribute name')
+            prop = mapper.attrs.get(key)
+            if isinstance(prop, ColumnProperty) and len(prop.columns) == 1:
+                fields.append((key, self._column_expr(model, key, prop)))
+            elif isinstance(prop, RelationshipProperty):
+                lines.append(f'    rel_{key} = obj.{key}')
+                fields.append((key, self._relationship_expr(f'rel_{key}', key, prop, schema, depth)))
+            else:
+                raise CompileError(f'{model.__name__}.{key} is not a plain column or relationship')
+
+        body = ''.join(f'\n        {key!r}: {expr},' for key, expr in fields)
+        source = f'def {name}(obj):\n' + ''.join(line + '\n' for line in lines) + f'    return {{{body}\n    }}\n'
+        self.functions[index] = source
+        return name
+
+    def _column_expr(self, model, key, prop):
+        try:
+            python_type = prop.columns[0].type.python_type
+        except NotImplementedError:
+            raise CompileError(f'{model.__name__}.{key} has no known python type') from None
+        if issubclass(python_type, _PASSTHROUGH_TYPES):
+            return f'obj.{key}'
+        if issubclass(python_type, _CONVERTED_TYPES):
+            return f'{self.converter(python_type)}(obj.{key})'
+        raise CompileError(f'{model.__name__}.{key} is a {python_type.__name__} column')
+
+    def _relationship_expr(self, var, key, prop, schema, depth):
+        target = prop.mapper.class_
+        if not issubclass(target, SerializerMixin):
+            if prop.uselist:
+                # The reflective walk logs and drops every element it can't serialize
+                return f'[] if {var} is not None else None'
+            return (f'None if {var} is None else '
+                    f'_raise(IsNotSerializable(f"Unserializable type:{{type({var})}} value:{{{var}}}"))')
+        nested = self.compile_model(target, schema.fork(key=key), depth + 1)
+        if prop.uselist:
+            return f'[{nested}(item) for item in {var}]'
+        return f'None if {var} is None else {nested}({var})'
+
+    def build(self):
+        source = '\n\n'.join(self.functions)
+        namespace = dict(self.namespace, _raise=_raise)
+        exec(compile(source, f'<serializer {self.root.__name__}>', 'exec'), namespace)
+        return source, namespace
+
+
+def _raise(error):
+    raise error
+
+
+def _check_supported(model):
+    if model.get_tzinfo is not SerializerMixin.get_tzinfo or model.serialize_types:
+        raise CompileError(f'{model.__name__} customises timezones or serialize_types')
+
+
+class SerializerRegistry:
+    """
+    Compiles each SerializerMixin model's serialize_rules once, at startup,
+    into a flat generated function and installs it as the model's to_dict().
+    The generated code reads exactly the attributes the reflective walk in
+    sqlalchemy_serializer would and formats them the same way, so responses
+    are unchanged; calls with only/rules/format arguments and models the
+    compiler can't reproduce keep the reflective SerializerMixin.to_dict.
+    """
+
+    def __init__(self, app=None):
+        self.compiled = {}
+        self.sources = {}
+        self.skipped = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from .. import db
+
+        app.extensions['serializers'] = self
+        if not app.config.get('SERIALIZERS_COMPILED', True):
+            return
+        configure_mappers()
+        for mapper in db.Model.registry.mappers:
+            model = mapper.class_
+            if model in self.compiled or model in self.skipped:
+                continue
+            # Models with a hand-written to_dict (Post, Club, ...) are left alone
+            if not issubclass(model, SerializerMixin) or model.to_dict is not SerializerMixin.to_dict:
+                continue
+            try:
+                self.install(model)
+            except CompileError as e:
+                self.skipped[model] = str(e)
+                logger.info("Keeping reflective to_dict for %s: %s", model.__name__, e)
+
+    def compile(self, model):
+        """Returns (function, generated source) for `model`'s current rules."""
+        _check_supported(model)
+        unit = _Unit(model)
+        name = unit.compile_model(model, Schema(), depth=0)
+        source, namespace = unit.build()
+        return namespace[name], source
+
+    def install(self, model):
+        serialize, source = self.compile(model)
+        reflective = SerializerMixin.to_dict
+
+        def to_dict(self, only=(), rules=(), **kwargs):
+            if only or rules or any(value is not None for value in kwargs.values()):
+                return reflective(self, only=only, rules=rules, **kwargs)
+            return serialize(self)
+
+        to_dict.__doc__ = f'Compiled serializer for {model.__name__} (see app.utils.serializers).'
+        to_dict.reflective = reflective
+        model.to_dict = to_dict
+        self.compiled[model] = serialize
+        self.sources[model] = source
+        return serialize
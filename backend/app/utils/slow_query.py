@@ -0,0 +1,338 @@
+import atexit
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Statement normalisation used to group "the same query with different values"
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_MARKER = re.compile(r"%\(\w+\)s|%s|\$\d+|:\w+|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+# A number compared against in a plan's conditions ("(id = 42)"); Postgres
+# spaces its operators, which keeps cost=0.29..8.31 rows=1 out of it
+_COMPARED_NUMBER = re.compile(r"(\s(?:=|<>|!=|<=|>=|<|>)\s+\(?)-?\d+(?:\.\d+)?\b")
+
+
+def fingerprint(statement):
+    """
+    Normalizes a SQL statement so that calls differing only in literal or
+    bound values share one fingerprint. Returns (fingerprint_id, normalized_sql).
+    """
+    normalized = _STRING_LITERAL.sub('?', statement)
+    normalized = _BIND_MARKER.sub('?', normalized)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _IN_LIST.sub('IN (...)', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:12]
+    return digest, normalized
+
+
+def redact(parameters):
+    """
+    Replaces bound values with their type (and length for strings/bytes) so
+    slow-query logs never contain user data such as emails or password hashes.
+    """
+    def _redact_value(value):
+        if value is None:
+            return None
+        if isinstance(value, (str, bytes)):
+            return f'<{type(value).__name__}:{len(value)}>'
+        return f'<{type(value).__name__}>'
+
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: only report the batch size and the shape of the first row
+            return {'rows': len(parameters), 'first': redact(parameters[0])}
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+
+def scrub_plan(line):
+    """
+    Removes the literals a query plan line (or database error) can quote from
+    the bound values: EXPLAIN runs with the real parameters, and Postgres
+    prints them ("Index Cond: (email = '...'::text)").
+    """
+    line = _STRING_LITERAL.sub("'?'", line)
+    return _COMPARED_NUMBER.sub(r'\1?', line)
+
+
+class _StatementStats:
+    def __init__(self, fingerprint_id, normalized):
+        self.fingerprint = fingerprint_id
+        self.statement = normalized
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.endpoints = {}
+        self.sample_parameters = None
+        self.explain = None
+
+    def record(self, duration_ms, endpoint, parameters):
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms >= self.max_ms:
+            self.max_ms = duration_ms
+            self.sample_parameters = parameters
+        self.endpoints[endpoint] = self.endpoints.get(endpoint, 0) + 1
+
+    def to_dict(self):
+        return {
+            'fingerprint': self.fingerprint,
+            'statement': self.statement,
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'max_ms': round(self.max_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'endpoints': self.endpoints,
+            'sample_parameters': self.sample_parameters,
+            'explain': self.explain,
+        }
+
+
+class SlowQueryLog:
+    """
+    Times every statement executed on the app's engines. Statements slower than
+    SLOW_QUERY_THRESHOLD_MS are logged with their endpoint, redacted parameters
+    and duration, aggregated by fingerprint, and (once per fingerprint) have
+    their query plan captured on a background thread, with the literals it
+    quotes scrubbed.
+
+    Each worker process periodically writes its aggregate to
+    SLOW_QUERY_REPORT_DIR; `flask slow-queries` merges those files and ranks
+    the worst offenders across all workers and blueprints.
+    """
+
+    def __init__(self, app=None):
+        self.threshold_ms = None
+        self.explain_enabled = True
+        self.report_dir = None
+        self.flush_interval = 10.0
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._explaining = set()
+        self._local = threading.local()
+        self._last_flush = 0.0
+        self._flush_at_exit = False
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from .. import db
+
+        threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+        app.extensions['slow_query_log'] = self
+        self.report_dir = app.config.get('SLOW_QUERY_REPORT_DIR') or os.path.join(app.instance_path, 'slow_queries')
+        app.cli.add_command(slow_queries_command)
+
+        if threshold is None or float(threshold) < 0:
+            return
+
+        self.threshold_ms = float(threshold)
+        self.explain_enabled = app.config.get('SLOW_QUERY_EXPLAIN', True)
+        self.flush_interval = float(app.config.get('SLOW_QUERY_FLUSH_INTERVAL', 10.0))
+        if self.explain_enabled and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+
+        with app.app_context():
+            for engine in db.engines.values():
+                if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+                    event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+                    event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        if not self._flush_at_exit:
+            # One hook per process, however many apps create_app() builds
+            atexit.register(self.flush)
+            self._flush_at_exit = True
+
+    def _after_fork(self):
+        # Workers forked from a preloaded master: the EXPLAIN thread doesn't
+        # survive fork(), and the parent's aggregate isn't this process's to report
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._explaining = set()
+        self._last_flush = 0.0
+        if self._executor is not None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+
+    # --- engine event hooks -------------------------------------------------
+
+    # The start time lives on the execution context, which belongs to this one
+    # statement: one that raises never reaches after_cursor_execute, and its
+    # start must not be paired with the next statement's end
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_slow_query_start', None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000.0
+        if duration_ms < self.threshold_ms or getattr(self._local, 'explaining', False):
+            return
+        self._record(conn.engine, statement, parameters, executemany, duration_ms)
+
+    # --- aggregation ----------------------------------------------------------
+
+    def _record(self, engine, statement, parameters, executemany, duration_ms):
+        endpoint = request.endpoint if has_request_context() else None
+        endpoint = endpoint or '<no-request>'
+        fingerprint_id, normalized = fingerprint(statement)
+        redacted = redact(parameters)
+
+        with self._lock:
+            stats = self._stats.get(fingerprint_id)
+            if stats is None:
+                stats = self._stats[fingerprint_id] = _StatementStats(fingerprint_id, normalized)
+            stats.record(duration_ms, endpoint, redacted)
+            needs_explain = (
+                self._executor is not None
+                and not executemany
+                and stats.explain is None
+                and fingerprint_id not in self._explaining
+                and normalized.lstrip('( ').upper().startswith(('SELECT', 'WITH'))
+            )
+            if needs_explain:
+                self._explaining.add(fingerprint_id)
+
+        logger.warning(
+            "slow query %.1fms on %s [%s]: %s params=%s",
+            duration_ms, endpoint, fingerprint_id, normalized, redacted,
+        )
+
+        if needs_explain:
+            self._executor.submit(self._explain, engine, fingerprint_id, statement, parameters)
+        self._maybe_flush()
+
+    def _explain(self, engine, fingerprint_id, statement, parameters):
+        prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+        self._local.explaining = True
+        try:
+            with engine.connect() as conn:
+                rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+            plan = [scrub_plan(' '.join(str(column) for column in row)) for row in rows]
+        except Exception as e:
+            # Not str(e): SQLAlchemy's message ends with the raw parameters
+            message = str(getattr(e, 'orig', None) or e).strip().splitlines()
+            plan = [f"EXPLAIN failed: {type(e).__name__}: {scrub_plan(message[0]) if message else ''}"]
+        finally:
+            self._local.explaining = False
+
+        with self._lock:
+            stats = self._stats.get(fingerprint_id)
+            if stats is not None:
+                stats.explain = plan
+            self._explaining.discard(fingerprint_id)
+        self._maybe_flush()
+
+    def report(self, limit=20, order_by='total_ms'):
+        """Returns this process's slow statements, worst first."""
+        with self._lock:
+            rows = [stats.to_dict() for stats in self._stats.values()]
+        return sorted(rows, key=lambda row: row[order_by], reverse=True)[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    # --- cross-process reporting ---------------------------------------------
+
+    def _maybe_flush(self):
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._last_flush = now
+            self.flush()
+
+    def flush(self):
+        """Writes this process's aggregate to SLOW_QUERY_REPORT_DIR/slow_queries-<pid>.json."""
+        if not self.report_dir:
+            return
+        with self._lock:
+            if not self._stats:
+                return
+            payload = [stats.to_dict() for stats in self._stats.values()]
+        try:
+            os.makedirs(self.report_dir, exist_ok=True)
+            path = os.path.join(self.report_dir, f'slow_queries-{os.getpid()}.json')
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("could not write slow query report: %s", e)
+
+
+def merge_reports(report_dir):
+    """Merges the per-process report files in report_dir into one ranking by fingerprint."""
+    merged = {}
+    for path in glob.glob(os.path.join(report_dir, 'slow_queries-*.json')):
+        try:
+            with open(path) as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for row in rows:
+            current = merged.get(row['fingerprint'])
+            if current is None:
+                merged[row['fingerprint']] = dict(row, endpoints=dict(row['endpoints']))
+                continue
+            current['count'] += row['count']
+            current['total_ms'] += row['total_ms']
+            if row['max_ms'] > current['max_ms']:
+                current['max_ms'] = row['max_ms']
+                current['sample_parameters'] = row['sample_parameters']
+            current['explain'] = current['explain'] or row['explain']
+            for endpoint, count in row['endpoints'].items():
+                current['endpoints'][endpoint] = current['endpoints'].get(endpoint, 0) + count
+    for row in merged.values():
+        row['total_ms'] = round(row['total_ms'], 3)
+        row['mean_ms'] = round(row['total_ms'] / row['count'], 3) if row['count'] else 0.0
+    return list(merged.values())
+
+
+@click.command('slow-queries')
+@click.option('--limit', default=20, show_default=True, help='Number of statements to show.')
+@click.option('--order-by', type=click.Choice(['total_ms', 'max_ms', 'mean_ms', 'count']),
+              default='total_ms', show_default=True)
+@click.option('--json', 'as_json', is_flag=True, help='Print the merged report as JSON.')
+def slow_queries_command(limit, order_by, as_json):
+    """Rank slow statements recorded by all worker processes."""
+    report_dir = current_app.extensions['slow_query_log'].report_dir
+    rows = sorted(merge_reports(report_dir), key=lambda row: row[order_by], reverse=True)[:limit]
+    if as_json:
+        click.echo(json.dumps(rows, indent=2))
+        return
+    if not rows:
+        click.echo(f'No slow queries recorded in {report_dir}')
+        return
+    for rank, row in enumerate(rows, start=1):
+        click.echo(f"#{rank} [{row['fingerprint']}] total={row['total_ms']}ms "
+                   f"count={row['count']} max={row['max_ms']}ms mean={row['mean_ms']}ms")
+        click.echo(f"    {row['statement']}")
+        endpoints = ', '.join(f'{name} x{count}' for name, count in
+                              sorted(row['endpoints'].items(), key=lambda item: -item[1]))
+        click.echo(f"    endpoints: {endpoints}")
+        for line in row['explain'] or []:
+            click.echo(f"    plan: {line}")
@@ -0,0 +1,140 @@
+from flask import current_app
+from sqlalchemy import event, func, inspect as sa_inspect, select, union
+
+
+def summary_key(user_id):
+    return f'user-summary:{user_id}'
+
+
+def _count(owner):
+    """COUNT(*) of the rows whose `owner` column points at the outer user."""
+    from ..models.user import User
+    return select(func.count()).where(owner == User.id).scalar_subquery()
+
+
+def _summary_statement(user_id):
+    from ..models.club_member import ClubMember
+    from ..models.follow import Follow
+    from ..models.post import Post
+    from ..models.user import User
+    from ..models.watchlist import Watchlist
+
+    # Correlated scalar subqueries: each count is an index lookup on its
+    # foreign key, and the whole summary is a single statement
+    return select(
+        User.id, User.username, User.bio, User.created_at,
+        _count(Post.user_id).label('posts_count'),
+        _count(Follow.followed_id).label('followers_count'),
+        _count(Follow.follower_id).label('following_count'),
+        _count(ClubMember.user_id).label('clubs_count'),
+        _count(Watchlist.user_id).label('watchlist_count'),
+    ).where(User.id == user_id)
+
+
+def user_summary(user_id):
+    """
+    A user's basic fields and their post, follower, following, club and
+    watchlist counts, or None if there is no such user. Served from the
+    cache for USER_SUMMARY_CACHE_SECONDS; writes that change a count evict
+    the entry when they commit. Archived posts count as posts.
+
+    A miss is refilled from the primary, not a read replica: right after an
+    eviction a lagging replica would put the old counts back for the whole
+    TTL. Eviction only reaches every worker when the cache is shared
+    (CACHE_REDIS_URL); with per-process caches the other workers keep their
+    copy until it expires.
+    """
+    from .. import archive, cache, db
+
+    key = summary_key(user_id)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    row = db.session.execute(_summary_statement(user_id), bind_arguments={'bind': db.engine}).mappings().first()
+    if row is None:
+        return None
+    summary = dict(row)
+    summary['posts_count'] += archive.count('users', user_id)
+    # Stored as JSON text in Redis, so keep the timestamp in its wire format
+    if summary['created_at'] is not None:
+        summary['created_at'] = summary['created_at'].isoformat()
+    cache.set(key, summary, current_app.config.get('USER_SUMMARY_CACHE_SECONDS', 60))
+    return summary
+
+
+# --- invalidation -------------------------------------------------------------
+
+def _affected_users(obj):
+    """The users whose summary `obj` being inserted, changed or deleted affects."""
+    from ..models.club_member import ClubMember
+    from ..models.follow import Follow
+    from ..models.post import Post
+    from ..models.user import User
+    from ..models.watchlist import Watchlist
+
+    state = sa_inspect(obj).dict
+    if isinstance(obj, User):
+        return (state.get('id'),)
+    if isinstance(obj, Follow):
+        return (state.get('follower_id'), state.get('followed_id'))
+    if isinstance(obj, (Post, ClubMember, Watchlist)):
+        return (state.get('user_id'),)
+    return ()
+
+
+def _collect_cascaded(session, flush_context, instances):
+    """
+    Rows ON DELETE CASCADE removes change other users' counts: a deleted
+    user's follows (both sides), and a deleted club's memberships and the
+    posts in it. The users behind them are read in one statement before the
+    delete.
+    """
+    from ..models.club import Club
+    from ..models.club_member import ClubMember
+    from ..models.follow import Follow
+    from ..models.post import Post
+    from ..models.user import User
+
+    users = [sa_inspect(obj).dict.get('id') for obj in session.deleted if isinstance(obj, User)]
+    clubs = [sa_inspect(obj).dict.get('id') for obj in session.deleted if isinstance(obj, Club)]
+    if not users and not clubs:
+        return
+    selects = []
+    if users:
+        selects += [select(Follow.follower_id).where(Follow.followed_id.in_(users)),
+                    select(Follow.followed_id).where(Follow.follower_id.in_(users))]
+    if clubs:
+        selects += [select(ClubMember.user_id).where(ClubMember.club_id.in_(clubs)),
+                    select(Post.user_id).where(Post.club_id.in_(clubs))]
+    stale = session.info.setdefault('stale_summaries', set())
+    stale.update(session.connection().execute(union(*selects)).scalars())
+
+
+def _collect_stale(session, flush_context):
+    stale = session.info.setdefault('stale_summaries', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        stale.update(user_id for user_id in _affected_users(obj) if user_id is not None)
+
+
+def _evict_stale(session):
+    from .. import cache
+
+    stale = session.info.pop('stale_summaries', None)
+    if stale:
+        cache.delete_many(summary_key(user_id) for user_id in stale)
+
+
+def _forget_stale(session, previous_transaction):
+    session.info.pop('stale_summaries', None)
+
+
+def init_user_summaries(app):
+    """Evicts cached summaries after any commit that touched the rows they count."""
+    from .. import db
+
+    if not event.contains(db.session, 'after_flush', _collect_stale):
+        event.listen(db.session, 'before_flush', _collect_cascaded)
+        event.listen(db.session, 'after_flush', _collect_stale)
+        event.listen(db.session, 'after_commit', _evict_stale)
+        event.listen(db.session, 'after_soft_rollback', _forget_stale)
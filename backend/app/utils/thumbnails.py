@@ -0,0 +1,308 @@
+"""
+Poster thumbnails: fixed-size WebP or JPEG variants of movie posters, made
+with Pillow and kept in a size-bounded disk cache.
+
+Originals come from POSTER_DIR. A poster_url that is a path names a file
+under it; an http(s) one is read from POSTER_DIR/fetched/<sha256 of the
+URL>, which `flask fetch-posters` downloads ahead of time, so requests never
+wait on another host. A poster with no original here has no thumbnail.
+
+Variants are content-addressed: a variant's name is the hash of its
+original's bytes and the size, format and encoder settings, so it is never
+stale, doubles as a strong ETag, and a conditional request for it is
+answered without generating anything. THUMBNAIL_DIR holds at most
+THUMBNAIL_CACHE_MB of them; serving one refreshes its mtime (at most hourly)
+and the least recently used go first when the cache is full. Concurrent
+requests for a variant that doesn't exist yet wait for the first one to
+write it instead of resizing the poster again. That is per process; across
+workers the worst case is a duplicate resize, and publishing is an atomic
+rename either way.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+import click
+from flask import current_app, send_file
+from flask.cli import with_appcontext
+from sqlalchemy import or_, select
+
+logger = logging.getLogger(__name__)
+
+# ?size= values, (width, height) at the posters' 2:3 aspect ratio
+SIZES = {'small': (92, 138), 'medium': (185, 278), 'large': (342, 513)}
+FORMATS = {'webp': 'image/webp', 'jpeg': 'image/jpeg'}
+
+# Bump when rendering changes, so every variant gets a new name and ETag
+VARIANT_VERSION = 1
+
+# Serving a variant marks it recently used at most this often
+TOUCH_SECONDS = 3600
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _render(original, size, fmt, quality):
+    from PIL import Image, ImageOps
+
+    width, height = SIZES[size]
+    try:
+        with Image.open(original) as image:
+            # JPEG originals decode straight at a fraction of their size; either orientation fits
+            image.draft('RGB', (max(width, height), max(width, height)))
+            image = ImageOps.exif_transpose(image)
+            thumbnail = ImageOps.fit(image, (width, height), method=Image.Resampling.LANCZOS)
+    except Image.DecompressionBombError as error:
+        raise ValueError(str(error)) from error
+    alpha = thumbnail.mode in ('RGBA', 'LA') or 'transparency' in thumbnail.info
+    buffer = io.BytesIO()
+    if fmt == 'webp':
+        thumbnail.convert('RGBA' if alpha else 'RGB').save(buffer, 'WEBP', quality=quality, method=4)
+    else:
+        thumbnail.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+class PosterThumbnails:
+    """Serves poster thumbnails from THUMBNAIL_DIR, generating them from the originals in POSTER_DIR."""
+
+    def __init__(self, app=None):
+        self.poster_dir = None
+        self.directory = None
+        self.max_bytes = 512 * 1024 * 1024
+        self.quality = 80
+        self.max_age = 86400
+        self._digests = {}
+        self._inflight = {}
+        self._cached_bytes = None
+        self._lock = threading.Lock()
+        self._evicting = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['thumbnails'] = self
+        self.poster_dir = app.config.get('POSTER_DIR') or os.path.join(app.instance_path, 'posters')
+        self.directory = app.config.get('THUMBNAIL_DIR') or os.path.join(app.instance_path, 'thumbnails')
+        self.max_bytes = app.config.get('THUMBNAIL_CACHE_MB', 512) * 1024 * 1024
+        self.quality = app.config.get('THUMBNAIL_QUALITY', 80)
+        self.max_age = app.config.get('THUMBNAIL_MAX_AGE', 86400)
+        app.cli.add_command(fetch_posters_command)
+
+    # --- originals ------------------------------------------------------------
+
+    def fetched_path(self, url):
+        return os.path.join(self.poster_dir, 'fetched', hashlib.sha256(url.encode()).hexdigest())
+
+    def original(self, poster_url):
+        """The local file `poster_url`'s thumbnails are made from, or None."""
+        if not poster_url:
+            return None
+        parts = urlsplit(poster_url)
+        if parts.scheme in ('http', 'https'):
+            path = self.fetched_path(poster_url)
+        elif parts.scheme or parts.netloc:
+            return None
+        else:
+            root = os.path.realpath(self.poster_dir)
+            path = os.path.realpath(os.path.join(root, parts.path.lstrip('/')))
+            if not path.startswith(root + os.sep):
+                return None
+        return path if os.path.isfile(path) else None
+
+    def _digest(self, path):
+        """sha256 of the file, memoised by path, mtime and size so it's read once per change."""
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        digest = self._digests.get(key)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = hashlib.file_digest(f, 'sha256').hexdigest()
+            if len(self._digests) >= 10_000:
+                self._digests.clear()
+            self._digests[key] = digest
+        return digest
+
+    # --- variants -------------------------------------------------------------
+
+    def _path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], f'{key}.{fmt}')
+
+    def _generate(self, original, path, size, fmt):
+        """Writes the variant unless another thread already is, in which case waits for it. True once it exists."""
+        with self._lock:
+            done = self._inflight.get(path)
+            leader = done is None
+            if leader:
+                done = self._inflight[path] = threading.Event()
+        if not leader:
+            done.wait(30)
+            return os.path.exists(path)
+
+        try:
+            started = time.perf_counter()
+            data = _render(original, size, fmt, self.quality)
+            _write_atomic(path, data)
+            logger.debug("Rendered %s %s thumbnail of %s in %.1fms", size, fmt, original,
+                         (time.perf_counter() - started) * 1000)
+        except (OSError, ValueError):
+            # Pillow raises OSError subclasses for files it can't read, ValueError for bad parameters
+            logger.warning("Can't make a %s %s thumbnail of %s", size, fmt, original, exc_info=True)
+            return False
+        finally:
+            with self._lock:
+                del self._inflight[path]
+            done.set()
+        self._account(len(data))
+        return True
+
+    def _account(self, added):
+        with self._lock:
+            if self._cached_bytes is None:
+                self._cached_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._cached_bytes += added
+            full = self._cached_bytes > self.max_bytes
+        if full and self._evicting.acquire(blocking=False):
+            try:
+                self._evict()
+            finally:
+                self._evicting.release()
+
+    def _entries(self):
+        """(mtime, size, path) of every cached variant."""
+        entries = []
+        try:
+            shards = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return entries
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        """Deletes the least recently used variants until the cache is back under 90% of its budget."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self._cached_bytes = total
+        logger.info("Evicted %s thumbnails; cache now %.1f MB", removed, total / 1024 / 1024)
+
+    def response(self, poster_url, size, fmt, if_none_match):
+        """
+        A response with `poster_url`'s `size` thumbnail in `fmt` (a 304 when
+        `if_none_match` already has it), or None when there is no original
+        to make it from.
+        """
+        original = self.original(poster_url)
+        if original is None:
+            return None
+        key = hashlib.sha256(
+            f'{VARIANT_VERSION}:{self._digest(original)}:{size}:{fmt}:{self.quality}'.encode()
+        ).hexdigest()
+
+        if if_none_match.contains(key):
+            response = current_app.response_class(status=304)
+        else:
+            path = self._path(key, fmt)
+            try:
+                age = time.time() - os.stat(path).st_mtime
+            except FileNotFoundError:
+                age = None
+            if age is None:
+                if not self._generate(original, path, size, fmt):
+                    return None
+            elif age > TOUCH_SECONDS:
+                os.utime(path)
+            try:
+                response = send_file(path, mimetype=FORMATS[fmt], etag=False, conditional=False)
+            except FileNotFoundError:
+                # Evicted between the check and the open: rare enough to just make it again
+                if not self._generate(original, path, size, fmt):
+                    return None
+                response = send_file(path, mimetype=FORMATS[fmt], etag=False, conditional=False)
+        response.set_etag(key)
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response
+
+
+# --- fetching -----------------------------------------------------------------
+
+def _fetch(url, path, max_bytes, timeout):
+    from PIL import Image
+
+    with urlopen(Request(url, headers={'User-Agent': 'movieclub-poster-fetcher'}), timeout=timeout) as remote:
+        data = remote.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise ValueError(f'larger than {max_bytes:,} bytes')
+    with Image.open(io.BytesIO(data)) as image:
+        image.verify()
+    _write_atomic(path, data)
+
+
+@click.command('fetch-posters')
+@click.option('--refetch', is_flag=True, help='Download posters that were already fetched again.')
+@click.option('--workers', type=int, default=8, show_default=True, help='Parallel downloads.')
+@with_appcontext
+def fetch_posters_command(refetch, workers):
+    """Download movies' http(s) posters into POSTER_DIR so thumbnails can be made from them."""
+    from .. import db, thumbnails
+    from ..models.movie import Movie
+
+    max_bytes = current_app.config.get('POSTER_FETCH_MAX_MB', 10) * 1024 * 1024
+    timeout = current_app.config.get('POSTER_FETCH_TIMEOUT', 10)
+    urls = set(db.session.execute(
+        select(Movie.poster_url).where(or_(Movie.poster_url.like('http://%'), Movie.poster_url.like('https://%')))
+    ).scalars())
+    pending = [url for url in sorted(urls) if refetch or not os.path.exists(thumbnails.fetched_path(url))]
+
+    def fetch(url):
+        try:
+            _fetch(url, thumbnails.fetched_path(url), max_bytes, timeout)
+            return True
+        except Exception:
+            logger.warning("Couldn't fetch poster %s", url, exc_info=True)
+            return False
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        fetched = sum(pool.map(fetch, pending))
+    click.echo(f"Fetched {fetched:,} of {len(pending):,} posters ({len(urls) - len(pending):,} already here)")
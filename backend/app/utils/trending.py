@@ -0,0 +1,226 @@
+"""
+Trending scores, kept in indexed columns so the trending lists are a single
+index range read (ORDER BY trending_score DESC LIMIT n).
+
+Posts rank Hacker-News style: points / (age_hours + 2) ** TRENDING_GRAVITY,
+where points are TRENDING_LIKE_POINTS per like plus TRENDING_COMMENT_POINTS
+per comment. Clubs rank by their recent posts and joins, each worth its
+points halved every TRENDING_CLUB_HALF_LIFE_HOURS.
+
+Likes, comments, posts and joins update the scores in the transaction that
+writes them (an after_flush hook, like the change log's). Between writes a
+score only grows stale as its post or club ages, so `flask decay-trending`,
+run every few minutes from cron, recomputes everything within
+TRENDING_WINDOW_HOURS from the rows themselves and zeroes whatever aged
+out of it. Run it once after migrating, too, to score existing activity.
+"""
+import logging
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event, func, inspect as sa_inspect, or_, select, update
+
+logger = logging.getLogger(__name__)
+
+
+def _age_hours(created_at, now):
+    return max((now - created_at).total_seconds() / 3600.0, 0.0) if created_at is not None else 0.0
+
+
+def post_score(points, created_at, now, gravity):
+    return points / (_age_hours(created_at, now) + 2.0) ** gravity
+
+
+def club_weight(created_at, now, half_life_hours):
+    """What one post or join at `created_at` is worth to its club's score now."""
+    return 0.5 ** (_age_hours(created_at, now) / half_life_hours)
+
+
+def _bump_posts(session, deltas, config):
+    from ..models.post import Post
+
+    now = datetime.utcnow()
+    window_start = now - timedelta(hours=config.get('TRENDING_WINDOW_HOURS', 72))
+    mapper = sa_inspect(Post)
+    created = {}
+    missing = []
+    for post_id in deltas:
+        post = session.identity_map.get(mapper.identity_key_from_primary_key((post_id,)))
+        if post is not None and 'created_at' in sa_inspect(post).dict:
+            created[post_id] = sa_inspect(post).dict['created_at']
+        else:
+            missing.append(post_id)
+    if missing:
+        created.update(session.connection().execute(
+            select(Post.id, Post.created_at).where(Post.id.in_(missing))
+        ).all())
+
+    # Posts past the window can't trend; decay-trending has zeroed them
+    gravity = config.get('TRENDING_GRAVITY', 1.8)
+    params = [
+        {'post_id': post_id, 'delta': delta, 'divisor': (_age_hours(created[post_id], now) + 2.0) ** gravity}
+        for post_id, delta in deltas.items()
+        if post_id in created and created[post_id] is not None and created[post_id] >= window_start
+    ]
+    if not params:
+        return
+    posts = Post.__table__
+    session.connection().execute(
+        update(posts)
+        .where(posts.c.id == bindparam('post_id'))
+        .values(
+            trending_points=posts.c.trending_points + bindparam('delta'),
+            trending_score=(posts.c.trending_points + bindparam('delta')) / bindparam('divisor'),
+            updated_at=posts.c.updated_at,  # Not an edit: keep onupdate from firing
+        ),
+        params,
+    )
+
+
+def _bump_clubs(session, deltas):
+    from ..models.club import Club
+
+    clubs = Club.__table__
+    session.connection().execute(
+        update(clubs)
+        .where(clubs.c.id == bindparam('club_id'))
+        .values(trending_score=clubs.c.trending_score + bindparam('delta'), updated_at=clubs.c.updated_at),
+        [{'club_id': club_id, 'delta': delta} for club_id, delta in deltas.items()],
+    )
+
+
+def _after_flush(session, flush_context):
+    from ..models.club_member import ClubMember
+    from ..models.comment import Comment
+    from ..models.like import Like
+    from ..models.post import Post
+
+    config = current_app.config
+    post_points = {
+        Like: config.get('TRENDING_LIKE_POINTS', 1.0),
+        Comment: config.get('TRENDING_COMMENT_POINTS', 2.0),
+    }
+    club_points = {
+        Post: config.get('TRENDING_CLUB_POST_POINTS', 1.0),
+        ClubMember: config.get('TRENDING_CLUB_JOIN_POINTS', 2.0),
+    }
+    post_deltas, club_deltas = {}, {}
+    for obj, sign in [*((obj, 1) for obj in session.new), *((obj, -1) for obj in session.deleted)]:
+        state = sa_inspect(obj).dict
+        kind = type(obj)
+        if kind in post_points and state.get('post_id') is not None:
+            post_deltas[state['post_id']] = post_deltas.get(state['post_id'], 0.0) + sign * post_points[kind]
+        elif kind in club_points and sign > 0 and state.get('club_id') is not None:
+            # Leaving a club or deleting a post doesn't undo the activity; it just stops adding any
+            club_deltas[state['club_id']] = club_deltas.get(state['club_id'], 0.0) + club_points[kind]
+
+    post_deltas = {post_id: delta for post_id, delta in post_deltas.items() if delta}
+    if post_deltas:
+        _bump_posts(session, post_deltas, config)
+    if club_deltas:
+        _bump_clubs(session, club_deltas)
+
+
+def init_trending(app):
+    """Keeps posts' and clubs' trending scores current as likes, comments, posts and joins are written."""
+    from .. import db
+
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+
+
+# --- decay --------------------------------------------------------------------
+
+def _decay_posts(session, now, config):
+    from ..models.comment import Comment
+    from ..models.like import Like
+    from ..models.post import Post
+
+    window_start = now - timedelta(hours=config.get('TRENDING_WINDOW_HOURS', 72))
+    gravity = config.get('TRENDING_GRAVITY', 1.8)
+    like_points = config.get('TRENDING_LIKE_POINTS', 1.0)
+    comment_points = config.get('TRENDING_COMMENT_POINTS', 2.0)
+    likes = select(func.count()).where(Like.post_id == Post.id).scalar_subquery()
+    comments = select(func.count()).where(Comment.post_id == Post.id).scalar_subquery()
+
+    params = []
+    for post_id, created_at, old_score, like_count, comment_count in session.execute(
+        select(Post.id, Post.created_at, Post.trending_score, likes, comments).where(Post.created_at >= window_start),
+        execution_options={'yield_per': 1000},
+    ):
+        points = like_points * like_count + comment_points * comment_count
+        score = post_score(points, created_at, now, gravity)
+        if score or old_score:
+            params.append({'post_id': post_id, 'points': points, 'score': score})
+
+    posts = Post.__table__
+    if params:
+        session.execute(
+            update(posts).where(posts.c.id == bindparam('post_id')).values(
+                trending_points=bindparam('points'), trending_score=bindparam('score'), updated_at=posts.c.updated_at,
+            ),
+            params,
+        )
+    expired = session.execute(
+        update(posts)
+        .where(posts.c.created_at < window_start, or_(posts.c.trending_score > 0, posts.c.trending_score < 0))
+        .values(trending_points=0, trending_score=0, updated_at=posts.c.updated_at)
+    ).rowcount
+    return len(params), expired
+
+
+def _decay_clubs(session, now, config):
+    from ..models.club import Club
+    from ..models.club_member import ClubMember
+    from ..models.post import Post
+
+    window_start = now - timedelta(hours=config.get('TRENDING_WINDOW_HOURS', 72))
+    half_life = config.get('TRENDING_CLUB_HALF_LIFE_HOURS', 24.0)
+    scores = {}
+    for model, points in ((Post, config.get('TRENDING_CLUB_POST_POINTS', 1.0)),
+                          (ClubMember, config.get('TRENDING_CLUB_JOIN_POINTS', 2.0))):
+        for club_id, created_at in session.execute(
+            select(model.club_id, model.created_at).where(model.created_at >= window_start),
+            execution_options={'yield_per': 1000},
+        ):
+            scores[club_id] = scores.get(club_id, 0.0) + points * club_weight(created_at, now, half_life)
+
+    clubs = Club.__table__
+    params = [
+        {'club_id': club_id, 'score': scores.get(club_id, 0.0)}
+        for club_id, old_score in session.execute(select(clubs.c.id, clubs.c.trending_score))
+        if scores.get(club_id, 0.0) or old_score
+    ]
+    if params:
+        session.execute(
+            update(clubs).where(clubs.c.id == bindparam('club_id'))
+            .values(trending_score=bindparam('score'), updated_at=clubs.c.updated_at),
+            params,
+        )
+    return len(params)
+
+
+def rescore(session, now=None):
+    """
+    Recomputes every score within the window from the likes, comments,
+    posts and joins themselves and zeroes the posts that aged out. Returns
+    (posts rescored, clubs rescored, posts expired); the caller commits.
+    """
+    now = now or datetime.utcnow()
+    posts, expired = _decay_posts(session, now, current_app.config)
+    clubs = _decay_clubs(session, now, current_app.config)
+    return posts, clubs, expired
+
+
+@click.command('decay-trending')
+@with_appcontext
+def decay_trending_command():
+    """Recompute trending scores within the window and zero those that aged out. Run it every few minutes."""
+    from .. import db
+
+    posts, clubs, expired = rescore(db.session)
+    db.session.commit()
+    logger.info("Trending decay rescored %s posts and %s clubs, expired %s posts", posts, clubs, expired)
+    click.echo(f"Rescored {posts:,} posts and {clubs:,} clubs; {expired:,} posts aged out")
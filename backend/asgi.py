@@ -0,0 +1,3 @@
+from app.async_tier import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,174 @@
+"""
+One benchmark case per blueprint endpoint.
+
+Each case names the Flask endpoint it measures so the runner can report any
+route in the benchmarked blueprints that has no case yet. `setup` runs before
+every timed request (untimed) and returns the values the request needs, which
+is how write routes such as delete_post or leave_club get a fresh row or the
+right membership state on each iteration.
+"""
+import itertools
+import os
+import uuid
+
+BLUEPRINTS = (
+    'post_bp', 'club_bp', 'user_bp', 'like_bp',
+    'comment_bp', 'movie_bp', 'watchlist_bp', 'sync_bp', 'batch_bp',
+)
+
+_counter = itertools.count()
+# Keeps generated unique titles from colliding with rows left by earlier runs
+_run_id = uuid.uuid4().hex[:8]
+
+
+class Case:
+    def __init__(self, endpoint, method, path, json=None, setup=None, auth=True):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.json = json
+        self.setup = setup
+        self.auth = auth
+
+    def prepare(self, client, ctx):
+        """Runs the untimed setup step and returns (path, json_body)."""
+        values = dict(ctx)
+        if self.setup is not None:
+            values.update(self.setup(client, ctx) or {})
+        path = self.path.format(**values)
+        body = self.json(values) if callable(self.json) else self.json
+        return path, body
+
+
+def _post_to_delete(client, ctx):
+    response = client.post(f"/posts/clubs/{ctx['club_id']}/posts", headers=ctx['headers'],
+                           json={'movie_title': 'Bench Movie', 'content': 'to be deleted'})
+    return {'delete_post_id': response.get_json()['id']}
+
+
+def _comment_to_delete(client, ctx):
+    response = client.post(f"/posts/{ctx['post_id']}/comments", headers=ctx['headers'],
+                           json={'content': 'to be deleted'})
+    return {'delete_comment_id': response.get_json()['id']}
+
+
+def _watchlist_item(client, ctx):
+    response = client.post(f"/users/{ctx['user_id']}/watchlist", headers=ctx['headers'],
+                           json={'movie_id': ctx['movie_id'], 'movie_title': 'Movie', 'status': 'pending'})
+    if response.status_code == 409:
+        # Same status already stored: flip it so the POST above always yields an item
+        response = client.post(f"/users/{ctx['user_id']}/watchlist", headers=ctx['headers'],
+                               json={'movie_id': ctx['movie_id'], 'movie_title': 'Movie', 'status': 'watched'})
+    return {'watchlist_item_id': response.get_json()['item']['id']}
+
+
+def _fresh_movie(client, ctx):
+    """Keeps watchlist POSTs on the insert path by targeting a movie nobody has listed yet."""
+    response = client.post('/movies/', headers=ctx['headers'],
+                           json={'title': f'Bench Watchlist Movie {_run_id}-{next(_counter)}', 'genre': 'Drama', 'release_year': 2024})
+    return {'new_movie_id': response.get_json()['id']}
+
+
+def _leave_club(client, ctx):
+    client.post(f"/clubs/{ctx['club_id']}/leave", headers=ctx['headers'])
+
+
+def _join_club(client, ctx):
+    client.post(f"/clubs/{ctx['club_id']}/join", headers=ctx['headers'])
+
+
+def _unfollow(client, ctx):
+    client.post(f"/users/{ctx['other_user_id']}/unfollow", headers=ctx['headers'])
+
+
+def _follow(client, ctx):
+    client.post(f"/users/{ctx['other_user_id']}/follow", headers=ctx['headers'])
+
+
+def _local_poster(client, ctx):
+    """Stands in for `flask fetch-posters`: the benchmark has no network, so the original is drawn locally."""
+    thumbnails = client.application.extensions['thumbnails']
+    poster_url = client.get(f"/movies/{ctx['movie_id']}").get_json()['poster_url']
+    if thumbnails.original(poster_url) is None:
+        from PIL import Image
+        path = thumbnails.fetched_path(poster_url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGB', (1000, 1500), (90, 60, 120)).save(path, 'JPEG', quality=90)
+
+
+def _club_sync_token(client, ctx):
+    """A token from just before a new post and a comment, so the delta has work to do."""
+    token = client.get(f"/sync/clubs/{ctx['club_id']}").get_json()['sync_token']
+    client.post(f"/posts/clubs/{ctx['club_id']}/posts", headers=ctx['headers'],
+                json={'movie_title': 'Bench Movie', 'content': 'synced'})
+    client.post(f"/posts/{ctx['post_id']}/comments", headers=ctx['headers'], json={'content': 'synced'})
+    return {'sync_token': token}
+
+
+CASES = [
+    # post_bp
+    Case('post_bp.get_club_posts', 'GET', '/posts/clubs/{club_id}/posts', auth=False),
+    Case('post_bp.create_club_post', 'POST', '/posts/clubs/{club_id}/posts',
+         json={'movie_title': 'Bench Movie', 'content': 'Benchmark post body'}),
+    Case('post_bp.options_post', 'OPTIONS', '/posts/{post_id}', auth=False),
+    Case('post_bp.delete_post', 'DELETE', '/posts/{delete_post_id}', setup=_post_to_delete),
+    Case('post_bp.get_feed_posts', 'GET', '/posts/feed'),
+    Case('post_bp.get_trending_posts', 'GET', '/posts/trending', auth=False),
+
+    # club_bp
+    Case('club_bp.get_all_clubs', 'GET', '/clubs/', auth=False),
+    Case('club_bp.join_club', 'POST', '/clubs/{club_id}/join', setup=_leave_club),
+    Case('club_bp.leave_club', 'POST', '/clubs/{club_id}/leave', setup=_join_club),
+    Case('club_bp.get_club_details', 'GET', '/clubs/{club_id}', auth=False),
+    Case('club_bp.get_trending_clubs', 'GET', '/clubs/trending', auth=False),
+
+    # user_bp
+    Case('user_bp.get_user_details', 'GET', '/users/{user_id}'),
+    Case('user_bp.get_user_summary', 'GET', '/users/{user_id}/summary'),
+    Case('user_bp.update_user_details', 'PUT', '/users/{user_id}', json={'bio': 'Updated by the benchmark'}),
+    Case('user_bp.get_user_clubs', 'GET', '/users/{user_id}/clubs'),
+    Case('user_bp.get_user_posts', 'GET', '/users/{user_id}/posts'),
+    Case('user_bp.get_user_following', 'GET', '/users/{user_id}/following'),
+    Case('user_bp.follow_user', 'POST', '/users/{other_user_id}/follow', setup=_unfollow),
+    Case('user_bp.unfollow_user', 'POST', '/users/{other_user_id}/unfollow', setup=_follow),
+    Case('user_bp.get_user_followers', 'GET', '/users/{user_id}/followers'),
+
+    # like_bp
+    Case('like_bp.toggle_like', 'POST', '/posts/{post_id}/like'),
+    Case('like_bp.get_likes_for_post', 'GET', '/posts/{post_id}/likes', auth=False),
+    Case('like_bp.get_liked_posts_by_user', 'GET', '/users/{user_id}/liked_posts', auth=False),
+
+    # comment_bp
+    Case('comment_bp.add_comment', 'POST', '/posts/{post_id}/comments', json={'content': 'Benchmark comment'}),
+    Case('comment_bp.delete_comment', 'DELETE', '/comments/{delete_comment_id}', setup=_comment_to_delete),
+    Case('comment_bp.get_comments_for_post', 'GET', '/posts/{post_id}/comments', auth=False),
+
+    # movie_bp
+    Case('movie_bp.get_all_movies', 'GET', '/movies/', auth=False),
+    Case('movie_bp.get_popular_movies', 'GET', '/movies/popular?window=month&genre=Drama', auth=False),
+    Case('movie_bp.get_movie_posts', 'GET', '/movies/{movie_id}/posts?limit=20', auth=False),
+    Case('movie_bp.get_movie_thumbnail', 'GET', '/movies/{movie_id}/thumbnail?size=medium&format=webp',
+         setup=_local_poster, auth=False),
+    Case('movie_bp.get_movie_by_id', 'GET', '/movies/{movie_id}', auth=False),
+    Case('movie_bp.create_movie', 'POST', '/movies/',
+         json=lambda values: {'title': f'Bench Movie {_run_id}-{next(_counter)}', 'genre': 'Drama', 'release_year': 2024}),
+
+    # watchlist_bp (Flask-RESTful resources registered on the blueprint)
+    Case('watchlist_bp.userwatchlistresource', 'GET', '/users/{user_id}/watchlist'),
+    Case('watchlist_bp.userwatchlistresource', 'POST', '/users/{user_id}/watchlist', setup=_fresh_movie,
+         json=lambda values: {'movie_id': values['new_movie_id'], 'movie_title': 'Bench Movie', 'status': 'pending'}),
+    Case('watchlist_bp.watchlistitemresource', 'PUT', '/users/{user_id}/watchlist/{watchlist_item_id}',
+         setup=_watchlist_item, json={'status': 'liked'}),
+    Case('watchlist_bp.watchlistitemresource', 'DELETE', '/users/{user_id}/watchlist/{watchlist_item_id}',
+         setup=_watchlist_item),
+
+    # sync_bp (the club feed as a delta, the user feed as a full snapshot)
+    Case('sync_bp.sync_club', 'GET', '/sync/clubs/{club_id}?token={sync_token}', setup=_club_sync_token, auth=False),
+    Case('sync_bp.sync_user', 'GET', '/sync/users/{user_id}'),
+
+    # batch_bp: the profile page's six calls in one request
+    Case('batch_bp.batch', 'POST', '/batch', json=lambda values: {'requests': [
+        {'method': 'GET', 'path': f"/users/{values['user_id']}{suffix}"}
+        for suffix in ('', '/clubs', '/posts', '/following', '/followers', '/watchlist')
+    ]}),
+]
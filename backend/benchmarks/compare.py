@@ -0,0 +1,66 @@
+"""
+Compares two benchmark reports produced by benchmarks.run.
+
+    python -m benchmarks.compare base.json head.json --metric p95_ms --threshold 10
+
+Prints the per-route change and exits with status 1 when any route regressed
+by more than --threshold percent, so it can gate a CI job.
+"""
+import argparse
+import json
+import sys
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'queries_per_request', 'peak_alloc_kb')
+
+
+def compare(base, head, metric, threshold):
+    rows, regressions = [], []
+    for key in sorted(set(base['routes']) | set(head['routes'])):
+        before = base['routes'].get(key, {}).get(metric)
+        after = head['routes'].get(key, {}).get(metric)
+        if before is None or after is None:
+            rows.append((key, before, after, None))
+            continue
+        change = ((after - before) / before * 100.0) if before else (0.0 if after == before else float('inf'))
+        rows.append((key, before, after, change))
+        if change > threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('head')
+    parser.add_argument('--metric', choices=METRICS, default='p95_ms')
+    parser.add_argument('--threshold', type=float, default=10.0, help='Allowed regression in percent')
+    args = parser.parse_args(argv)
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for side, report in (('base', base), ('head', head)):
+        meta = report['meta']
+        print(f"{side}: commit={meta['commit']} db={meta['database']} posts={meta['posts']} iterations={meta['iterations']}")
+    if (base['meta']['posts'], base['meta']['database']) != (head['meta']['posts'], head['meta']['database']):
+        print('WARNING: reports were produced against different datasets')
+
+    rows, regressions = compare(base, head, args.metric, args.threshold)
+    print(f"\n{'route':<55} {'base':>10} {'head':>10} {'change':>9}")
+    for key, before, after, change in rows:
+        if change is None:
+            print(f'{key:<55} {str(before):>10} {str(after):>10} {"n/a":>9}')
+        else:
+            marker = '  <-- regression' if key in regressions else ''
+            print(f'{key:<55} {before:>10} {after:>10} {change:>+8.1f}%{marker}')
+
+    if regressions:
+        print(f'\n{len(regressions)} route(s) regressed by more than {args.threshold}% on {args.metric}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,38 @@
+"""
+Synthetic dataset loader for the endpoint benchmarks.
+
+Uses the same generator as `flask seed` (app.seed) so benchmark data is
+deterministic for a given seed, then promotes the first generated user to the
+known benchmark account the runner logs in as.
+"""
+from datetime import datetime
+
+from sqlalchemy import func, select, update
+
+SCALES = {
+    'small': 1_000,
+    'medium': 100_000,
+    'large': 1_000_000,
+}
+
+BENCH_USERNAME = 'bench_user'
+
+
+def load_dataset(db, posts, seed=42, chunk_size=5_000):
+    """
+    Fills an empty database with a deterministic synthetic dataset.
+    Returns the row count written per table.
+    """
+    from app.seed import plan_counts, seed_database
+    from app.models.user import User
+
+    if db.session.scalar(select(func.count()).select_from(User.__table__)):
+        raise RuntimeError('Benchmark dataset must be loaded into an empty database')
+
+    # Dated back from now, not the seed's epoch, so the time-windowed routes
+    # (trending, popular movies) have recent activity to rank
+    written = seed_database(plan_counts(posts), seed=seed, chunk_size=chunk_size, epoch=datetime.utcnow())
+    first_user = db.session.scalar(select(func.min(User.id)))
+    db.session.execute(update(User).where(User.id == first_user).values(username=BENCH_USERNAME))
+    db.session.commit()
+    return written
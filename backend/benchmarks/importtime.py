@@ -0,0 +1,102 @@
+"""
+Cold-start profile.
+
+Boots `wsgi` (imports plus create_app) in fresh interpreters under
+`python -X importtime`, reports the median boot time and the import time
+attributed to each top-level package, and optionally writes both as a text
+report for the repo.
+
+    python -m benchmarks.importtime
+    python -m benchmarks.importtime --runs 7 --top 25 --output benchmarks/importtime.txt
+
+Self time is what a package's own modules spent importing; cumulative time
+for a package is the sum of the totals of its modules imported from outside
+it, i.e. what importing it cost the app including its dependencies. Those
+modules' subtrees don't overlap, so cumulative time is never below self.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOT = 'import time; t = time.perf_counter(); import wsgi; print(time.perf_counter() - t)'
+
+
+def boot_once():
+    """(boot seconds, [(self_us, cumulative_us, depth, module)]) for one fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    env.setdefault('JWT_SECRET_KEY', 'importtime')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return float(result.stdout.strip().splitlines()[-1]), rows
+
+
+def by_package(rows):
+    """{package: [self_us, cumulative_us]} aggregated over one run's rows."""
+    packages = defaultdict(lambda: [0, 0])
+    parents = []
+    for self_us, cumulative_us, depth, name in reversed(rows):
+        # importtime prints children before parents; walking backwards gives parent-first order
+        del parents[depth:]
+        package = name.split('.')[0]
+        packages[package][0] += self_us
+        if package not in parents:
+            # Imported from outside the package; anything inside it is already in this total
+            packages[package][1] += cumulative_us
+        parents.append(package)
+    return packages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to boot (median is reported)')
+    parser.add_argument('--top', type=int, default=20, help='Packages to list')
+    parser.add_argument('--output', help='Write the text report here')
+    args = parser.parse_args(argv)
+
+    boots, runs = [], []
+    for _ in range(args.runs):
+        seconds, rows = boot_once()
+        boots.append(seconds)
+        runs.append(by_package(rows))
+
+    packages = {
+        package: (statistics.median(run.get(package, (0, 0))[0] for run in runs),
+                  statistics.median(run.get(package, (0, 0))[1] for run in runs))
+        for package in set().union(*runs)
+    }
+    ranked = sorted(packages.items(), key=lambda item: item[1][0], reverse=True)
+
+    lines = [
+        # No commit stamp: a committed report is always generated before the commit that holds it
+        f'python: {sys.version.split()[0]}  runs: {args.runs}',
+        f'boot (import wsgi, median): {statistics.median(boots) * 1000:.0f} ms',
+        f'packages imported: {len(runs[0])}',
+        '',
+        f"{'package':<28}{'self ms':>10}{'cumulative ms':>16}",
+    ]
+    for package, (self_us, cumulative_us) in ranked[:args.top]:
+        lines.append(f'{package:<28}{self_us / 1000:>10.1f}{cumulative_us / 1000:>16.1f}')
+    report = '\n'.join(lines) + '\n'
+    print(report, end='')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Memory per gunicorn worker.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` with and without app
+preloading, sends the same warm-up traffic to each, and reads every
+worker's /proc/<pid>/smaps_rollup (Linux only):
+
+    uss   pages only this worker holds (Private_Clean + Private_Dirty)
+    pss   its proportional share of pages it shares with the master and
+          the other workers; summing pss over all processes gives their
+          real total footprint
+    rss   everything mapped, shared pages counted in full
+
+    python -m benchmarks.memory
+    python -m benchmarks.memory --workers 4 --requests 2000 --output benchmarks/memory.txt
+"""
+import argparse
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from .run import DATA_DIR
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WARMUP_PATHS = ('/', '/clubs/', '/clubs/1', '/movies/', '/movies/1', '/posts/clubs/1/posts', '/posts/1/comments')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def smaps_rollup(pid):
+    """{field: kB} from /proc/<pid>/smaps_rollup."""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_for(port, workers, master, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=2).read()
+            if len(children(master)) >= workers:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit('gunicorn did not come up')
+
+
+def measure(preload, workers, requests, database_url):
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_PRELOAD=str(preload),
+        GUNICORN_MAX_REQUESTS='0',  # Recycling mid-run would reset a worker's footprint
+        DATABASE_URL=database_url,
+        LOG_LEVEL='WARNING',
+        SLOW_QUERY_THRESHOLD_MS='-1',
+    )
+    env.setdefault('JWT_SECRET_KEY', 'benchmark-secret')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port, workers, server.pid)
+        for index in range(requests):
+            path = WARMUP_PATHS[index % len(WARMUP_PATHS)]
+            urllib.request.urlopen(f'http://127.0.0.1:{port}{path}', timeout=30).read()
+        master = smaps_rollup(server.pid)
+        per_worker = [smaps_rollup(pid) for pid in children(server.pid)]
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+    def median(field):
+        return statistics.median(worker.get(field, 0) for worker in per_worker) / 1024
+
+    uss = [(w.get('Private_Clean', 0) + w.get('Private_Dirty', 0)) / 1024 for w in per_worker]
+    return {
+        'workers': len(per_worker),
+        'uss_mb': statistics.median(uss),
+        'pss_mb': median('Pss'),
+        'rss_mb': median('Rss'),
+        'master_pss_mb': master.get('Pss', 0) / 1024,
+        'total_pss_mb': (master.get('Pss', 0) + sum(w.get('Pss', 0) for w in per_worker)) / 1024,
+    }
+
+
+def main(argv=None):
+    from .dataset import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--database-url', help='Defaults to the benchmarks.run SQLite file for the scale')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=1000, help='Warm-up requests spread over the workers')
+    parser.add_argument('--output', help='Write the text report here')
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if database_url is None:
+        path = os.path.join(DATA_DIR, f'bench-{SCALES[args.scale]}.db')
+        if not os.path.exists(path):
+            raise SystemExit(f'{path} is missing; run `python -m benchmarks.run --scale {args.scale}` first')
+        database_url = f'sqlite:///{path}'
+
+    lines = [
+        # No commit stamp: a committed report is always generated before the commit that holds it
+        f'python: {sys.version.split()[0]}  workers: {args.workers}  warm-up requests: {args.requests}',
+        '',
+        f"{'profile':<14}{'uss MB':>9}{'pss MB':>9}{'rss MB':>9}{'master pss':>12}{'total pss':>11}",
+    ]
+    for preload in (False, True):
+        result = measure(preload, args.workers, args.requests, database_url)
+        lines.append(
+            f"{'preload' if preload else 'no preload':<14}{result['uss_mb']:>9.1f}{result['pss_mb']:>9.1f}"
+            f"{result['rss_mb']:>9.1f}{result['master_pss_mb']:>12.1f}{result['total_pss_mb']:>11.1f}"
+        )
+    lines += ['', 'uss/pss/rss are medians per worker; total pss is master plus all workers.']
+    report = '\n'.join(lines) + '\n'
+    print(report, end='')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
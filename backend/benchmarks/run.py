@@ -0,0 +1,258 @@
+"""
+Endpoint benchmark runner.
+
+Builds the app through `create_app` against SQLite (default) or any
+DATABASE_URL, loads a synthetic dataset of the requested scale and measures
+every route in the benchmarked blueprints through the Flask test client.
+
+    python -m benchmarks.run --scale small --output bench-small.json
+    python -m benchmarks.run --scale medium --database-url postgresql://localhost/bench
+    python -m benchmarks.compare before.json after.json
+
+The JSON report is stable (sorted keys, one entry per endpoint/method) so two
+reports from different commits can be diffed directly or with benchmarks.compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, '.data')
+
+DEFAULT_ITERATIONS = {'small': 50, 'medium': 10, 'large': 3}
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(samples) + 0.5)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+def peak_alloc_kb(request):
+    """
+    Peak Python memory allocated during `request()`, in KiB: per call, unlike
+    the process's RSS high-water mark. Tracing slows every allocation, so it
+    is never on around the timed requests.
+    """
+    tracemalloc.start()
+    try:
+        request()
+        return round(tracemalloc.get_traced_memory()[1] / 1024.0, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR, stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class QueryCounter:
+    """Counts statements issued on an engine while `active` is set."""
+
+    def __init__(self):
+        self.active = False
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.count += 1
+
+
+def build_app(database_url, strict=True):
+    """
+    The app against `database_url`. `strict` turns on LOADER_STRICT: unplanned
+    lazy loads fail the case, so queries_per_request is what the loader
+    profiles declare. Harnesses that load rows without the profiles pass False.
+    """
+    # Config reads the environment at import time, so set it before importing the app
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret')
+    os.environ.setdefault('SLOW_QUERY_THRESHOLD_MS', '-1')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['LOADER_STRICT'] = str(strict)
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    from app import create_app
+    return create_app()
+
+
+def prepare_database(app, posts, seed, rebuild):
+    from app import db
+    from app.models.user import User
+    from .dataset import BENCH_USERNAME, load_dataset
+
+    with app.app_context():
+        if rebuild:
+            db.drop_all()
+        db.create_all()
+        if User.query.filter_by(username=BENCH_USERNAME).first() is None:
+            started = time.perf_counter()
+            written = load_dataset(db, posts, seed=seed)
+            # Bulk inserts bypass the session hooks; score the dataset like the cron job would
+            from app.utils.movie_links import link_posts
+            from app.utils.popularity import rebuild
+            from app.utils.trending import rescore
+            rescore(db.session)
+            rebuild(db.session)
+            db.session.commit()
+            link_posts(db.session)
+            print(f"Loaded {sum(written.values()):,} rows in {time.perf_counter() - started:.1f}s: {written}")
+
+
+def benchmark(app, cases, iterations, warmup, only=None):
+    from flask_jwt_extended import create_access_token
+    from sqlalchemy import event
+    from app import db
+    from app.models.user import User
+    from .dataset import BENCH_USERNAME
+
+    with app.app_context():
+        user = User.query.filter_by(username=BENCH_USERNAME).first()
+        other = User.query.filter(User.id != user.id).order_by(User.id).first()
+        token = create_access_token(identity=user.id)
+        ctx = {
+            'user_id': user.id,
+            'other_user_id': other.id,
+            'club_id': 1,
+            'post_id': 1,
+            'movie_id': 1,
+            'headers': {'Authorization': f'Bearer {token}'},
+        }
+        counter = QueryCounter()
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', counter)
+
+    client = app.test_client()
+    results = {}
+    for case in cases:
+        if only and not any(name in case.endpoint for name in only):
+            continue
+        key = f'{case.method} {case.endpoint}'
+        timings, queries, statuses = [], [], {}
+        for i in range(warmup + iterations):
+            path, body = case.prepare(client, ctx)
+            headers = ctx['headers'] if case.auth else {}
+            counter.count = 0
+            counter.active = True
+            started = time.perf_counter()
+            response = client.open(path, method=case.method, json=body, headers=headers)
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            counter.active = False
+            response.close()
+            if i < warmup:
+                continue
+            timings.append(elapsed_ms)
+            queries.append(counter.count)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+        def traced():
+            path, body = case.prepare(client, ctx)
+            client.open(path, method=case.method, json=body, headers=ctx['headers'] if case.auth else {}).close()
+
+        peak_kb = peak_alloc_kb(traced)
+
+        timings.sort()
+        results[key] = {
+            'endpoint': case.endpoint,
+            'method': case.method,
+            'iterations': iterations,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'status_codes': statuses,
+            'peak_alloc_kb': peak_kb,
+        }
+        print(f"{key:<55} p50={results[key]['p50_ms']:>9.2f}ms p95={results[key]['p95_ms']:>9.2f}ms "
+              f"q/req={results[key]['queries_per_request']:>7} alloc={results[key]['peak_alloc_kb']}KiB")
+    return results
+
+
+def uncovered_endpoints(app, cases, blueprints):
+    """Endpoints in the benchmarked blueprints that have no case."""
+    covered = {(case.endpoint, case.method) for case in cases}
+    missing = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint.split('.')[0] not in blueprints:
+            continue
+        for method in sorted(rule.methods - {'HEAD'}):
+            if method == 'OPTIONS' and rule.endpoint != 'post_bp.options_post':
+                continue
+            if (rule.endpoint, method) not in covered:
+                missing.append(f'{method} {rule.endpoint} {rule.rule}')
+    return missing
+
+
+def main(argv=None):
+    from .cases import BLUEPRINTS, CASES
+    from .dataset import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--posts', type=int, help='Override the number of posts for the chosen scale')
+    parser.add_argument('--database-url', help='Defaults to a SQLite file under benchmarks/.data/')
+    parser.add_argument('--iterations', type=int, help='Timed requests per route (default depends on scale)')
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--rebuild', action='store_true', help='Drop and reload the dataset first')
+    parser.add_argument('--only', action='append', help='Only run cases whose endpoint contains this text')
+    parser.add_argument('--output', help='Write the JSON report here (default: stdout)')
+    args = parser.parse_args(argv)
+
+    posts = args.posts or SCALES[args.scale]
+    iterations = args.iterations or DEFAULT_ITERATIONS[args.scale]
+    database_url = args.database_url
+    if database_url is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        database_url = f"sqlite:///{os.path.join(DATA_DIR, f'bench-{posts}.db')}"
+
+    app = build_app(database_url)
+    prepare_database(app, posts, args.seed, args.rebuild)
+    routes = benchmark(app, CASES, iterations, args.warmup, only=args.only)
+
+    with app.app_context():
+        from app import db
+        dialect = db.engine.dialect.name
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'scale': args.scale,
+            'posts': posts,
+            'seed': args.seed,
+            'database': dialect,
+            'iterations': iterations,
+            'warmup': args.warmup,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'uncovered_endpoints': uncovered_endpoints(app, CASES, BLUEPRINTS),
+        },
+        'routes': routes,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f'Report written to {args.output}')
+    else:
+        print(output)
+    if report['meta']['uncovered_endpoints']:
+        print('WARNING: endpoints without a benchmark case:', *report['meta']['uncovered_endpoints'], sep='\n  ')
+
+
+if __name__ == '__main__':
+    main()
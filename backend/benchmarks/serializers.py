@@ -0,0 +1,91 @@
+"""
+Serializer microbenchmark.
+
+Times SerializerMixin's reflective to_dict against the compiled serializers
+from app.utils.serializers, per object, for every compiled model. Related
+rows are loaded up front so only serialization is measured, and each
+object's two outputs are checked for identical JSON before timing.
+
+    python -m benchmarks.serializers
+    python -m benchmarks.serializers --scale medium --objects 500 --output serializers.json
+"""
+import argparse
+import json
+import os
+import time
+
+from .run import DATA_DIR, build_app, git_commit, prepare_database
+
+
+def time_per_object(serialize, objects, repeat):
+    """Best-of-`repeat` mean microseconds per object."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for obj in objects:
+            serialize(obj)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(objects) * 1e6
+
+
+def main(argv=None):
+    from .dataset import SCALES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--database-url', help='Defaults to the benchmarks.run SQLite file for the scale')
+    parser.add_argument('--objects', type=int, default=200, help='Objects per model')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report here')
+    args = parser.parse_args(argv)
+
+    posts = SCALES[args.scale]
+    database_url = args.database_url
+    if database_url is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        database_url = f"sqlite:///{os.path.join(DATA_DIR, f'bench-{posts}.db')}"
+
+    # Serializes whatever lazy loads reach, without the routes' loader profiles
+    app = build_app(database_url, strict=False)
+    prepare_database(app, posts, args.seed, rebuild=False)
+
+    from sqlalchemy_serializer import SerializerMixin
+    from app import db
+
+    registry = app.extensions['serializers']
+    results = {}
+    with app.app_context():
+        for model, compiled in sorted(registry.compiled.items(), key=lambda item: item[0].__name__):
+            objects = db.session.scalars(db.select(model).limit(args.objects)).all()
+            if not objects:
+                continue
+            for obj in objects:
+                # Also warms every lazy relationship so neither side pays for loading
+                reflective = SerializerMixin.to_dict(obj)
+                if json.dumps(reflective, sort_keys=True) != json.dumps(compiled(obj), sort_keys=True):
+                    raise SystemExit(f'{model.__name__} {obj.id}: compiled output differs from SerializerMixin')
+
+            reflective_us = time_per_object(SerializerMixin.to_dict, objects, args.repeat)
+            compiled_us = time_per_object(compiled, objects, args.repeat)
+            results[model.__name__] = {
+                'objects': len(objects),
+                'reflective_us': round(reflective_us, 2),
+                'compiled_us': round(compiled_us, 2),
+                'speedup': round(reflective_us / compiled_us, 1),
+            }
+            print(f"{model.__name__:<12} reflective={reflective_us:>9.2f}us compiled={compiled_us:>7.2f}us "
+                  f"speedup={results[model.__name__]['speedup']}x")
+        db.session.rollback()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'meta': {'commit': git_commit(), 'scale': args.scale}, 'models': results},
+                      f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Report written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Gunicorn serving profile for wsgi:app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Everything is read from the environment so render.yaml can tune it:
+
+    WEB_CONCURRENCY               worker processes (default 4)
+    GUNICORN_WORKER_CLASS         sync, gthread or gevent (default: gthread when
+                                  GUNICORN_THREADS > 1, else sync). Server-sent
+                                  event streams need gthread or gevent; sync
+                                  workers answer them with a 503
+    GUNICORN_THREADS              threads per gthread worker (default 1); Config
+                                  sizes each worker's DB pool from the same value
+    GUNICORN_WORKER_CONNECTIONS   concurrent greenlets per gevent worker (default 100)
+    GUNICORN_PRELOAD              import the app once in the master (default True,
+                                  False for gevent, which must patch before imports)
+    GUNICORN_MAX_REQUESTS         recycle a worker after this many requests (default
+                                  2000, 0 disables); GUNICORN_MAX_REQUESTS_JITTER
+                                  spreads restarts (default 10% of it)
+    GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT, GUNICORN_KEEPALIVE
+    PROMETHEUS_MULTIPROC_DIR      shared sample directory for /metrics (see
+                                  app/utils/metrics.py); cleared at startup
+
+With preloading, the master builds the app (imports, mapper configuration,
+compiled serializers, loader profiles) once and the workers share those pages
+copy-on-write. The collector is kept off while preloading and everything is
+moved to the permanent generation before each fork, so collections in the
+workers never touch, and so never copy, the shared objects. Measure the
+effect with `python -m benchmarks.memory` (benchmarks/memory.txt has the
+numbers for this tree).
+"""
+import gc
+import multiprocessing
+import os
+
+
+def _env_bool(name, default):
+    return os.getenv(name, str(default)).lower() in ('true', '1', 't')
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', min(4, multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS') or ('gthread' if threads > 1 else 'sync')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))
+
+preload_app = _env_bool('GUNICORN_PRELOAD', worker_class != 'gevent')
+
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Worker heartbeat files on tmpfs, so a slow disk can't stall workers into timeouts
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Prometheus multiprocess mode: workers write samples here and /metrics sums
+# them. Files from a previous run would be added to this one's, so start empty.
+prometheus_multiproc_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if prometheus_multiproc_dir:
+    os.makedirs(prometheus_multiproc_dir, exist_ok=True)
+    for name in os.listdir(prometheus_multiproc_dir):
+        if name.endswith('.db'):
+            os.remove(os.path.join(prometheus_multiproc_dir, name))
+
+if preload_app:
+    # No collections while the app is built in the master; workers re-enable it
+    gc.disable()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    gc.enable()
+    # Connections the master opened while preloading belong to the master
+    from app import engine_profile
+    from wsgi import app
+    engine_profile.dispose_pools(app)
+
+
+def child_exit(server, worker):
+    if prometheus_multiproc_dir:
+        # Drops the exited worker's live gauges (pool checkouts, bcrypt in progress)
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,94 @@
+"""Cascade deletes on foreign keys, and index the referencing columns
+
+Revision ID: e5a07d914c6b
+Revises: b41f6c2d8e93
+Create Date: 2026-10-19 11:26:09.104835
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a07d914c6b'
+down_revision = 'b41f6c2d8e93'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table); each becomes ON DELETE CASCADE
+FOREIGN_KEYS = (
+    ('posts', 'user_id', 'users'),
+    ('posts', 'club_id', 'clubs'),
+    ('like', 'user_id', 'users'),
+    ('like', 'post_id', 'posts'),
+    ('comment', 'user_id', 'users'),
+    ('comment', 'post_id', 'posts'),
+    ('club_members', 'user_id', 'users'),
+    ('club_members', 'club_id', 'clubs'),
+    ('follows', 'follower_id', 'users'),
+    ('follows', 'followed_id', 'users'),
+    ('watchlists', 'user_id', 'users'),
+    ('watchlists', 'movie_id', 'movies'),
+    ('reviews', 'user_id', 'users'),
+    ('reviews', 'movie_id', 'movies'),
+)
+# (table, column) the cascades look rows up by. Postgres doesn't index the
+# referencing side of a foreign key, so without these each cascaded delete
+# scans the child table. Columns already leading an index are left out:
+# posts.user_id, follows.followed_id, and the first columns of the unique
+# constraints on club_members, follows and watchlists.
+INDEXES = (
+    ('posts', 'club_id'),
+    ('like', 'user_id'),
+    ('like', 'post_id'),
+    ('comment', 'user_id'),
+    ('comment', 'post_id'),
+    ('club_members', 'club_id'),
+    ('watchlists', 'movie_id'),
+    ('reviews', 'user_id'),
+    ('reviews', 'movie_id'),
+)
+# Gives SQLite's unnamed foreign keys a name batch mode can drop them by
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _name(table, column, referred):
+    return f'fk_{table}_{column}_{referred}'
+
+
+def _existing_names(table):
+    """{column: constraint name} for the table's foreign keys as they are now."""
+    names = {}
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        column = foreign_key['constrained_columns'][0]
+        names[column] = foreign_key['name'] or _name(table, column, foreign_key['referred_table'])
+    return names
+
+
+def _replace_foreign_keys(ondelete):
+    tables = {}
+    for table, column, referred in FOREIGN_KEYS:
+        tables.setdefault(table, []).append((column, referred))
+
+    for table, columns in tables.items():
+        existing = _existing_names(table)
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in columns:
+                if column in existing:
+                    batch_op.drop_constraint(existing[column], type_='foreignkey')
+                batch_op.create_foreign_key(
+                    _name(table, column, referred), referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    _replace_foreign_keys('CASCADE')
+    for table, column in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(batch_op.f(f'ix_{table}_{column}'), [column], unique=False)
+
+
+def downgrade():
+    for table, column in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_{column}'))
+    _replace_foreign_keys(None)
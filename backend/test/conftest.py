@@ -0,0 +1,107 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# Config reads the environment at import time, so set it before importing the app
+_scratch = tempfile.mkdtemp(prefix='movieclub-test-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ['DATABASE_REPLICA_URLS'] = ''
+os.environ['SLOW_QUERY_THRESHOLD_MS'] = '-1'
+os.environ.setdefault('JWT_SECRET_KEY', 'test-secret')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+for name in ('REDIS_URL', 'CACHE_REDIS_URL', 'EVENTS_REDIS_URL'):
+    os.environ.pop(name, None)
+
+from app import archive, create_app, db  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    # create_app() registers routes on the module-level Api, so once per process
+    app = create_app()
+    app.config.update(TESTING=True, SYNC_SETTLE_SECONDS=0)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def database(app, tmp_path):
+    """Empty tables and archive for every test. Tests push their own app context to touch the ORM."""
+    archive.directory = str(tmp_path / 'archive')
+    with app.app_context():
+        db.create_all()
+    yield
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class Factory:
+    """Creates rows straight through the session, so the change-log and rollup listeners see them."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _add(self, obj):
+        with self.app.app_context():
+            db.session.add(obj)
+            db.session.commit()
+            return obj.id
+
+    def user(self, username):
+        from app.models.user import User
+
+        # Nothing logs in with it, so skip bcrypt
+        return self._add(User(username=username, email=f'{username}@example.com', _password_hash='x'))
+
+    def club(self, name):
+        from app.models.club import Club
+
+        return self._add(Club(name=name, description=f'{name} club', genre='Drama'))
+
+    def movie(self, title):
+        from app.models.movie import Movie
+
+        return self._add(Movie(title=title, genre='Drama', release_year=2000))
+
+    def post(self, user_id, club_id, content='A post', days_ago=0):
+        from app.models.post import Post
+
+        created_at = datetime.utcnow() - timedelta(days=days_ago)
+        return self._add(Post(movie_title='Heat', content=content, user_id=user_id, club_id=club_id,
+                              created_at=created_at, updated_at=created_at))
+
+    def like(self, user_id, post_id):
+        from app.models.like import Like
+
+        return self._add(Like(user_id=user_id, post_id=post_id))
+
+    def comment(self, user_id, post_id, content='Nice'):
+        from app.models.comment import Comment
+
+        return self._add(Comment(user_id=user_id, post_id=post_id, content=content))
+
+    def watchlist(self, user_id, movie_id, status='pending'):
+        from app.models.movie import Movie
+        from app.models.watchlist import Watchlist
+
+        with self.app.app_context():
+            title = db.session.get(Movie, movie_id).title
+        return self._add(Watchlist(user_id=user_id, movie_id=movie_id, movie_title=title, status=status))
+
+    def auth(self, user_id):
+        from flask_jwt_extended import create_access_token
+
+        with self.app.app_context():
+            return {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+
+@pytest.fixture
+def make(app):
+    return Factory(app)
@@ -0,0 +1,130 @@
+import io
+import json
+import zipfile
+
+from app import db
+from app.models.post import Post
+from app.models.user import User
+from app.utils.archive import archive_posts_command
+
+
+def _archive(app, days=30):
+    result = app.test_cli_runner().invoke(archive_posts_command, ['--days', str(days)])
+    assert result.exit_code == 0, result.output
+
+
+def _walk(client, path, limit):
+    """Every post on `path`, following X-Next-Cursor a page of `limit` at a time."""
+    posts, cursor = [], None
+    while True:
+        query = {'limit': limit}
+        if cursor:
+            query['cursor'] = cursor
+        response = client.get(path, query_string=query)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= limit
+        posts += page
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return posts
+
+
+def _club_with_history(make):
+    alice = make.user('alice')
+    bob = make.user('bob')
+    club = make.club('Noir')
+    posts = [make.post(alice if n % 2 else bob, club, f'post {n}', days_ago=n * 20) for n in range(12)]
+    return alice, bob, club, posts
+
+
+def test_cursor_reads_through_to_the_archive(app, client, make):
+    alice, bob, club, posts = _club_with_history(make)
+    make.like(alice, posts[5])
+    make.comment(bob, posts[5], 'Archived comment')
+    path = f'/posts/clubs/{club}/posts'
+    before = _walk(client, path, 5)
+
+    _archive(app)
+    with app.app_context():
+        # Posts 0 and 1 are younger than 30 days
+        assert db.session.scalar(db.select(db.func.count()).select_from(Post)) == 2
+
+    for limit in (1, 3, 5, 100):
+        after = _walk(client, path, limit)
+        assert [post['id'] for post in after] == posts
+        assert after == before
+    archived = next(post for post in _walk(client, path, 4) if post['id'] == posts[5])
+    assert [like['username'] for like in archived['likes']] == ['alice']
+    assert [comment['content'] for comment in archived['comments']] == ['Archived comment']
+
+    # Without ?limit= only the live posts, and a cursor the rest is paged from
+    response = client.get(path)
+    assert [post['id'] for post in response.get_json()] == posts[:2]
+    rest = client.get(path, query_string={'cursor': response.headers['X-Next-Cursor']})
+    assert [post['id'] for post in rest.get_json()] == posts[2:]
+    assert 'X-Next-Cursor' not in rest.headers
+
+
+def test_unpaged_list_leaves_the_archive_closed(app, client, make, monkeypatch):
+    alice, bob, club, posts = _club_with_history(make)
+    _archive(app)
+    from app import archive
+
+    def scan(*args, **kwargs):
+        raise AssertionError('unpaged list opened the archive')
+
+    monkeypatch.setattr(archive, 'scan', scan)
+    response = client.get(f'/posts/clubs/{club}/posts')
+    assert response.status_code == 200
+    assert [post['id'] for post in response.get_json()] == posts[:2]
+    assert 'X-Next-Cursor' in response.headers
+
+    # Nothing archived for the club: no cursor
+    other = make.club('Western')
+    make.post(alice, other)
+    assert 'X-Next-Cursor' not in client.get(f'/posts/clubs/{other}/posts').headers
+
+
+def test_archived_posts_follow_renames_and_deletes(app, client, make):
+    alice, bob, club, posts = _club_with_history(make)
+    _archive(app)
+
+    with app.app_context():
+        db.session.get(User, bob).username = 'robert'
+        db.session.delete(db.session.get(User, alice))
+        db.session.commit()
+
+    remaining = _walk(client, f'/posts/clubs/{club}/posts', 4)
+    # Alice's posts drop out as ON DELETE CASCADE would have removed them
+    assert [post['id'] for post in remaining] == posts[::2]
+    assert {post['author_username'] for post in remaining} == {'robert'}
+
+
+def test_invalid_cursor(client, make):
+    club = make.club('Noir')
+    response = client.get(f'/posts/clubs/{club}/posts', query_string={'cursor': 'nonsense'})
+    assert response.status_code == 400
+
+
+def test_export_includes_archived_likes_and_comments(app, client, make):
+    alice, bob, club, posts = _club_with_history(make)
+    # posts[4] is bob's and will be archived; posts[0] is his and stays live
+    make.like(alice, posts[4])
+    make.comment(alice, posts[4], 'On an archived post')
+    make.like(alice, posts[0])
+    _archive(app)
+
+    response = client.get(f'/users/{alice}/export', headers=make.auth(alice))
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.data)) as bundle:
+        def rows(name):
+            return [json.loads(line) for line in bundle.read(name).decode().splitlines()]
+
+        likes = rows('likes.jsonl')
+        comments = rows('comments.jsonl')
+        exported_posts = rows('posts.jsonl')
+    assert [(like['post_id'], like['archived']) for like in likes] == [(posts[0], False), (posts[4], True)]
+    assert [(comment['post_id'], comment['content'], comment['archived']) for comment in comments] == [
+        (posts[4], 'On an archived post', True)]
+    assert sorted(post['id'] for post in exported_posts) == sorted(posts[1::2])
@@ -0,0 +1,57 @@
+from app import db
+from app.models.comment import Comment
+
+
+def _batch(client, requests, headers=None):
+    response = client.post('/batch', json={'requests': requests}, headers=headers)
+    return response.status_code, response.get_json()
+
+
+def test_dispatches_in_order_with_the_batch_auth(app, client, make):
+    alice = make.user('alice')
+    club = make.club('Noir')
+    post = make.post(alice, club)
+
+    status, body = _batch(client, [
+        {'method': 'GET', 'path': f'/users/{alice}'},
+        {'method': 'POST', 'path': f'/posts/{post}/comments', 'body': {'content': 'From a batch'}},
+        {'method': 'GET', 'path': f'/posts/{post}/comments'},
+    ], headers=make.auth(alice))
+    assert status == 200
+    user, created, comments = body['responses']
+    assert user['status'] == 200 and user['body']['username'] == 'alice'
+    assert created['status'] == 201
+    # The comment committed by the second sub-request is visible to the third
+    assert comments['status'] == 200
+    assert [comment['content'] for comment in comments['body']] == ['From a batch']
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Comment)) == 1
+
+
+def test_failures_stay_per_subrequest(client, make):
+    alice = make.user('alice')
+    club = make.club('Noir')
+    post = make.post(alice, club)
+
+    status, body = _batch(client, [
+        {'method': 'GET', 'path': '/clubs/999'},
+        {'method': 'POST', 'path': f'/posts/{post}/comments', 'body': {'content': 'No token'}},
+        {'method': 'GET', 'path': '/no/such/route'},
+        {'method': 'FETCH', 'path': '/users/1'},
+        {'path': 'relative'},
+        {'method': 'POST', 'path': '/batch', 'body': {'requests': []}},
+        {'method': 'GET', 'path': f'/posts/{post}/comments'},
+    ])
+    assert status == 200
+    statuses = [response['status'] for response in body['responses']]
+    assert statuses == [404, 401, 404, 400, 400, 400, 200]
+    assert body['responses'][-1]['body'] == []
+
+
+def test_rejects_malformed_and_oversized_batches(app, client):
+    assert _batch(client, [])[0] == 400
+    assert client.post('/batch', json={'requests': 'GET /users/1'}).status_code == 400
+    limit = app.config['BATCH_MAX_REQUESTS']
+    status, body = _batch(client, [{'method': 'GET', 'path': '/clubs/'}] * (limit + 1))
+    assert status == 400
+    assert _batch(client, [{'method': 'GET', 'path': '/clubs/'}] * limit)[0] == 200
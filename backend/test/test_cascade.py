@@ -0,0 +1,93 @@
+from app import db
+from app.models.club import Club
+from app.models.club_member import ClubMember
+from app.models.comment import Comment
+from app.models.follow import Follow
+from app.models.like import Like
+from app.models.movie_popularity import MoviePopularity
+from app.models.post import Post
+from app.models.user import User
+from app.models.watchlist import Watchlist
+
+
+def _count(model, *where):
+    return db.session.scalar(db.select(db.func.count()).select_from(model).where(*where))
+
+
+def test_deleting_a_user_cascades_in_the_database(app, make):
+    alice = make.user('alice')
+    bob = make.user('bob')
+    club = make.club('Noir')
+    movie = make.movie('Heat')
+    alices = make.post(alice, club)
+    bobs = make.post(bob, club)
+    make.like(alice, bobs)
+    make.comment(alice, bobs)
+    make.comment(bob, alices)
+    make.watchlist(alice, movie)
+    make.watchlist(bob, movie)
+    with app.app_context():
+        db.session.add_all([ClubMember(user_id=alice, club_id=club), Follow(follower_id=bob, followed_id=alice)])
+        db.session.commit()
+        assert db.session.scalar(db.select(db.func.sum(MoviePopularity.count))) == 2
+
+        db.session.delete(db.session.get(User, alice))
+        db.session.commit()
+
+        assert _count(Post) == 1 and _count(Post, Post.id == bobs) == 1
+        assert _count(Like) == 0
+        assert _count(Comment) == 0
+        assert _count(Watchlist) == 1
+        assert _count(ClubMember) == 0
+        assert _count(Follow) == 0
+        # The popularity rollup counts the watchlist item the cascade removed
+        assert db.session.scalar(db.select(db.func.sum(MoviePopularity.count))) == 1
+
+
+def test_deleting_a_club_cascades_in_the_database(app, make):
+    alice = make.user('alice')
+    noir = make.club('Noir')
+    western = make.club('Western')
+    gone = make.post(alice, noir)
+    make.post(alice, western)
+    make.like(alice, gone)
+    make.comment(alice, gone)
+    with app.app_context():
+        db.session.add(ClubMember(user_id=alice, club_id=noir))
+        db.session.commit()
+
+        db.session.delete(db.session.get(Club, noir))
+        db.session.commit()
+
+        assert _count(Post) == 1 and _count(Post, Post.club_id == western) == 1
+        assert _count(Like) == 0 and _count(Comment) == 0 and _count(ClubMember) == 0
+        assert _count(User) == 1
+
+
+def test_cascaded_deletes_evict_other_users_summaries(app, client, make):
+    alice = make.user('alice')
+    bob = make.user('bob')
+    carol = make.user('carol')
+    noir = make.club('Noir')
+    make.post(bob, noir)
+    with app.app_context():
+        db.session.add_all([Follow(follower_id=carol, followed_id=alice), Follow(follower_id=alice, followed_id=bob)])
+        db.session.commit()
+
+    def summary(user_id):
+        return client.get(f'/users/{user_id}/summary', headers=make.auth(user_id)).get_json()
+
+    assert summary(bob)['posts_count'] == 1 and summary(bob)['followers_count'] == 1
+    assert summary(carol)['following_count'] == 1
+
+    with app.app_context():
+        # Bob isn't a member: only his post ties him to the club
+        db.session.delete(db.session.get(Club, noir))
+        db.session.commit()
+    assert summary(bob)['posts_count'] == 0 and summary(bob)['followers_count'] == 1
+
+    with app.app_context():
+        db.session.delete(db.session.get(User, alice))
+        db.session.commit()
+    assert summary(bob)['followers_count'] == 0
+    assert summary(carol)['following_count'] == 0
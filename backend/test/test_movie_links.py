@@ -0,0 +1,39 @@
+from app import db, movie_matcher
+from app.utils.movie_links import normalize_title
+
+
+def _match(app, title):
+    with app.app_context():
+        movie_matcher.invalidate()
+        return movie_matcher.match(title, db.session)
+
+
+def test_normalize_title():
+    assert normalize_title('The Good, the Bad & the Ugly (1966)') == ('good the bad and the ugly', 1966)
+    assert normalize_title("Schindler's List") == ('schindlers list', None)
+
+
+def test_exact_and_fuzzy_matches(app, make):
+    heat = make.movie('Heat')
+    godfather = make.movie('The Godfather')
+    assert _match(app, 'heat') == heat
+    assert _match(app, 'Godfather, The') == godfather
+    assert _match(app, 'The Godfahter') == godfather
+
+
+def test_fuzzy_match_keeps_sequel_numbers_apart(app, make):
+    godfather = make.movie('The Godfather')
+    part_two = make.movie('The Godfather Part II')
+    make.movie('Rocky II')
+    assert _match(app, 'Godfather 2') is None
+    assert _match(app, 'Godfather Part 2') is None
+    assert _match(app, 'The Godfathr Part II') == part_two
+    assert _match(app, 'Rocky III') is None
+    assert _match(app, 'Godfathr') == godfather
+
+
+def test_short_titles_only_match_exactly(app, make):
+    heat = make.movie('Heat')
+    assert _match(app, 'Hea') is None
+    assert _match(app, 'Heet') is None
+    assert _match(app, 'HEAT') == heat
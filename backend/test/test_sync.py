@@ -0,0 +1,206 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.change_log import ChangeLog
+from app.models.club import Club
+from app.models.user import User
+from app.utils.changes import decode_token, encode_token, prune_change_log_command
+
+
+def _sync(client, path, token=None, headers=None, limit=None):
+    query = {}
+    if token is not None:
+        query['token'] = token
+    if limit is not None:
+        query['limit'] = limit
+    response = client.get(path, query_string=query, headers=headers)
+    return response.status_code, response.get_json()
+
+
+def test_token_round_trip():
+    assert decode_token(encode_token(0)) == 0
+    assert decode_token(encode_token(12345)) == 12345
+
+
+def test_snapshot_then_delta(client, make):
+    alice = make.user('alice')
+    club = make.club('Noir')
+    first = make.post(alice, club, 'first')
+
+    status, body = _sync(client, f'/sync/clubs/{club}')
+    assert status == 200 and body['full']
+    assert [post['id'] for post in body['posts']] == [first]
+
+    # Nothing new: an empty delta, and the token still works afterwards
+    status, quiet = _sync(client, f'/sync/clubs/{club}', body['sync_token'])
+    assert status == 200 and not quiet['full']
+    assert quiet['posts'] == [] and quiet['deleted'] == {'posts': []}
+
+    second = make.post(alice, club, 'second')
+    make.comment(alice, first)
+    status, delta = _sync(client, f'/sync/clubs/{club}', quiet['sync_token'])
+    assert status == 200
+    # A comment re-syncs the post it belongs to
+    assert sorted(post['id'] for post in delta['posts']) == [first, second]
+    assert delta['has_more'] is False
+
+    status, caught_up = _sync(client, f'/sync/clubs/{club}', delta['sync_token'])
+    assert caught_up['posts'] == []
+
+
+def test_delta_pages(client, make):
+    alice = make.user('alice')
+    club = make.club('Noir')
+    token = _sync(client, f'/sync/clubs/{club}')[1]['sync_token']
+    posts = [make.post(alice, club, f'post {n}') for n in range(5)]
+
+    seen = []
+    while True:
+        status, body = _sync(client, f'/sync/clubs/{club}', token, limit=2)
+        assert status == 200
+        seen += [post['id'] for post in body['posts']]
+        token = body['sync_token']
+        if not body['has_more']:
+            break
+    assert sorted(seen) == posts
+
+
+def test_invalid_token(client, make):
+    club = make.club('Noir')
+    for token in ('not-a-token', encode_token(-1), 'djI6NQ'):
+        status, body = _sync(client, f'/sync/clubs/{club}', token)
+        assert status == 400, token
+
+
+def test_settle_window_holds_cursor(app, client, make):
+    alice = make.user('alice')
+    club = make.club('Noir')
+    token = _sync(client, f'/sync/clubs/{club}')[1]['sync_token']
+    post = make.post(alice, club)
+
+    app.config['SYNC_SETTLE_SECONDS'] = 60
+    try:
+        # Too young to settle: sent now, but the token doesn't move past it
+        status, body = _sync(client, f'/sync/clubs/{club}', token)
+        assert status == 200
+        assert [row['id'] for row in body['posts']] == [post]
+        assert body['sync_token'] == token
+        assert body['has_more'] is False
+        # A snapshot's token is also taken from before the window
+        snapshot = _sync(client, f'/sync/clubs/{club}')[1]
+        assert decode_token(snapshot['sync_token']) <= decode_token(token)
+    finally:
+        app.config['SYNC_SETTLE_SECONDS'] = 0
+
+    # Once settled the same change is sent again and the cursor passes it
+    status, body = _sync(client, f'/sync/clubs/{club}', token)
+    assert [row['id'] for row in body['posts']] == [post]
+    assert decode_token(body['sync_token']) > decode_token(token)
+
+
+def test_tombstones_outlive_rows(client, make):
+    alice = make.user('alice')
+    club = make.club('Noir')
+    kept = make.post(alice, club, 'kept')
+    deleted = make.post(alice, club, 'deleted')
+    token = _sync(client, f'/sync/clubs/{club}')[1]['sync_token']
+
+    # One deleted after the token, one created and deleted after it
+    brief = make.post(alice, club, 'brief')
+    assert client.delete(f'/posts/{deleted}', headers=make.auth(alice)).status_code == 200
+    assert client.delete(f'/posts/{brief}', headers=make.auth(alice)).status_code == 200
+
+    status, body = _sync(client, f'/sync/clubs/{club}', token)
+    assert status == 200
+    assert body['posts'] == []
+    assert body['deleted'] == {'posts': sorted([deleted, brief])}
+    assert kept not in body['deleted']['posts']
+
+
+def test_user_feed_includes_watchlist(client, make):
+    alice = make.user('alice')
+    bob = make.user('bob')
+    club = make.club('Noir')
+    movie = make.movie('Heat')
+    headers = make.auth(alice)
+
+    status, body = _sync(client, f'/sync/users/{alice}', headers=headers)
+    assert status == 200 and body['posts'] == [] and body['watchlist'] == []
+    post = make.post(alice, club)
+    item = make.watchlist(alice, movie)
+    make.post(bob, club)
+
+    status, delta = _sync(client, f'/sync/users/{alice}', body['sync_token'], headers=headers)
+    assert [row['id'] for row in delta['posts']] == [post]
+    assert [row['id'] for row in delta['watchlist']] == [item]
+
+    assert client.get(f'/sync/users/{bob}', headers=headers).status_code == 403
+
+
+def test_expired_token_after_prune(app, client, make):
+    alice = make.user('alice')
+    club = make.club('Noir')
+    make.post(alice, club)
+    token = _sync(client, f'/sync/clubs/{club}')[1]['sync_token']
+    make.post(alice, club)
+    make.post(alice, club)
+
+    with app.app_context():
+        db.session.execute(db.update(ChangeLog).values(created_at=datetime.utcnow() - timedelta(days=60)))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(prune_change_log_command, ['--days', '30'])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        # The newest row stays, so a pruned token is told apart from a quiet feed
+        assert db.session.scalar(db.select(db.func.count()).select_from(ChangeLog)) == 1
+
+    status, body = _sync(client, f'/sync/clubs/{club}', token)
+    assert status == 410
+    status, body = _sync(client, f'/sync/clubs/{club}')
+    assert status == 200 and len(body['posts']) == 3
+
+
+def test_cascaded_user_delete(app, client, make):
+    alice = make.user('alice')
+    bob = make.user('bob')
+    club = make.club('Noir')
+    movie = make.movie('Heat')
+    alices = make.post(alice, club)
+    bobs = make.post(bob, club)
+    make.like(alice, bobs)
+    make.comment(alice, bobs)
+    make.watchlist(alice, movie)
+    token = _sync(client, f'/sync/clubs/{club}')[1]['sync_token']
+
+    with app.app_context():
+        db.session.delete(db.session.get(User, alice))
+        db.session.commit()
+
+    status, body = _sync(client, f'/sync/clubs/{club}', token)
+    assert status == 200
+    # Alice's post went by ON DELETE CASCADE; Bob's lost her like and comment
+    assert body['deleted'] == {'posts': [alices]}
+    [post] = body['posts']
+    assert post['id'] == bobs
+    assert post['likes'] == [] and post['comments'] == []
+
+
+def test_cascaded_club_delete(app, client, make):
+    alice = make.user('alice')
+    noir = make.club('Noir')
+    western = make.club('Western')
+    gone = make.post(alice, noir)
+    kept = make.post(alice, western)
+    headers = make.auth(alice)
+    token = _sync(client, f'/sync/users/{alice}', headers=headers)[1]['sync_token']
+
+    with app.app_context():
+        db.session.delete(db.session.get(Club, noir))
+        db.session.commit()
+
+    status, body = _sync(client, f'/sync/users/{alice}', token, headers=headers)
+    assert status == 200
+    assert body['deleted'] == {'posts': [gone], 'watchlist': []}
+    assert body['posts'] == []
+    assert client.get(f'/sync/clubs/{noir}').status_code == 404
+    assert [post['id'] for post in _sync(client, f'/sync/clubs/{western}')[1]['posts']] == [kept]